@@ -0,0 +1,132 @@
+"""Live admin panel state, pushed over the ``/admin`` Socket.IO namespace.
+
+The panel used to poll /api/admin/stats, /sessions and /games, and every poll
+re-ran count(*) and full-table queries. Now the totals and short lists of
+recent games and sessions are read from the database once, on the first
+admin connect, and the code paths that change them keep them current in
+memory. Each change goes to the connected admins as a small event:
+
+* ``admin_snapshot``: everything, on connect (and after bulk deletes);
+* ``admin_game``: a finished game, as a row of /api/admin/games;
+* ``admin_user``: an account was created or deleted;
+* ``admin_session``: a session started or was extended;
+* ``admin_counters``: live in-memory numbers (games, online, lobby, queue), only when they changed.
+
+While no admin is connected nothing is queued, and after the first load no
+update touches the database.
+"""
+from collections import OrderedDict, deque
+
+ADMIN_NAMESPACE = '/admin'
+ADMIN_TICK = 1.0  # seconds between counter checks
+RECENT = 50       # games / sessions kept for the panel
+
+
+class AdminFeed:
+    def __init__(self, outbox, recent=RECENT):
+        self.outbox = outbox  # an Outbox bound to ADMIN_NAMESPACE
+        self.recent = recent
+        self.admins = set()
+        self.loaded = False
+        self.totals = {}
+        self.games = deque(maxlen=recent)  # newest first
+        self.sessions = OrderedDict()      # id -> row, newest first
+        self.counters = {}
+        self.stats = {'loads': 0, 'events_pushed': 0}
+
+    def load(self, db):
+        self.totals = {
+            'total_users': db.execute('SELECT count(*) FROM users').fetchone()[0],
+            'total_games': db.execute('SELECT count(*) FROM games').fetchone()[0],
+            'visits_today': db.execute("SELECT count(*) FROM visit_logs WHERE timestamp >= date('now')").fetchone()[0],
+        }
+        self.games = deque((game_row(r) for r in db.execute(
+            'SELECT * FROM games ORDER BY id DESC LIMIT ?', (self.recent,))), maxlen=self.recent)
+        self.sessions = OrderedDict((r['id'], session_row(r)) for r in db.execute(
+            'SELECT * FROM user_sessions ORDER BY start_time DESC LIMIT ?', (self.recent,)))
+        self.loaded = True
+        self.stats['loads'] += 1
+
+    def snapshot(self):
+        return dict(self.totals, counters=self.counters, games=list(self.games),
+                    sessions=list(self.sessions.values()))
+
+    def push(self, event, data, room=None):
+        if self.admins:
+            self.outbox.emit(event, data, room=room)
+            self.stats['events_pushed'] += 1
+
+    # --- Admin connections ---
+
+    def connect(self, sid, db, counters):
+        if not self.loaded:
+            self.load(db)
+        self.admins.add(sid)
+        self.counters = counters
+        self.push('admin_snapshot', self.snapshot(), room=sid)
+
+    def disconnect(self, sid):
+        self.admins.discard(sid)
+
+    def reload(self, db):
+        """Rows were deleted in bulk (guest reaper): re-read if anyone is watching, else on the next connect."""
+        if not self.admins:
+            self.loaded = False
+            return
+        self.load(db)
+        self.push('admin_snapshot', self.snapshot())
+
+    # --- Changes ---
+
+    def game_finished(self, row):
+        if not self.loaded:
+            return
+        self.totals['total_games'] += 1
+        self.games.appendleft(row)
+        self.push('admin_game', {'game': row, 'total_games': self.totals['total_games']})
+
+    def user_created(self, email):
+        self._users_changed(email, 1)
+
+    def user_deleted(self, email, count=1):
+        self._users_changed(email, -count)
+
+    def _users_changed(self, email, delta):
+        if not self.loaded or not delta:
+            return
+        self.totals['total_users'] += delta
+        self.push('admin_user', {'email': email, 'created': delta > 0, 'total_users': self.totals['total_users']})
+
+    def session_seen(self, row):
+        if not self.loaded:
+            return
+        if row['id'] not in self.sessions:
+            self.sessions[row['id']] = row
+            self.sessions.move_to_end(row['id'], last=False)
+            while len(self.sessions) > self.recent:
+                self.sessions.popitem()
+        else:
+            self.sessions[row['id']] = row
+        self.push('admin_session', row)
+
+    def update_counters(self, counters):
+        """Push in-memory counters if they changed since the last push."""
+        if counters != self.counters:
+            self.counters = counters
+            self.push('admin_counters', counters)
+
+
+def game_row(row):
+    return {key: row[key] for key in ('id', 'player1_email', 'player2_email', 'player1_score',
+                                      'player2_score', 'winner_email', 'created_at')}
+
+
+def session_row(row):
+    return {
+        'id': row['id'],
+        'user_email': row['user_email'],
+        'start_time': row['start_time'],
+        'last_seen': row['last_seen'],
+        'duration_sec': round(row['last_seen'] - row['start_time']),
+        'ip': row['ip'],
+    }
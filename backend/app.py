@@ -1,19 +1,73 @@
+import startup  # first: times the whole cold start (see startup.py)
 import eventlet
 eventlet.monkey_patch()
+startup.trace.mark('eventlet')
 
-import json
-from typing import Dict, Optional
+import atexit
+from eventlet import tpool
+from typing import Optional
 import os
 import jwt
 from flask import Flask, request, redirect, session, url_for, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
 import random
+import re
 import time
 from functools import wraps
+from outbox import Outbox
+import logging
+from logs import setup_logging, get_logger
+from metrics import Registry, timed
+from dbprofile import ProfiledConnection, profiler
+from botpool import BotPool, lobby_sid
+from wordqueue import load_word_queue, pick_round_word
+from presence import PresenceIndex, ONLINE, LOBBY, IN_GAME
+from lobby import LobbyIndex
+import matchmaking
+import userids
+import guests
+import retention
+import snapshot
+import adminfeed
+import zombie
+import wordbank
+from assets import AssetManifest, SOUNDS_DIR
+startup.trace.mark('imports')
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!' # Used for Flask session security
 socketio = SocketIO(app, cors_allowed_origins="*") # Allow CORS for devosh-style proxying
+outbox = Outbox(socketio) # Per-tick batching of outbound events (see outbox.py)
+admin_outbox = Outbox(socketio, namespace=adminfeed.ADMIN_NAMESPACE)
+
+setup_logging()
+lobby_log = get_logger('lobby')
+game_log = get_logger('game')
+answer_log = get_logger('game.answers') # Sampled: one line per answer would flood stdout
+bot_log = get_logger('bot')
+db_log = get_logger('db')
+auth_log = get_logger('auth')
+api_log = get_logger('api')
+
+# --- Metrics (scraped from /api/admin/metrics) ---
+metrics = Registry()
+socket_latency = metrics.histogram('socket_event_seconds', 'Socket.IO handler wall time (includes in-handler sleeps)', ['event'])
+route_latency = metrics.histogram('http_request_seconds', 'HTTP route latency', ['route', 'method'])
+answer_latency = metrics.histogram('answer_result_seconds', 'Time from answer received to the answer_result frame sent')
+games_finished = metrics.counter('games_finished_total', 'Finished games', ['reason'])
+answers_total = metrics.counter('answers_total', 'Answers processed', ['correct', 'source'])
+bot_wins = metrics.counter('bot_wins_total', 'Games won by bots')
+round_words = metrics.counter('round_words_total', 'Round words dealt', ['source'])
+guests_reaped = metrics.counter('guests_reaped_total', 'Stale guest accounts deleted')
+guest_rows_reaped = metrics.counter('guest_rows_reaped_total', 'Rows deleted by the guest reaper', ['table'])
+retention_rows = metrics.counter('retention_rows_total', 'Log rows rolled up into daily_activity', ['table'])
+quick_matches = metrics.counter('quick_match_total', 'Quick-match requests by outcome', ['result'])
+quick_match_wait = metrics.histogram('quick_match_wait_seconds', 'Time from quick_match to a game (human or bot)')
+reconnects = metrics.counter('game_reconnects_total', 'Players leaving and rejoining running games', ['event'])
+snapshot_write_seconds = metrics.histogram('snapshot_write_seconds', 'Time to write the game snapshot to disk')
+zombie_runs = metrics.counter('zombie_runs_total', 'Zombie runs posted by outcome', ['result'])
+pack_load_seconds = metrics.histogram('word_pack_load_seconds', 'Time to load a word pack on first use', ['pack'])
+pack_evictions = metrics.counter('word_pack_evictions_total', 'Word packs dropped by the memory budget', ['pack'])
 
 # SSO Configuration
 SSO_LOGIN_URL = os.getenv('SSO_LOGIN_URL', 'http://localhost:8001/login')
@@ -24,27 +78,15 @@ WINNING_SCORE = int(os.getenv('WINNING_SCORE', 10))
 # --- Bot Configuration ---
 import threading
 
-# Bot profiles - INVISIBLE to players (appear as normal users)
-# Updated to be slower/weaker as per user request
-BOTS = [
-    # Weak/Medium Bots (850-1300 ELO)
-    {'name': 'Пепа', 'email': 'pepa_gamer@mail.ru', 'elo': 850, 'response_time': (6.0, 8.0), 'accuracy': 0.35},
-    {'name': 'Дэвид_Бэкхан', 'email': 'david_beckhan@gmail.com', 'elo': 1000, 'response_time': (5.0, 7.0), 'accuracy': 0.45},
-    {'name': 'Антор_ЧигурАм_амарян', 'email': 'anton_chigur@yandex.ru', 'elo': 1150, 'response_time': (4.0, 6.0), 'accuracy': 0.55},
-    {'name': 'Бесшумно--летящий--воин', 'email': 'silent_warrior@mail.ru', 'elo': 1250, 'response_time': (3.5, 5.5), 'accuracy': 0.60},
-    {'name': 'тройной_одеколон-Марк-Дакаскаса', 'email': 'triple_mark@gmail.com', 'elo': 1300, 'response_time': (3.0, 5.0), 'accuracy': 0.65},
-    
-    # Strong Bots (1600-1800 ELO)
-    {'name': 'Джедай_Без_Меча', 'email': 'jedi_no_saber@mail.ru', 'elo': 1600, 'response_time': (2.0, 3.5), 'accuracy': 0.75},
-    {'name': 'Pikachu-_ездит_на_жигули', 'email': 'pikachu_rides@gmail.com', 'elo': 1650, 'response_time': (1.8, 3.0), 'accuracy': 0.80},
-    {'name': 'НеВыноси_Мусор', 'email': 'dont_take_trash@yandex.ru', 'elo': 1700, 'response_time': (1.5, 2.5), 'accuracy': 0.85},
-    {'name': '_-Gandalf-_Sluшaet_Rap', 'email': 'gandalf_rap@mail.ru', 'elo': 1750, 'response_time': (1.2, 2.2), 'accuracy': 0.88},
-    {'name': 'генадий___параходов', 'email': 'gennadiy_ships@gmail.com', 'elo': 1800, 'response_time': (1.0, 2.0), 'accuracy': 0.90},
-]
+# Bot profiles and the game rules live in engine.py (shared with bench/simulate.py)
+import engine
+from engine import (BOTS, calculate_elo, get_bot_params_by_elo, new_game, start_round, apply_answer,
+                    answer_results, opponent_of, bot_policy, ROUND_PAUSE, GAME_OVER_PAUSE)
 
 # Track bot emails and configs for quick lookup
 bot_emails = {bot['email'] for bot in BOTS}
 bot_configs = {bot['email']: bot for bot in BOTS}
+bot_pool = BotPool(BOTS)  # Each bot serves up to BOT_MAX_GAMES games at once (see botpool.py)
 active_bot_threads = {}  # room_id -> thread
 
 # --- Database Setup ---
@@ -52,17 +94,21 @@ import sqlite3
 from flask import g
 import os
 
-# Ensure data directory exists
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+# Ensure data directory exists (DATA_DIR override lets benchmarks use a scratch DB)
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(__file__), 'data'))
 os.makedirs(DATA_DIR, exist_ok=True)
 
 DATABASE = os.path.join(DATA_DIR, 'users.db')
 
+db_connections = {'open': 0, 'opened_total': 0}
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
+        db = g._database = sqlite3.connect(DATABASE, factory=ProfiledConnection)
         db.row_factory = sqlite3.Row
+        db_connections['open'] += 1
+        db_connections['opened_total'] += 1
     return db
 
 @app.teardown_appcontext
@@ -70,19 +116,13 @@ def close_connection(exception):
     db = getattr(g, '_database', None)
     if db is not None:
         db.close()
+        db_connections['open'] -= 1
 
 def init_db():
     with app.app_context():
         db = get_db()
         cursor = db.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                email TEXT PRIMARY KEY,
-                name TEXT,
-                elo INTEGER DEFAULT 1200,
-                is_admin INTEGER DEFAULT 0
-            )
-        ''')
+        cursor.execute(userids.USERS_DDL)
         
         # MIGRATION: Add is_admin column if it doesn't exist (for existing DBs)
         try:
@@ -165,14 +205,42 @@ def init_db():
             # 2. Update name in case it changed in config (but don't touch ELO)
             cursor.execute('UPDATE users SET name = ? WHERE email = ?', (bot['name'], bot['email']))
             
-            print(f"Added/Updated bot: {bot['name']}")
+            db_log.debug("Added/Updated bot: %s", bot['name'])
 
         # Test Data Injection REMOVED for production
         
         db.commit()
         
         # Apply SQL migrations
-        apply_migrations(db)
+        with startup.trace.phase('init_db.migrations'):
+            apply_migrations(db)
+
+        # Integer user ids (+ triggers keeping them in sync with email writes)
+        with startup.trace.phase('init_db.userids'):
+            userids.migrate(db)
+
+        # MIGRATION: last activity (epoch), what the guest reaper goes by; seeded from sessions
+        try:
+            cursor.execute('ALTER TABLE users ADD COLUMN last_active REAL')
+            cursor.execute('''
+                UPDATE users SET last_active = (SELECT max(last_seen) FROM user_sessions WHERE user_id = users.id)
+            ''')
+            db.commit()
+        except sqlite3.OperationalError:
+            pass # Column likely already exists
+
+        # MIGRATION: client run ids, so a resent zombie run is stored once (see zombie.py)
+        try:
+            cursor.execute('ALTER TABLE zombie_games ADD COLUMN run_id TEXT')
+        except sqlite3.OperationalError:
+            pass # Column likely already exists
+        for ddl in zombie.RUN_DDL:
+            cursor.execute(ddl)
+        db.commit()
+
+        # Old log rows are deleted by the retention job; let the file shrink without full VACUUMs
+        with startup.trace.phase('init_db.vacuum'):
+            retention.enable_incremental_vacuum(db)
 
 def apply_migrations(db):
     """Apply all SQL migration files from migrations directory"""
@@ -190,40 +258,148 @@ def apply_migrations(db):
             with open(migration_file, 'r') as f:
                 sql_script = f.read()
                 db.executescript(sql_script)
-            print(f"✓ Applied migration: {migration_name}")
+            db_log.info("Applied migration: %s", migration_name)
         except Exception as e:
-            print(f"✗ Migration {migration_name} error: {e}")
+            db_log.error("Migration %s error: %s", migration_name, e)
     
     db.commit()
 
+startup.trace.mark('app_setup')
 init_db()  # Initialize on startup
+startup.trace.mark('init_db')
+
+# Who is connected and where (email -> sids/status), plus who has whom as a friend
+presence = PresenceIndex()
+with app.app_context():
+    presence.load_followers(get_db())
+startup.trace.mark('presence')
+
+# Kills / wave distribution of all zombie runs: the percentile in save responses costs no query
+zombie_ranks = zombie.RunRanks()
+with app.app_context():
+    zombie_ranks.load(get_db())
+startup.trace.mark('zombie_ranks')
+
+# Stale guests (inactive > GUEST_TTL_HOURS) are purged in small batches; bots never count as the "other player"
+guest_reaper = guests.GuestReaper(protected_emails=bot_emails)
+
+
+def reap_guests():
+    """One reaper pass on its own connection; connected guests are skipped. Returns rows deleted per table."""
+    with app.app_context():
+        report = guest_reaper.run(get_db(), is_online=presence.connections.__contains__, pause=socketio.sleep)
+    guests_reaped.inc(amount=report.get('users', 0))
+    if report.get('users'):
+        with app.app_context():
+            admin_feed.reload(get_db())
+    for table, count in report.items():
+        guest_rows_reaped.inc(table, amount=count)
+    return report
 
-def get_words() -> Dict:
-    with open("words.json", "r") as file:
-        words = json.load(file)
-        return words
 
-# База данных слов: английское слово -> перевод
-WORDS = get_words()
+# visit_logs / user_sessions older than RETENTION_DAYS -> daily_activity, then incremental vacuum
+retention_job = retention.RetentionJob()
+
+
+def run_retention():
+    with app.app_context():
+        report = retention_job.run(get_db(), pause=socketio.sleep)
+    for table in ('visit_logs', 'user_sessions'):
+        retention_rows.inc(table, amount=report[table])
+    return report
+
+
+def run_periodically(interval, job):
+    """Background loop: ``job()`` every ``interval`` seconds; a failed run is logged and the loop goes on."""
+    while True:
+        socketio.sleep(interval)
+        try:
+            job()
+        except Exception:
+            db_log.exception("Background job %s failed", job.__name__)
+
+
+if guests.GUEST_REAP_INTERVAL > 0:
+    socketio.start_background_task(run_periodically, guests.GUEST_REAP_INTERVAL, reap_guests)
+if retention.RETENTION_INTERVAL > 0:
+    socketio.start_background_task(run_periodically, retention.RETENTION_INTERVAL, run_retention)
+
+# База данных слов: английское слово -> перевод. Versioned and hot-reloaded (see wordbank.py):
+# words.json is pack en-ru, always loaded; other packs load on first use under an LRU budget.
+# A running game keeps the bank it started with in game['bank']
+word_packs = wordbank.PackRegistry()
+word_packs.default.reload(force=True)
+startup.trace.mark('words')
+
+
+def word_pack(pack_id):
+    """Current bank of ``pack_id``; the first use loads it in a native thread. KeyError if unknown,
+    OSError / ValueError if the file is bad."""
+    if pack_id == wordbank.DEFAULT_PACK or pack_id in word_packs.loaded:
+        return word_packs.get(pack_id)
+    started = time.perf_counter()
+    bank, evicted = word_packs.load(pack_id, run=tpool.execute)
+    pack_load_seconds.observe(time.perf_counter() - started, pack_id)
+    for evicted_id in evicted:
+        pack_evictions.inc(evicted_id)
+    return bank
+
+
+def reload_words():
+    """Swap in the word files that changed; parsed in a native thread so games keep running."""
+    return word_packs.reload(run=tpool.execute)
+
+
+if wordbank.WORDS_RELOAD_INTERVAL > 0:
+    socketio.start_background_task(run_periodically, wordbank.WORDS_RELOAD_INTERVAL, reload_words)
+
+
+def game_words(game):
+    """The word bank ``game`` is pinned to."""
+    return game.get('bank') or word_packs.default.current
 
 
 def generate_translations(word: str, num_options: int = 6) -> list[str]:
     """Generate a list of unique translation options containing exactly one correct answer."""
-    correct_translation = WORDS[word]
-    all_translations = list(WORDS.values())
-    wrong_translations = [t for t in all_translations if t != correct_translation]
-    if num_options - 1 > len(wrong_translations):
-        num_wrong = max(1, min(len(wrong_translations), num_options - 1))
-    else:
-        num_wrong = num_options - 1
-    options = random.sample(wrong_translations, num_wrong) + [correct_translation]
-    random.shuffle(options)
-    return options
+    return engine.generate_translations(word, word_packs.default.current, num_options)
 
 # Очередь ожидающих игроков (Lobby): sid -> {email: ...}
 waiting_players = {}
+# The same players ordered by ELO, plus each lobby client's window (see lobby.py)
+lobby_index = LobbyIndex()
+lobby_flush = {'scheduled': False, 'online_count': None}
+# Quick-match queue, bucketed by ELO (see matchmaking.py)
+match_queue = matchmaking.MatchQueue()
 # Активные игры: room_id -> {'players': [player1, player2], 'word': word, ...}
 active_games = {}
+# What the admin panel shows, kept in memory and pushed on /admin (see adminfeed.py)
+admin_feed = adminfeed.AdminFeed(admin_outbox)
+
+# Live-state gauges are read at scrape time
+metrics.gauge('waiting_players', 'Players (incl. bots) in the lobby', lambda: len(waiting_players))
+metrics.gauge('active_games', 'Games in progress', lambda: len(active_games))
+metrics.gauge('users_online', 'Distinct users with an open socket', lambda: len(presence.connections))
+metrics.gauge('quick_match_queue', 'Players waiting for a quick match', lambda: len(match_queue))
+metrics.gauge('active_bot_threads', 'Running bot game tasks', lambda: len(active_bot_threads))
+metrics.gauge('bot_games_active', 'Games currently held by the bot pool', bot_pool.active)
+metrics.gauge('db_connections_open', 'Open SQLite connections', lambda: db_connections['open'])
+metrics.callback_counter('db_connections_opened_total', 'SQLite connections opened since start', lambda: db_connections['opened_total'])
+metrics.callback_counter('outbox_events_queued_total', 'Outbound events queued', lambda: outbox.stats['events_queued'])
+metrics.callback_counter('outbox_frames_sent_total', 'Outbound frames sent', lambda: outbox.stats['frames_sent'])
+metrics.gauge('word_pack_bytes', 'Estimated memory of each loaded word pack',
+              lambda: {(pack_id,): size for pack_id, size in word_packs.sizes().items()}, ['pack'])
+
+@app.before_request
+def start_request_timer():
+    g._request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    start = getattr(g, '_request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        route_latency.observe(time.perf_counter() - start, route, request.method)
+    return response
 
 # --- Auth Helpers ---
 
@@ -237,15 +413,20 @@ def verify_token(token: str) -> Optional[dict]:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         return payload # Should contain 'sub' (email)
     except jwt.ExpiredSignatureError:
-        print("Token expired")
+        auth_log.info("Token expired")
         return None
     except jwt.InvalidTokenError:
-        print("Invalid token")
+        auth_log.warning("Invalid token")
         return None
 
 # --- Routes ---
 
 # --- Decorators ---
+def is_admin(email):
+    user = get_db().execute('SELECT is_admin FROM users WHERE email = ?', (email,)).fetchone()
+    return bool(user and user['is_admin'])
+
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -254,9 +435,7 @@ def admin_required(f):
             return "Unauthorized", 401
         
         # Check DB for admin status
-        db = get_db()
-        user = db.execute('SELECT is_admin FROM users WHERE email = ?', (current_user['email'],)).fetchone()
-        if not user or not user['is_admin']:
+        if not is_admin(current_user['email']):
              return "Forbidden: Admins only", 403
              
         return f(*args, **kwargs)
@@ -272,7 +451,8 @@ def admin_get_users():
     # Get all users sorted by joined date (rowid approx) or ELO
     users = db.execute('''
         SELECT email, name, elo, is_admin, 
-        (SELECT count(*) FROM games WHERE player1_email = users.email OR player2_email = users.email) as games_count
+        (SELECT count(*) FROM games WHERE player1_id = users.id)
+          + (SELECT count(*) FROM games WHERE player2_id = users.id) as games_count
         FROM users 
         ORDER BY is_admin DESC, elo DESC
         LIMIT 100
@@ -307,8 +487,9 @@ def admin_ban_user():
     if email_to_ban == 'azamat.murdalov@gmail.com':
         return "Cannot ban root admin", 400
 
-    db.execute('DELETE FROM users WHERE email = ?', (email_to_ban,))
+    deleted = db.execute('DELETE FROM users WHERE email = ?', (email_to_ban,)).rowcount
     db.commit()
+    admin_feed.user_deleted(email_to_ban, deleted)
     return jsonify({"status": "deleted", "email": email_to_ban})
 
 @app.route('/api/admin/users/update', methods=['POST'])
@@ -337,6 +518,8 @@ def admin_update_user():
             return "Invalid ELO format", 400
 
     db.commit()
+    lobby_index.update_user(email, elo=new_elo, name=new_name)
+    broadcast_lobby_state()
     return jsonify({"status": "updated", "email": email})
 
 @app.route('/api/admin/games', methods=['GET'])
@@ -361,7 +544,7 @@ def admin_get_stats():
     active_games_count = len(active_games)
     
     # Visits Today
-    visits_today = db.execute("SELECT count(*) FROM visit_logs WHERE date(timestamp) = date('now')").fetchone()[0]
+    visits_today = db.execute("SELECT count(*) FROM visit_logs WHERE timestamp >= date('now')").fetchone()[0]
     
     # Total Games
     total_games = db.execute('SELECT count(*) FROM games').fetchone()[0]
@@ -370,9 +553,75 @@ def admin_get_stats():
         "total_users": total_users,
         "active_games": active_games_count,
         "visits_today": visits_today,
-        "total_games": total_games
+        "total_games": total_games,
+        "outbox": outbox.get_stats(),
+        "bot_pool": bot_pool.stats(),
+        "guest_reaper": guest_reaper.stats,
+        "retention": retention_job.stats,
+        "quick_match": dict(match_queue.stats, waiting=len(match_queue)),
+        "snapshot": snapshot_stats,
+        "startup": startup.trace.report(),
+        "admin_feed": dict(admin_feed.stats, admins=len(admin_feed.admins)),
+        "zombie_ranks": zombie_ranks.stats(),
+        "words": word_packs.get_stats()
     })
 
+@app.route('/api/admin/activity', methods=['GET'])
+@admin_required
+def admin_get_activity():
+    """Per-day visits/sessions/users: rolled-up days from daily_activity plus the raw rows not rolled up yet."""
+    db = get_db()
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+    since = db.execute("SELECT date('now', ?)", (f'-{days - 1} days',)).fetchone()[0]
+    rows = db.execute('''
+        SELECT day, sum(visits) AS visits, sum(sessions) AS sessions,
+               round(sum(session_seconds)) AS session_seconds,
+               count(DISTINCT nullif(user_email, '')) AS users
+        FROM (
+            SELECT day, user_email, visits, sessions, session_seconds FROM daily_activity WHERE day >= :since
+            UNION ALL
+            SELECT date(timestamp), coalesce(user_email, ''), 1, 0, 0 FROM visit_logs WHERE timestamp >= :since
+            UNION ALL
+            SELECT date(start_time, 'unixepoch'), coalesce(user_email, ''), 0, 1, max(0, last_seen - start_time)
+            FROM user_sessions WHERE start_time >= CAST(strftime('%s', :since) AS REAL)
+        )
+        GROUP BY day ORDER BY day DESC
+    ''', {'since': since}).fetchall()
+    return jsonify([dict(r) for r in rows])
+
+@app.route('/api/admin/retention/run', methods=['POST'])
+@admin_required
+def admin_run_retention():
+    return jsonify({"report": run_retention(), "totals": retention_job.stats})
+
+@app.route('/api/admin/guests/reap', methods=['POST'])
+@admin_required
+def admin_reap_guests():
+    return jsonify({"deleted": reap_guests(), "totals": guest_reaper.stats})
+
+@app.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def admin_get_metrics():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/api/admin/db-profile', methods=['GET'])
+@admin_required
+def admin_get_db_profile():
+    return jsonify(profiler.report(limit=request.args.get('limit', 50, type=int)))
+
+@app.route('/api/admin/db-profile/reset', methods=['POST'])
+@admin_required
+def admin_reset_db_profile():
+    profiler.reset()
+    return jsonify({"status": "reset"})
+
+@app.route('/api/admin/words/reload', methods=['POST'])
+@admin_required
+def admin_reload_words():
+    """Re-read words.json now instead of waiting for the next check."""
+    reloaded = word_packs.reload(force=True, run=tpool.execute)
+    return jsonify(dict(word_packs.get_stats(), reloaded=reloaded))
+
 @app.route('/api/admin/sessions', methods=['GET'])
 @admin_required
 def admin_get_sessions():
@@ -403,6 +652,15 @@ def admin_get_sessions():
 def api_me():
     user = get_current_user()
     if user:
+        db = get_db()
+        row = db.execute('SELECT name, elo, is_admin FROM users WHERE email = ?', (user['email'],)).fetchone()
+
+        # If user not in DB, create them (before the session row: its user_id is filled from users)
+        if not row:
+            db.execute('INSERT INTO users (email, name, elo) VALUES (?, ?, ?)', (user['email'], None, 1200))
+            db.commit()
+            admin_feed.user_created(user['email'])
+
         # LOG SESSION
         # if not user['email'].startswith('Guest_'): # Allow guests
         if True:
@@ -411,7 +669,7 @@ def api_me():
              try:
                  # Find active session (active within last 5 mins)
                  active_session = db.execute('''
-                    SELECT id FROM user_sessions 
+                    SELECT id, start_time, ip FROM user_sessions 
                     WHERE user_email = ? AND last_seen > ?
                  ''', (user['email'], current_time - 300)).fetchone()
                  
@@ -420,27 +678,28 @@ def api_me():
                  if active_session:
                      # Update existing
                      db.execute('UPDATE user_sessions SET last_seen = ? WHERE id = ?', (current_time, active_session['id']))
+                     seen = dict(active_session)
                  else:
                      # Start new
-                     db.execute('INSERT INTO user_sessions (user_email, start_time, last_seen, ip) VALUES (?, ?, ?, ?)',
-                                (user['email'], current_time, current_time, ip))
+                     cursor = db.execute('INSERT INTO user_sessions (user_email, start_time, last_seen, ip) VALUES (?, ?, ?, ?)',
+                                         (user['email'], current_time, current_time, ip))
+                     seen = {'id': cursor.lastrowid, 'start_time': current_time, 'ip': ip}
+                 db.execute('UPDATE users SET last_active = ? WHERE email = ?', (current_time, user['email']))
                  db.commit()
+                 admin_feed.session_seen(adminfeed.session_row(dict(seen, user_email=user['email'], last_seen=current_time)))
              except Exception as e:
-                 print(f"Session log error: {e}")
+                 db_log.error("Session log error: %s", e)
 
-        # Fetch detailed profile from DB
-        db = get_db()
-        row = db.execute('SELECT name, elo, is_admin FROM users WHERE email = ?', (user['email'],)).fetchone()
-        
         # Determine stats
         
         # Fetch friends
         # Fetch friends with details (Name, ELO)
         friends_rows = db.execute('''
             SELECT u.email, u.name, u.elo 
-            FROM friendships f
-            JOIN users u ON f.friend_email = u.email
-            WHERE f.user_email = ?
+            FROM users me
+            JOIN friendships f ON f.user_id = me.id
+            JOIN users u ON u.id = f.friend_id
+            WHERE me.email = ?
         ''', (user['email'],)).fetchall()
         
         friends = []
@@ -448,7 +707,8 @@ def api_me():
             friends.append({
                 'email': f['email'],
                 'name': f['name'] or f['email'],
-                'elo': f['elo']
+                'elo': f['elo'],
+                'status': presence.status_of(f['email'])
             })
 
         user_data = {
@@ -458,12 +718,7 @@ def api_me():
             'is_admin': bool(row['is_admin']) if row and 'is_admin' in row.keys() else False,
             'friends': friends
         }
-        
-        # If user not in DB, create them
-        if not row:
-            db.execute('INSERT INTO users (email, name, elo) VALUES (?, ?, ?)', (user['email'], None, 1200))
-            db.commit()
-            
+
         return jsonify(user_data)
     return jsonify(None), 401
 
@@ -487,9 +742,12 @@ def add_friend():
         db.execute('INSERT OR IGNORE INTO friendships (user_email, friend_email) VALUES (?, ?)', 
                   (user['email'], friend_email))
         db.commit()
+        presence.follow(user['email'], friend_email)  # only once the row is committed
+        lobby_index.set_friend(user['email'], friend_email, True)
+        broadcast_lobby_state()
         return jsonify({'status': 'ok'})
     except Exception as e:
-        print(f"Error adding friend: {e}")
+        db_log.error("Error adding friend: %s", e)
         return jsonify({'error': 'Database error'}), 500
 
 @app.route('/api/friends/remove', methods=['POST'])
@@ -509,23 +767,55 @@ def remove_friend():
         db.execute('DELETE FROM friendships WHERE user_email = ? AND friend_email = ?', 
                   (user['email'], friend_email))
         db.commit()
+        presence.unfollow(user['email'], friend_email)  # only once the row is committed
+        lobby_index.set_friend(user['email'], friend_email, False)
+        broadcast_lobby_state()
         return jsonify({'status': 'ok'})
     except Exception as e:
-        print(f"Error removing friend: {e}")
+        db_log.error("Error removing friend: %s", e)
         return jsonify({'error': 'Database error'}), 500
 
+def game_history(db, user_id, limit=20):
+    """Last ``limit`` games of a user with opponent names, one query on the integer indexes."""
+    # Two index range scans (as player1 / as player2) each capped at `limit`, merged
+    rows = db.execute('''
+        SELECT h.*, o.email AS opponent_email, o.name AS opponent_name FROM (
+            SELECT * FROM (SELECT player2_id AS opponent_id, player1_score AS my_score, player2_score AS opponent_score,
+                                  winner_id, created_at
+                           FROM games WHERE player1_id = :uid ORDER BY created_at DESC LIMIT :limit)
+            UNION ALL
+            SELECT * FROM (SELECT player1_id, player2_score, player1_score, winner_id, created_at
+                           FROM games WHERE player2_id = :uid ORDER BY created_at DESC LIMIT :limit)
+        ) h
+        LEFT JOIN users o ON o.id = h.opponent_id
+        ORDER BY h.created_at DESC LIMIT :limit
+    ''', {'uid': user_id, 'limit': limit}).fetchall()
+
+    return [{
+        'opponent_name': row['opponent_name'] or row['opponent_email'],
+        'opponent_email': row['opponent_email'],
+        'my_score': row['my_score'],
+        'opponent_score': row['opponent_score'],
+        'won': row['winner_id'] == user_id,
+        'date': row['created_at']
+    } for row in rows]
+
 @app.route('/api/profile/<identifier>')
 def get_public_profile(identifier):
     current = get_current_user()
     if not current:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    target_email = current['email'] if identifier == 'me' else identifier
-    
     db = get_db()
+
+    # Accepts 'me', an email or an integer user id
+    target_email = current['email'] if identifier == 'me' else identifier
+    if identifier.isdigit():
+        id_row = db.execute('SELECT email FROM users WHERE id = ?', (int(identifier),)).fetchone()
+        target_email = id_row['email'] if id_row else identifier
     
     # User Info
-    user_row = db.execute('SELECT name, elo, is_admin FROM users WHERE email = ?', (target_email,)).fetchone()
+    user_row = db.execute('SELECT id, name, elo, is_admin FROM users WHERE email = ?', (target_email,)).fetchone()
     if not user_row:
         # Check if it's a bot
         bot_config = next((b for b in BOTS if b['email'] == target_email), None)
@@ -543,10 +833,10 @@ def get_public_profile(identifier):
     # Stats
     games_rows = db.execute('''
         SELECT count(*) as total, 
-        sum(case when winner_email = ? then 1 else 0 end) as wins 
+        sum(case when winner_id = ? then 1 else 0 end) as wins 
         FROM games 
-        WHERE player1_email = ? OR player2_email = ?
-    ''', (target_email, target_email, target_email)).fetchone()
+        WHERE player1_id = ? OR player2_id = ?
+    ''', (user_row['id'], user_row['id'], user_row['id'])).fetchone()
     
     total_games = games_rows['total']
     wins = games_rows['wins'] or 0
@@ -560,31 +850,7 @@ def get_public_profile(identifier):
         is_friend = bool(friend_row)
         
     # Fetch History (Last 20 games) for EVERYONE
-    history_rows = db.execute('''
-        SELECT id, player1_email, player2_email, player1_score, player2_score, winner_email, created_at 
-        FROM games 
-        WHERE player1_email = ? OR player2_email = ? 
-        ORDER BY created_at DESC LIMIT 20
-    ''', (target_email, target_email)).fetchall()
-    
-    history = []
-    for row in history_rows:
-        # Determine opponent
-        is_p1 = row['player1_email'] == target_email
-        opponent_email = row['player2_email'] if is_p1 else row['player1_email']
-        
-        # Get opponent name
-        opp_row = db.execute('SELECT name FROM users WHERE email = ?', (opponent_email,)).fetchone()
-        opponent_name = opp_row['name'] if opp_row else opponent_email
-        
-        history.append({
-            'opponent_name': opponent_name,
-            'opponent_email': opponent_email,
-            'my_score': row['player1_score'] if is_p1 else row['player2_score'],
-            'opponent_score': row['player2_score'] if is_p1 else row['player1_score'],
-            'won': row['winner_email'] == target_email,
-            'date': row['created_at']
-        })
+    history = game_history(db, user_row['id'])
 
     return jsonify({
         'email': target_email,
@@ -601,47 +867,65 @@ def get_public_profile(identifier):
         'is_me': current['email'] == target_email
     })
 
+SYNC_CURSOR_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')  # SQLite CURRENT_TIMESTAMP
+
 @app.route('/api/me/stats')
 def get_my_stats():
     user = get_current_user()
     if not user:
         return jsonify({'error': 'Not authenticated'}), 401
         
+    since = request.args.get('since')
+    if since is not None and not SYNC_CURSOR_RE.match(since):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    limit = max(1, min(request.args.get('limit', 200, type=int), 1000))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
     db = get_db()
-    
-    # Words
-    words_rows = db.execute('SELECT word, correct_count, wrong_count, status, last_seen FROM user_words WHERE user_email = ? ORDER BY last_seen DESC', (user['email'],)).fetchall()
+    # Taken before reading: rows written while we read are returned again next sync, never missed
+    cursor = db.execute('SELECT CURRENT_TIMESTAMP').fetchone()[0]
+
+    uid = userids.user_id_for(db, user['email'])
+
+    # Summary (server-side, no need to ship every row to count them)
+    summary_row = db.execute('''
+        SELECT count(*) AS total,
+               sum(CASE WHEN status = 'learned' THEN 1 ELSE 0 END) AS learned,
+               sum(correct_count) AS correct, sum(wrong_count) AS wrong
+        FROM user_words WHERE user_id = ?
+    ''', (uid,)).fetchone()
+    answered = (summary_row['correct'] or 0) + (summary_row['wrong'] or 0)
+    summary = {
+        'total': summary_row['total'],
+        'learned': summary_row['learned'] or 0,
+        'learning': summary_row['total'] - (summary_row['learned'] or 0),
+        'accuracy': round((summary_row['correct'] or 0) / answered, 3) if answered else None
+    }
+
+    # Words: changed since the client's last sync, or one page of the full list
+    if since is not None:
+        words_rows = db.execute('''
+            SELECT word, correct_count, wrong_count, status, last_seen FROM user_words
+            WHERE user_id = ? AND last_seen >= ? ORDER BY last_seen DESC
+        ''', (uid, since)).fetchall()
+        has_more = False
+    else:
+        words_rows = db.execute('''
+            SELECT word, correct_count, wrong_count, status, last_seen FROM user_words
+            WHERE user_id = ? ORDER BY last_seen DESC LIMIT ? OFFSET ?
+        ''', (uid, limit + 1, offset)).fetchall()
+        has_more = len(words_rows) > limit
+        words_rows = words_rows[:limit]
     words = [dict(row) for row in words_rows]
     
     # History (Last 20 games)
-    history_rows = db.execute('''
-        SELECT id, player1_email, player2_email, player1_score, player2_score, winner_email, created_at 
-        FROM games 
-        WHERE player1_email = ? OR player2_email = ? 
-        ORDER BY created_at DESC LIMIT 20
-    ''', (user['email'], user['email'])).fetchall()
-    
-    history = []
-    for row in history_rows:
-        # Determine opponent
-        is_p1 = row['player1_email'] == user['email']
-        opponent_email = row['player2_email'] if is_p1 else row['player1_email']
-        
-        # Get opponent name
-        opp_row = db.execute('SELECT name FROM users WHERE email = ?', (opponent_email,)).fetchone()
-        opponent_name = opp_row['name'] if opp_row else opponent_email
-        
-        history.append({
-            'opponent_name': opponent_name,
-            'opponent_email': opponent_email,
-            'my_score': row['player1_score'] if is_p1 else row['player2_score'],
-            'opponent_score': row['player2_score'] if is_p1 else row['player1_score'],
-            'won': row['winner_email'] == user['email'],
-            'date': row['created_at']
-        })
+    history = game_history(db, uid)
         
     return jsonify({
+        'summary': summary,
         'words': words,
+        'has_more': has_more,
+        'cursor': cursor,
         'history': history
     })
 
@@ -684,7 +968,8 @@ def toggle_word_status():
         current_status = row['status']
         new_status = 'learning' if current_status == 'learned' else 'learned'
         
-        db.execute('UPDATE user_words SET status = ? WHERE user_email = ? AND word = ?', (new_status, user['email'], word))
+        # last_seen is bumped so incremental /api/me/stats syncs pick the change up
+        db.execute('UPDATE user_words SET status = ?, last_seen = CURRENT_TIMESTAMP WHERE user_email = ? AND word = ?', (new_status, user['email'], word))
     else:
         # If word doesn't exist yet, insert as learned (since they clicked to toggle it presumably from somewhere, or maybe default to learning?)
         # Actually user can only click words they have seen. If not seen, maybe insert as learning.
@@ -756,56 +1041,107 @@ def save_zombie_game():
     if not user:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    data = request.json
-    kills = data.get('kills', 0)
-    wave = data.get('wave', 1)
-    accuracy = data.get('accuracy', 0.0)
-    duration = data.get('duration', 0)
-    
+    try:
+        row = zombie.validate_run(request.get_json(silent=True))
+    except ValueError as e:
+        zombie_runs.inc('rejected')
+        return jsonify({'error': str(e)}), 400
+
     db = get_db()
     cursor = db.cursor()
     cursor.execute('''
-        INSERT INTO zombie_games (user_id, kills, wave, accuracy, duration)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (user['email'], kills, wave, accuracy, duration))
+        INSERT OR IGNORE INTO zombie_games (player_id, user_id, run_id, kills, wave, accuracy, duration)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (userids.user_id_for(db, user['email']), user['email'], *row))
     db.commit()
-    
-    game_id = cursor.lastrowid
-    return jsonify({'success': True, 'game_id': game_id})
+
+    _, kills, wave, _, _ = row
+    if not cursor.rowcount:
+        zombie_runs.inc('duplicate')
+        return jsonify({'success': True, 'game_id': None, 'duplicate': True,
+                        'percentile': zombie_ranks.percentiles(kills, wave)})
+    zombie_runs.inc('saved')
+    zombie_ranks.add(kills, wave)
+    return jsonify({'success': True, 'game_id': cursor.lastrowid, 'percentile': zombie_ranks.percentiles(kills, wave)})
+
+
+@app.route('/api/zombie/save-games', methods=['POST'])
+def save_zombie_games():
+    """Runs buffered by the client: {"runs": [...]}, stored in one transaction (see zombie.py)."""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    body = request.get_json(silent=True)
+    runs = body.get('runs') if isinstance(body, dict) else None
+    if not isinstance(runs, list):
+        return jsonify({'error': 'runs must be a list'}), 400
+    if len(runs) > zombie.ZOMBIE_BATCH_MAX:
+        return jsonify({'error': f'At most {zombie.ZOMBIE_BATCH_MAX} runs per request'}), 400
+
+    rows, rejected = zombie.parse_batch(runs)
+    db = get_db()
+    new = zombie.insert_runs(db, userids.user_id_for(db, user['email']), user['email'], rows) if rows else []
+    for _, kills, wave, _, _ in new:
+        zombie_ranks.add(kills, wave)
+    # Ranks against everything stored, this batch included
+    percentiles = {run_id: zombie_ranks.percentiles(kills, wave) for run_id, kills, wave, _, _ in rows if run_id}
+    saved = len(new)
+    duplicates = len(runs) - len(rejected) - saved
+    zombie_runs.inc('saved', amount=saved)
+    zombie_runs.inc('duplicate', amount=duplicates)
+    zombie_runs.inc('rejected', amount=len(rejected))
+    if rejected:
+        api_log.warning("Rejected %d zombie runs from %s: %s", len(rejected), user['email'], rejected[0]['error'])
+    return jsonify({'success': True, 'saved': saved, 'duplicates': duplicates, 'rejected': rejected,
+                    'percentiles': percentiles})
 
 @app.route('/api/words')
 def serve_words_full():
-    """Serve ALL words for gameplay (SSoT)"""
+    """Serve ALL words of a pack (?pack=, default en-ru); the body is encoded once per version"""
+    pack_id = request.args.get('pack', wordbank.DEFAULT_PACK)
+    if not word_packs.exists(pack_id):
+        return jsonify({'error': 'Unknown word pack'}), 404
     try:
-        # Use globally loaded WORDS to avoid disk I/O
-        if WORDS:
-            return jsonify(WORDS)
-            
-        # Fallback if global load failed (should not happen)
-        with open("words.json", "r") as file:
-            full_data = json.load(file)
-        return jsonify(full_data)
-        
-    except Exception as e:
-        print(f"Error serving words: {e}")
-        return jsonify({"error": str(e)}), 500
-        
-    except Exception as e:
-        print(f"Error serving words: {e}")
-        return jsonify({"error": str(e)}), 500
+        bank = word_pack(pack_id)
+    except (OSError, ValueError) as e:
+        api_log.error("Error loading word pack %s: %s", pack_id, e)
+        return jsonify({'error': 'Word pack unavailable'}), 500
+    response = app.response_class(bank.payload, mimetype='application/json')
+    response.set_etag(bank.version)
+    response.headers['X-Words-Version'] = bank.version
+    response.headers['X-Words-Pack'] = pack_id
+    response.headers['Cache-Control'] = 'no-cache'  # revalidate: 304 until the version changes
+    return response.make_conditional(request)
+
+
+@app.route('/api/word-packs')
+def list_word_packs():
+    """Packs a game can be played with; ``version`` is set for the ones in memory."""
+    packs = []
+    for pack_id in word_packs.available():
+        registry = word_packs.default if pack_id == wordbank.DEFAULT_PACK else word_packs.loaded.get(pack_id)
+        packs.append({'id': pack_id, 'default': pack_id == wordbank.DEFAULT_PACK,
+                      'version': registry.current.version if registry else None})
+    return jsonify(packs)
+
+# frontend/sounds, mounted read-only; hashed once, re-checked by mtime (see assets.py)
+sound_manifest = AssetManifest(SOUNDS_DIR, '/sounds/')
+sound_manifest.refresh()
+startup.trace.mark('sounds')
 
 @app.route('/api/sounds')
 def get_sounds():
     try:
-        sounds_dir = '/app/sounds_scan'
-        if not os.path.exists(sounds_dir):
-            return jsonify([])
-        
-        files = [f for f in sorted(os.listdir(sounds_dir)) if f.lower().endswith('.mp3')]
-        return jsonify(files)
+        entries, etag = sound_manifest.get()
     except Exception as e:
-        print(f"Error listing sounds: {e}")
-        return jsonify([])
+        api_log.error("Error listing sounds: %s", e)
+        return jsonify({"version": None, "sounds": []})
+
+    response = jsonify({"version": etag, "sounds": entries})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # revalidate; the files themselves are immutable per ?v=
+    return response.make_conditional(request)
 
 @app.route('/api/zombie/leaderboard')
 def get_zombie_leaderboard():
@@ -822,9 +1158,9 @@ def get_zombie_leaderboard():
             MAX(zg.wave) as best_wave,
             MAX(zg.kills) as best_kills
         FROM zombie_games zg
-        JOIN users u ON zg.user_id = u.email
+        JOIN users u ON zg.player_id = u.id
         WHERE u.email NOT LIKE 'Guest_%'
-        GROUP BY u.email
+        GROUP BY u.id
         ORDER BY total_kills DESC
         LIMIT ?
     ''', (limit,)).fetchall()
@@ -857,7 +1193,7 @@ def admin_get_zombie_games():
             zg.duration,
             zg.created_at
         FROM zombie_games zg
-        JOIN users u ON zg.user_id = u.email
+        JOIN users u ON zg.player_id = u.id
         ORDER BY zg.created_at DESC
         LIMIT 500
     ''').fetchall()
@@ -870,7 +1206,7 @@ def login():
     current_user = get_current_user()
     if current_user and current_user['email'].startswith('Guest_'):
         session['merge_guest_email'] = current_user['email']
-        print(f"Stashing guest session for merge: {current_user['email']}")
+        auth_log.info("Stashing guest session for merge: %s", current_user['email'])
         
     # Redirect to SSO provider with return URL
     # We want Chuvala to redirect back to /auth/callback here
@@ -902,7 +1238,7 @@ def auth_callback():
     # --- MIGRATION LOGIC ---
     merge_guest_email = session.pop('merge_guest_email', None)
     if merge_guest_email:
-        print(f"Merging guest {merge_guest_email} into {new_email}")
+        auth_log.info("Merging guest %s into %s", merge_guest_email, new_email)
         db = get_db()
         
         # Get Guest Data
@@ -915,6 +1251,7 @@ def auth_callback():
             user_row = db.execute('SELECT elo FROM users WHERE email = ?', (new_email,)).fetchone()
             if not user_row:
                 db.execute('INSERT INTO users (email, name, elo) VALUES (?, ?, ?)', (new_email, None, guest_elo))
+                admin_feed.user_created(new_email)
             else:
                 # If new user already has default ELO (1200) or we blindly prefer Guest progress (User choice implies intent to save)
                 # Let's take the MAX elo to be safe, or just overwrite if user_elo is 1200 (fresh).
@@ -923,11 +1260,16 @@ def auth_callback():
                 if guest_elo != 1200:
                      db.execute('UPDATE users SET elo = ? WHERE email = ?', (guest_elo, new_email))
             
-            # Delete Guest account after successful migration
+            # Move games, words, friends, sessions and zombie runs, then delete the guest account
+            guest_friends = [r['friend_email'] for r in db.execute(
+                'SELECT friend_email FROM friendships WHERE user_email = ?', (merge_guest_email,))]
+            userids.merge_user(db, merge_guest_email, new_email)
             db.execute('DELETE FROM users WHERE email = ?', (merge_guest_email,))
-            print(f"Deleted guest account: {merge_guest_email}")
+            auth_log.info("Deleted guest account: %s", merge_guest_email)
+            admin_feed.user_deleted(merge_guest_email)
             
             db.commit()
+            presence.merge(merge_guest_email, new_email, guest_friends)
             
     # Redirect to root (frontend handled by Nginx)
     return redirect('/')
@@ -954,206 +1296,312 @@ def logout():
 
 @app.route('/login/guest')
 def login_guest():
-    guest_id = random.randint(1000, 9999)
-    email = f'Guest_{guest_id}'
+    # Guest number comes from users.id: unique, never reused (see guests.py)
+    db = get_db()
+    email = guests.create_guest(db)
+    db.commit()
+    admin_feed.user_created(email)
     session['user'] = {
         'email': email,
         'token': 'guest'
     }
-    
-    # Ensure guest exists in DB
-    db = get_db()
-    # Check if exists
-    row = db.execute('SELECT 1 FROM users WHERE email = ?', (email,)).fetchone()
-    if not row:
-        db.execute('INSERT INTO users (email, name, elo) VALUES (?, ?, ?)', (email, f"Guest {guest_id}", 1200))
-        db.commit()
-        
     return redirect('/')
 
-# --- ELO Calculation Helper ---
-def calculate_elo(winner_elo, loser_elo, k_factor=32):
-    """
-    Calculate new ELO ratings using standard formula.
-    Ra' = Ra + K * (Sa - Ea)
-    """
-    expected_winner = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
-    expected_loser = 1 / (1 + 10 ** ((winner_elo - loser_elo) / 400))
-    
-    new_winner_elo = round(winner_elo + k_factor * (1 - expected_winner))
-    new_loser_elo = round(loser_elo + k_factor * (0 - expected_loser))
-    
-    return new_winner_elo, new_loser_elo
+# --- Helper: Presence ---
+def set_presence(sid, status, email=None):
+    """Update a connection's presence; push the user's new status to their followers only."""
+    change = presence.set(sid, status, email)
+    if change:
+        push_presence(*change)
+
+
+def push_presence(email, status):
+    for follower in presence.followers_of(email):
+        for sid in presence.sids_of(follower):
+            outbox.emit('friend_presence', {'email': email, 'status': status}, room=sid)
+
+
+def leave_game_presence(game):
+    for sid in game['players']:
+        if game['emails'].get(sid) not in bot_emails:
+            set_presence(sid, ONLINE)
+
 
 # --- Helper: Broadcast Lobby State ---
-def broadcast_lobby_state():
-    # Only active users
-    active_users = []
+# --- Helper: Lobby ---
+def lobby_join(sid, email):
+    """Put a player into the lobby (waiting_players + the ELO index); name/ELO are read once here."""
+    waiting_players[sid] = {'email': email}
+    row = get_db().execute('SELECT name, elo FROM users WHERE email = ?', (email,)).fetchone()
+    elo = row['elo'] if row and row['elo'] is not None else 1200
+    lobby_index.add(sid, email, row['name'] if row else None, elo, is_bot=email in bot_emails)
+
+
+def lobby_leave(sid):
+    if match_queue.cancel(sid):
+        quick_matches.inc('cancelled')
+    waiting_players.pop(sid, None)
+    lobby_index.remove(sid)
+    lobby_index.unsubscribe(sid)
+
+
+def subscribe_lobby(sid, email, options=None):
+    """(Re)subscribe a lobby client to its window: its ELO ± range, friends always included."""
     db = get_db()
-    
-    for sid, user in waiting_players.items():
-        # Fetch latest ELO and Name from DB
-        row = db.execute('SELECT name, elo FROM users WHERE email = ?', (user['email'],)).fetchone()
-        name = row['name'] if row and row['name'] else user['email']
-        elo = row['elo'] if row else 1200
-        
-        active_users.append({
-            'sid': sid, 
-            'email': user['email'], # Keep email for unique ID internally if needed
-            'name': name,
-            'elo': elo,
-            'is_bot': sid.startswith('bot_') or user['email'] in bot_emails
-        })
-        
+    entry = lobby_index.entries.get(sid)
+    if entry:
+        elo = entry['elo']
+    else:
+        row = db.execute('SELECT elo FROM users WHERE email = ?', (email,)).fetchone()
+        elo = row['elo'] if row and row['elo'] is not None else 1200
+    friends = [r['friend_email'] for r in db.execute('SELECT friend_email FROM friendships WHERE user_email = ?', (email,))]
+    lobby_index.subscribe(sid, email, elo, friends, options)
+
+
+def broadcast_lobby_state():
+    """Schedule a lobby refresh: at the end of the tick every dirty window gets its slice."""
+    if lobby_flush['scheduled']:
+        return
+    lobby_flush['scheduled'] = True
+    socketio.start_background_task(flush_lobby_views)
+
+
+def flush_lobby_views():
+    lobby_flush['scheduled'] = False
     online_count = len(waiting_players)
-    
-    # Sort active_users for optimization if needed, but client handles it too.
-    
-    socketio.emit('lobby_update', {
-        'players': active_users,
-        'online_count': online_count
-    }, namespace='/')
+    for sid in lobby_index.take_dirty():
+        view = lobby_index.changed_view(sid)
+        if view is None:
+            continue
+        view['online_count'] = online_count
+        outbox.emit('lobby_update', view, room=sid)
+    # Windows that didn't change still show the lobby size
+    if online_count != lobby_flush['online_count']:
+        lobby_flush['online_count'] = online_count
+        outbox.emit('lobby_count', {'online_count': online_count})
 
 @socketio.on('connect')
+@timed(socket_latency, 'connect')
 def handle_connect(auth=None):
     # Validate session on connection
     if not get_current_user():
-        print(f'Unauthenticated client tried to connect: {request.sid}')
+        auth_log.warning('Unauthenticated client tried to connect: %s', request.sid)
         return 
 
-    print(f'Client connected: {request.sid}, User: {session["user"]["email"]}')
+    lobby_log.info('Client connected: %s, User: %s', request.sid, session["user"]["email"])
     socketio.server.enter_room(request.sid, request.sid, namespace='/') # Explicitly join room with own SID
+    set_presence(request.sid, ONLINE, session['user']['email'])
+    # Back within the grace window: take the seat in the paused game
+    reattach_game(request.sid, session['user']['email'])
     
     # Broadcast debug to see if sockets work at all
-    socketio.emit('debug_broadcast', {'msg': f'User {request.sid} connected'})
+    outbox.emit('debug_broadcast', {'msg': f'User {request.sid} connected'})
 
 
 @socketio.on('disconnect')
+@timed(socket_latency, 'disconnect')
 def handle_disconnect():
-    print(f'Client disconnected: {request.sid}')
+    lobby_log.info('Client disconnected: %s', request.sid)
+    change = presence.remove(request.sid)
+    if change:
+        push_presence(*change)
+    lobby_index.unsubscribe(request.sid)
     if request.sid in waiting_players:
-        del waiting_players[request.sid]
+        lobby_leave(request.sid)
         broadcast_lobby_state()
     else:
         for room_id, game in active_games.items():
             if request.sid in game['players']:
                 leave_room(room_id)
-                opponent = game['players'][0] if game['players'][1] == request.sid else game['players'][1]
-                emit('opponent_disconnected', room=opponent)
+                opponent = opponent_of(game, request.sid)
+                if snapshot.RECONNECT_GRACE > 0:
+                    # Keep the seat: the game is paused until the player is back or the grace runs out
+                    snapshot.detach(game, request.sid)
+                    outbox.emit('opponent_reconnecting', {'grace': int(snapshot.RECONNECT_GRACE)}, room=opponent)
+                    reconnects.inc('detached')
+                    break
+                outbox.emit('opponent_disconnected', room=opponent)
                 del active_games[room_id]
+                leave_game_presence(game)
+                games_finished.inc('disconnect')
                 break
 
 @socketio.on('enter_lobby')
-def handle_enter_lobby():
+@timed(socket_latency, 'enter_lobby')
+def handle_enter_lobby(data=None):
     user = get_current_user()
     if not user:
         emit('error', {'message': 'Authentication required'})
         return
+    # A reattached player's client enters the lobby on every connect
+    if any(request.sid in game['players'] for game in active_games.values()):
+        return
 
     # Add to waiting list if not already there
     if request.sid not in waiting_players:
-        waiting_players[request.sid] = {'email': user['email']}
-        print(f'Player {request.sid} ({user["email"]}) entered lobby')
+        lobby_join(request.sid, user['email'])
+        lobby_log.debug('Player %s (%s) entered lobby', request.sid, user["email"])
+    set_presence(request.sid, LOBBY, user['email'])
     
     # Ensure bots are in lobby (add if missing)
     for bot in BOTS:
-        bot_sid = f"bot_{bot['email']}"
+        bot_sid = lobby_sid(bot['email'])
         if bot_sid not in waiting_players:
-            waiting_players[bot_sid] = {'email': bot['email']}
-    
-    # Send update to everyone (including self)
+            lobby_join(bot_sid, bot['email'])
+
+    # Optional window options: {range, page, page_size, search}
+    subscribe_lobby(request.sid, user['email'], data if isinstance(data, dict) else None)
+
+    # Send the new slice to every window that can see this player (including self)
+    broadcast_lobby_state()
+
+@socketio.on('lobby_window')
+@timed(socket_latency, 'lobby_window')
+def handle_lobby_window(data):
+    """Change the lobby window (ELO range, page, page size, search); the new slice comes as lobby_update."""
+    user = get_current_user()
+    if not user or request.sid not in lobby_index.windows or not isinstance(data, dict):
+        return
+    subscribe_lobby(request.sid, user['email'], data)
     broadcast_lobby_state()
 
 @socketio.on('leave_lobby')
+@timed(socket_latency, 'leave_lobby')
 def handle_leave_lobby():
+    lobby_index.unsubscribe(request.sid)
     if request.sid in waiting_players:
-        del waiting_players[request.sid]
+        lobby_leave(request.sid)
         broadcast_lobby_state()
+    set_presence(request.sid, ONLINE)
 
 @socketio.on('challenge_player')
+@timed(socket_latency, 'challenge_player')
 def handle_challenge_player(data):
     target_sid = data.get('target_sid')
     challenger_sid = request.sid
     rounds = data.get('rounds', WINNING_SCORE)  # Default from config
+    pack = data.get('pack', wordbank.DEFAULT_PACK)
     
     # Validate rounds (5-30)
     if not isinstance(rounds, int) or rounds < 5 or rounds > 30:
         rounds = WINNING_SCORE
+    if not word_packs.exists(pack):
+        pack = wordbank.DEFAULT_PACK
     
-    print(f"DEBUG: challenge_player called. Challenger: {challenger_sid}, Target: {target_sid}, Rounds: {rounds}")
-    print(f"DEBUG: Current waiting_players keys: {list(waiting_players.keys())}")
+    lobby_log.debug("challenge_player called. Challenger: %s, Target: %s, Rounds: %s", challenger_sid, target_sid, rounds)
+    if lobby_log.isEnabledFor(logging.DEBUG):
+        lobby_log.debug("Current waiting_players keys: %s", list(waiting_players.keys()))
     
     if not target_sid or target_sid not in waiting_players:
-        print(f"DEBUG: FAILURE - Target {target_sid} not found")
+        lobby_log.debug("FAILURE - Target %s not found", target_sid)
         emit('error', {'message': 'Player not found or no longer available'})
         return
 
     if target_sid == challenger_sid:
-        print("DEBUG: FAILURE - Self challenge")
+        lobby_log.debug("FAILURE - Self challenge")
         return
 
     # Check if target is a bot
     target_email = waiting_players.get(target_sid, {}).get('email')
-    bot_emails = [bot['email'] for bot in BOTS] # Assuming BOTS is defined globally
     if target_email in bot_emails:
+        if not bot_pool.has_capacity(target_email):
+            emit('error', {'message': 'Этот соперник сейчас занят. Попробуйте другого.'})
+            return
+
         # Bot auto-accepts after brief delay
         def bot_auto_accept_job():
             socketio.sleep(random.uniform(0.3, 0.8))  # Human-like delay
+            if not load_pack_for(challenger_sid, pack):
+                return
             with app.app_context():
-                start_game_for_bot(challenger_sid, target_sid, rounds)
+                start_game_for_bot(challenger_sid, target_sid, rounds, pack)
         
         socketio.start_background_task(bot_auto_accept_job)
-        print(f"Bot {target_email} will auto-accept challenge")
+        bot_log.debug("Bot %s will auto-accept challenge", target_email)
         return
     
     # Human player - send challenge notification
     challenger_info = waiting_players.get(challenger_sid)
     if challenger_info:
-        print(f"DEBUG: SUCCESS - Broadcasting challenge_received to ALL (targeting {target_sid})")
+        # The challenger stays visible to the target even if outside its ELO window
+        lobby_index.pin(target_sid, challenger_sid)
+        broadcast_lobby_state()
+        lobby_log.debug("SUCCESS - Broadcasting challenge_received to ALL (targeting %s)", target_sid)
         # WORKAROUND: Broadcast to all, client checks target_sid
-        socketio.emit('challenge_received', {
+        outbox.emit('challenge_received', {
             'target_sid': target_sid,
             'challenger_sid': challenger_sid,
             'challenger_email': challenger_info['email'],
-            'rounds': rounds
+            'rounds': rounds,
+            'pack': pack
         }) 
     else:
-        print(f"DEBUG: FAILURE - Challenger {challenger_sid} not found in waiting_players")
+        lobby_log.debug("FAILURE - Challenger %s not found in waiting_players", challenger_sid)
         emit('error', {'message': 'You are not in the lobby. Please refresh.'})
 
 
 @socketio.on('decline_challenge')
+@timed(socket_latency, 'decline_challenge')
 def handle_decline_challenge(data):
     challenger_sid = data.get('challenger_sid')
+    lobby_index.unpin(request.sid, challenger_sid)
+    broadcast_lobby_state()
     # Notify challenger
-    emit('challenge_declined', {'message': 'Challenge declined'}, room=challenger_sid)
+    outbox.emit('challenge_declined', {'message': 'Challenge declined'}, room=challenger_sid)
 
 
 @socketio.on('accept_challenge')
+@timed(socket_latency, 'accept_challenge')
 def handle_accept_challenge(data):
     target_sid = request.sid
     challenger_sid = data.get('challenger_sid')
     rounds = data.get('rounds', WINNING_SCORE)  # Get rounds from challenge
+    pack = data.get('pack', wordbank.DEFAULT_PACK)
     
     # Validate rounds again
     if not isinstance(rounds, int) or rounds < 5 or rounds > 30:
         rounds = WINNING_SCORE
+    if not word_packs.exists(pack):
+        pack = wordbank.DEFAULT_PACK
+
+    # First use of a pack reads its file (in a native thread): before the lobby check below
+    if not load_pack_for(target_sid, pack):
+        return
 
     # Verify both are still in lobby
     if target_sid not in waiting_players or challenger_sid not in waiting_players:
         emit('error', {'message': 'Cannot start game. One of the players left.'})
         return
 
-    # Remove both from lobby
-    player1 = challenger_sid
-    player2 = target_sid
-    
+    # Bots never leave the lobby - their games go through the pool
+    if bot_pool.email_for(challenger_sid):
+        start_game_for_bot(target_sid, challenger_sid, rounds, pack)
+        return
+
+    start_game(challenger_sid, target_sid, rounds, pack)
+
+
+def load_pack_for(sid, pack):
+    """Make sure ``pack`` is in memory before a game starts with it; tells ``sid`` if it can't be."""
+    try:
+        word_pack(pack)
+    except (KeyError, OSError, ValueError) as e:
+        game_log.error("Word pack %s unavailable: %s", pack, e)
+        outbox.emit('error', {'message': 'Этот набор слов сейчас недоступен.'}, room=sid)
+        return False
+    return True
+
+
+def start_game(player1, player2, rounds, pack=wordbank.DEFAULT_PACK):
+    """Start a game between two players in the lobby (accepted challenge or quick match)."""
     # Capture emails before removing
     email1 = waiting_players[player1]['email']
     email2 = waiting_players[player2]['email']
     
-    del waiting_players[player1]
-    del waiting_players[player2]
+    lobby_leave(player1)
+    lobby_leave(player2)
+    set_presence(player1, IN_GAME)
+    set_presence(player2, IN_GAME)
     
     broadcast_lobby_state()
 
@@ -1162,82 +1610,152 @@ def handle_accept_challenge(data):
     socketio.server.enter_room(player1, room_id, namespace='/')
     socketio.server.enter_room(player2, room_id, namespace='/')
 
-    word, translation = random.choice(list(WORDS.items()))
-    translations = generate_translations(word, num_options=6)
-
-    game_data = {
-        'players': [player1, player2],
-        'emails': {player1: email1, player2: email2},
-        'word': word,
-        'translations': translations,
-        'scores': {player1: 0, player2: 0},
-        'answered': set(),
-        'round_over': False,
-        'winning_score': rounds  # Store game-specific winning score
-    }
+    db = get_db()
+    game_data = new_game(player1, player2, email1, email2, rounds)
+    pin_pack(game_data, pack)
+    load_word_queues(db, game_data)
+    first_round = deal_round(game_data)
+    word, translations = first_round['word'], first_round['translations']
 
     active_games[room_id] = game_data
 
     # Fetch names from DB
-    db = get_db()
     name1 = db.execute('SELECT name FROM users WHERE email = ?', (email1,)).fetchone()['name'] or email1
     name2 = db.execute('SELECT name FROM users WHERE email = ?', (email2,)).fetchone()['name'] or email2
 
-    socketio.emit('game_start', {
+    outbox.emit('game_start', {
         'word': word,
         'translations': translations,
         'opponent_connected': True,
         'winning_score': rounds,
         'opponent_name': name2,
-        'opponent_email': email2
-    }, room=player1, namespace='/')
+        'opponent_email': email2,
+        'pack': pack
+    }, room=player1)
 
-    socketio.emit('game_start', {
+    outbox.emit('game_start', {
         'word': word,
         'translations': translations,
         'opponent_connected': True,
         'winning_score': rounds,
         'opponent_name': name1,
-        'opponent_email': email1
-    }, room=player2, namespace='/')
-    
-    # Check if any player is a bot and start bot playing thread
-    player1_email = email1
-    player2_email = email2
-    bot_sid = None
-    
-    if player1_email in bot_emails:
-        bot_sid = player1
-    elif player2_email in bot_emails:
-        bot_sid = player2
-    
-    if bot_sid:
-        # Start bot playing thread
-        socketio.start_background_task(bot_play_game, room_id, bot_sid)
-        print(f"Started bot game task for room {room_id}")
+        'opponent_email': email1,
+        'pack': pack
+    }, room=player2)
+
+
+# --- Quick match ---
+@socketio.on('quick_match')
+@timed(socket_latency, 'quick_match')
+def handle_quick_match(data=None):
+    """Queue for an automatic opponent close in ELO; a bot steps in after QUICK_MATCH_BOT_AFTER."""
+    user = get_current_user()
+    if not user:
+        emit('error', {'message': 'Authentication required'})
+        return
+    if any(request.sid in game['players'] for game in active_games.values()):
+        return
+    rounds = (data or {}).get('rounds', WINNING_SCORE) if isinstance(data, dict) else WINNING_SCORE
+    if not isinstance(rounds, int) or rounds < 5 or rounds > 30:
+        rounds = WINNING_SCORE
+
+    if request.sid not in waiting_players:
+        lobby_join(request.sid, user['email'])
+        set_presence(request.sid, LOBBY, user['email'])
+        broadcast_lobby_state()
+
+    elo = lobby_index.entries[request.sid]['elo']
+    pair = match_queue.enqueue(request.sid, user['email'], elo, rounds)
+    if pair:
+        start_quick_match(*pair)
+    else:
+        outbox.emit('quick_match_status', {'status': 'searching', 'range': match_queue.base_range}, room=request.sid)
+
+
+@socketio.on('cancel_quick_match')
+@timed(socket_latency, 'cancel_quick_match')
+def handle_cancel_quick_match():
+    if match_queue.cancel(request.sid):
+        quick_matches.inc('cancelled')
+        outbox.emit('quick_match_status', {'status': 'cancelled'}, room=request.sid)
 
 
-def start_game_for_bot(challenger_sid, bot_sid, rounds):
-    """Start a game when bot auto-accepts challenge."""
+def start_quick_match(first, second):
+    """Both tickets left the queue; the one who waited longer picks the number of rounds."""
+    now = time.time()
+    if first['sid'] not in waiting_players or second['sid'] not in waiting_players:
+        # Someone left the lobby in the same tick: put the other back in line
+        for ticket in (first, second):
+            if ticket['sid'] in waiting_players:
+                match_queue.enqueue(ticket['sid'], ticket['email'], ticket['elo'], ticket['rounds'])
+        return
+    for ticket in (first, second):
+        quick_match_wait.observe(now - ticket['since'])
+    quick_matches.inc('human', amount=2)
+    lobby_log.info("Quick match: %s (%s) vs %s (%s)", first['email'], first['elo'], second['email'], second['elo'])
+    with app.app_context():
+        start_game(first['sid'], second['sid'], first['rounds'])
+
+
+def start_quick_match_bot(ticket):
+    """Nobody close enough showed up in time: the bot nearest in ELO with a free slot takes the game."""
+    if ticket['sid'] not in waiting_players:
+        return
+    candidates = [bot for bot in BOTS if bot_pool.has_capacity(bot['email'])]
+    if not candidates:
+        match_queue.requeue(ticket)  # every bot is full: try again on the next sweep
+        return
+    bot = min(candidates, key=lambda b: abs(lobby_index.entries.get(lobby_sid(b['email']), b)['elo'] - ticket['elo']))
+    quick_match_wait.observe(time.time() - ticket['since'])
+    quick_matches.inc('bot')
     with app.app_context():
-        # Check both are still in lobby
-        if challenger_sid not in waiting_players or bot_sid not in waiting_players:
+        if lobby_sid(bot['email']) not in waiting_players:
+            lobby_join(lobby_sid(bot['email']), bot['email'])
+        start_game_for_bot(ticket['sid'], lobby_sid(bot['email']), ticket['rounds'])
+
+
+def sweep_quick_match():
+    if not len(match_queue):
+        return
+    pairs, fallbacks = match_queue.sweep()
+    for first, second in pairs:
+        start_quick_match(first, second)
+    for ticket in fallbacks:
+        start_quick_match_bot(ticket)
+    now = time.time()
+    for ticket in match_queue.tickets.values():
+        outbox.emit('quick_match_status', {'status': 'searching', 'range': round(match_queue.window(ticket, now)),
+                                           'waited': round(now - ticket['since'])}, room=ticket['sid'])
+
+
+socketio.start_background_task(run_periodically, matchmaking.QUICK_MATCH_TICK, sweep_quick_match)
+
+
+def start_game_for_bot(challenger_sid, bot_lobby_sid, rounds, pack=wordbank.DEFAULT_PACK):
+    """Start a game when bot auto-accepts challenge.
+
+    The bot stays in the lobby; the game is played by a fresh virtual sid from
+    ``bot_pool``, so one bot can serve many challengers at once.
+    """
+    with app.app_context():
+        # Challenger may have started another game (double click) or left meanwhile
+        if challenger_sid not in waiting_players or bot_lobby_sid not in waiting_players:
             return
-        
+
+        email2 = waiting_players[bot_lobby_sid]['email']
+        bot_sid = bot_pool.acquire(email2)
+        if not bot_sid:
+            outbox.emit('error', {'message': 'Этот соперник сейчас занят. Попробуйте другого.'}, room=challenger_sid)
+            return
+
         player1 = challenger_sid
         player2 = bot_sid
-        
-        # Check if game already exists to prevent double threads
         room_id = f"room_{player1}_{player2}"
-        if room_id in active_games:
-            print(f"DEBUG: Game {room_id} already exists. Skipping duplicate start.")
-            return
 
         email1 = waiting_players[player1]['email']
-        email2 = waiting_players[player2]['email']
         
-        del waiting_players[player1]
-        del waiting_players[player2]
+        lobby_leave(player1)
+        set_presence(player1, IN_GAME)
         
         broadcast_lobby_state()
         
@@ -1246,44 +1764,38 @@ def start_game_for_bot(challenger_sid, bot_sid, rounds):
         # Skip enter_room for bot_sid as it's not a real socket connection
 
         
-        word, translation = random.choice(list(WORDS.items()))
-        translations = generate_translations(word, num_options=6)
-        
-        game_data = {
-            'players': [player1, player2],
-            'emails': {player1: email1, player2: email2},
-            'word': word,
-            'translations': translations,
-            'scores': {player1: 0, player2: 0},
-            'answered': set(),
-            'round_over': False,
-            'winning_score': rounds
-        }
+        db = get_db()
+        game_data = new_game(player1, player2, email1, email2, rounds)
+        pin_pack(game_data, pack)
+        load_word_queues(db, game_data)
+        first_round = deal_round(game_data)
+        word, translations = first_round['word'], first_round['translations']
         
         active_games[room_id] = game_data
         
         # Fetch names from DB
-        db = get_db()
         name1 = db.execute('SELECT name FROM users WHERE email = ?', (email1,)).fetchone()['name'] or email1
         name2 = db.execute('SELECT name FROM users WHERE email = ?', (email2,)).fetchone()['name'] or email2
         
-        socketio.emit('game_start', {
+        outbox.emit('game_start', {
             'word': word,
             'translations': translations,
             'opponent_connected': True,
             'winning_score': rounds,
             'opponent_name': name2,
-            'opponent_email': email2
-        }, room=player1, namespace='/')
+            'opponent_email': email2,
+            'pack': pack
+        }, room=player1)
         
-        socketio.emit('game_start', {
+        outbox.emit('game_start', {
             'word': word,
             'translations': translations,
             'opponent_connected': True,
             'winning_score': rounds,
             'opponent_name': name1,
-            'opponent_email': email1
-        }, room=player2, namespace='/')
+            'opponent_email': email1,
+            'pack': pack
+        }, room=player2)
         
         # Start bot playing thread
         socketio.start_background_task(bot_play_game, room_id, bot_sid)
@@ -1296,35 +1808,112 @@ import threading
 active_bot_threads = set()
 bot_thread_lock = threading.Lock()
 
-def get_bot_params_by_elo(elo):
-    """Dynamically calculate response time and accuracy based on ELO."""
-    # Mapping points: (elo, min_time, max_time, accuracy)
-    # 800  -> 6.0, 8.0, 0.35
-    # 1300 -> 3.0, 5.0, 0.65
-    # 1800 -> 1.0, 2.0, 0.90
-    
-    # Simple linear interpolation helper
-    def lerp(v0, v1, t):
-        return v0 + t * (v1 - v0)
-    
-    def get_t(e, e_min, e_max):
-        return max(0.0, min(1.0, (e - e_min) / (e_max - e_min)))
-
-    if elo < 1300:
-        t = get_t(elo, 800, 1300)
-        min_t = lerp(6.0, 3.0, t)
-        max_t = lerp(8.0, 5.0, t)
-        acc = lerp(0.35, 0.65, t)
-    else:
-        t = get_t(elo, 1300, 1800)
-        # Nerfed top-tier bots:
-        # Was: (3.0->1.0, 5.0->2.0)
-        # Now: (3.0 -> 2.0, 5.0 -> 3.5) - Human-like pro speed, not machine speed
-        min_t = lerp(3.0, 2.0, t)
-        max_t = lerp(5.0, 3.5, t) 
-        acc = lerp(0.65, 0.90, t)
-        
-    return (min_t, max_t), acc
+def pin_pack(game, pack):
+    """Play ``game`` with ``pack``: its current bank stays with the game to the end."""
+    game['pack'] = pack
+    game['bank'] = word_packs.get(pack)
+
+
+def load_word_queues(db, game):
+    """Pin the game to the current word bank and read each human player's spaced-repetition queue once."""
+    words = game.setdefault('bank', word_packs.default.current)
+    game['word_queues'] = {
+        sid: load_word_queue(db, email, words)
+        for sid, email in game['emails'].items() if email not in bot_emails
+    }
+
+
+def deal_round(game):
+    """Start the next round with a due word of one of the players, or a random word."""
+    words = game_words(game)
+    word = pick_round_word(game.get('word_queues'), words)
+    round_words.inc('review' if word else 'random')
+    return start_round(game, words, word=word)
+
+
+def emit_answer_results(game, sid, outcome):
+    for recipient, payload in answer_results(game, sid, outcome).items():
+        outbox.emit('answer_result', payload, room=recipient)
+
+
+def finish_game(room_id, winner_sid):
+    """Winning score reached: update ELO, log the game and send game_over to both players."""
+    # Give frontend a moment to process the score update
+    socketio.sleep(GAME_OVER_PAUSE)
+    game = active_games.get(room_id)
+    if not game:
+        return
+    loser_sid = opponent_of(game, winner_sid)
+
+    with app.app_context():
+        db = get_db()
+        winner_email = game['emails'].get(winner_sid)
+        loser_email = game['emails'].get(loser_sid)
+
+        # A bot finishes many games concurrently: read and update its ELO in one
+        # write transaction and apply deltas, so parallel results are never lost
+        db.execute('BEGIN IMMEDIATE')
+        winner_row = db.execute('SELECT elo FROM users WHERE email = ?', (winner_email,)).fetchone()
+        loser_row = db.execute('SELECT elo FROM users WHERE email = ?', (loser_email,)).fetchone()
+
+        winner_elo = winner_row['elo'] if winner_row else 1200
+        loser_elo = loser_row['elo'] if loser_row else 1200
+
+        new_winner_elo, new_loser_elo = calculate_elo(winner_elo, loser_elo)
+
+        db.execute('UPDATE users SET elo = elo + ? WHERE email = ?', (new_winner_elo - winner_elo, winner_email))
+        db.execute('UPDATE users SET elo = elo + ? WHERE email = ?', (new_loser_elo - loser_elo, loser_email))
+
+        # Log Game
+        cursor = db.execute('''
+            INSERT INTO games (player1_email, player2_email, player1_score, player2_score, winner_email)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (winner_email, loser_email, game['scores'][winner_sid], game['scores'][loser_sid], winner_email))
+        db.commit()
+        admin_feed.game_finished({
+            'id': cursor.lastrowid, 'player1_email': winner_email, 'player2_email': loser_email,
+            'player1_score': game['scores'][winner_sid], 'player2_score': game['scores'][loser_sid],
+            'winner_email': winner_email, 'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        })
+
+        # Fetch names for messages
+        winner_name = db.execute('SELECT name FROM users WHERE email = ?', (winner_email,)).fetchone()['name'] or winner_email
+        loser_name = db.execute('SELECT name FROM users WHERE email = ?', (loser_email,)).fetchone()['name'] or loser_email
+
+    # Bots stay in the lobby while playing: move them to their new ELO
+    lobby_index.update_user(winner_email, elo=new_winner_elo)
+    lobby_index.update_user(loser_email, elo=new_loser_elo)
+    broadcast_lobby_state()
+
+    outbox.emit('game_over', {
+        'winner': True,
+        'message': f'Поздравляем! Вы победили: {loser_name} 🏆',
+        'final_scores': game['scores'],
+        'elo_update': {'old': winner_elo, 'new': new_winner_elo}
+    }, room=winner_sid)
+
+    outbox.emit('game_over', {
+        'winner': False,
+        'message': f'Игра окончена. Победил {winner_name} 😔',
+        'final_scores': game['scores'],
+        'elo_update': {'old': loser_elo, 'new': new_loser_elo}
+    }, room=loser_sid)
+
+    active_games.pop(room_id, None)
+    leave_game_presence(game)
+    games_finished.inc('score')
+    if winner_email in bot_emails:
+        bot_wins.inc()
+
+
+def next_round(room_id):
+    """Round decided: pause, then deal the next word to the room."""
+    socketio.sleep(ROUND_PAUSE)
+    game = active_games.get(room_id)
+    if not game:
+        return
+    outbox.emit('new_round', deal_round(game), room=room_id)
+
 
 def bot_play_game(room_id, bot_sid):
     """Bot plays the game automatically with delays and accuracy based on config."""
@@ -1332,22 +1921,17 @@ def bot_play_game(room_id, bot_sid):
     
     with bot_thread_lock:
         if thread_id in active_bot_threads:
-            print(f"DEBUG: Duplicate bot thread prevented for {thread_id}")
+            bot_log.debug("Duplicate bot thread prevented for %s", thread_id)
             return
         active_bot_threads.add(thread_id)
         
-    print(f"DEBUG: Starting bot thread {thread_id}. Active threads: {len(active_bot_threads)}")
+    bot_log.debug("Starting bot thread %s. Active threads: %d", thread_id, len(active_bot_threads))
 
     try:
-        bot_email = waiting_players.get(bot_sid, {}).get('email') if bot_sid in waiting_players else None
-        
-        # If bot was removed from waiting_players, get from game emails
-        if not bot_email and room_id in active_games:
-            game = active_games[room_id]
-            bot_email = game['emails'].get(bot_sid)
+        bot_email = bot_pool.email_for(bot_sid)
         
         if not bot_email or bot_email not in bot_configs:
-            print(f"Bot config not found for {bot_sid}")
+            bot_log.warning("Bot config not found for %s", bot_sid)
             return
         
         # Create a local copy of config to modify based on dynamic ELO
@@ -1365,18 +1949,21 @@ def bot_play_game(room_id, bot_sid):
                     # This ensures if a bot loses rating, it actually plays worse (slower)
                     bot_config['response_time'], bot_config['accuracy'] = get_bot_params_by_elo(current_elo)
                     
-                    print(f"DEBUG: Bot {bot_config['name']} dynamic adjustment (ELO {current_elo}): Time={bot_config['response_time']}, Acc={bot_config['accuracy']:.2f}")
+                    bot_log.debug("Bot %s dynamic adjustment (ELO %s): Time=%s, Acc=%.2f",
+                                  bot_config['name'], current_elo, bot_config['response_time'], bot_config['accuracy'])
         except Exception as e:
-            print(f"Error fetching bot ELO: {e}")
+            bot_log.error("Error fetching bot ELO: %s", e)
 
-        print(f"DEBUG: Bot {bot_config['name']} started playing in {room_id}")
+        bot_log.debug("Bot %s started playing in %s", bot_config['name'], room_id)
         
+        policy = bot_policy(bot_config['response_time'], bot_config['accuracy'])
+
         while room_id in active_games:
             socketio.sleep(0.1)  # Check frequently
             
             game = active_games.get(room_id)
 
-            if not game or game.get('round_over'):
+            if not game or game.get('round_over') or game.get('detached'):
                 continue
             
             # Check if bot needs to answer
@@ -1385,213 +1972,53 @@ def bot_play_game(room_id, bot_sid):
             
             # Capture current word to ensure we answer the same round later
             current_word = game['word']
-
-            # Wait for response time
-            min_time, max_time = bot_config['response_time']
-            delay = random.uniform(min_time, max_time)
-            print(f"DEBUG: Bot {bot_config['name']} sleeping for {delay:.2f}s in {room_id}")
+            delay, answer = policy(current_word, game['translations'], game_words(game)[current_word], random)
+            bot_log.debug("Bot %s sleeping for %.2fs in %s", bot_config['name'], delay, room_id)
             socketio.sleep(delay)
-            print(f"DEBUG: Bot {bot_config['name']} woke up in {room_id}")
             
             # Double-check game still exists
-            if room_id not in active_games:
+            game = active_games.get(room_id)
+            if not game:
                 break
-            
-            game = active_games[room_id]
-            if bot_sid in game['answered'] or game.get('round_over'):
-                continue
                 
-            # Ensure we are still in the same round
-            if game['word'] != current_word:
+            # Ensure we are still in the same round and the game is not paused
+            if game['word'] != current_word or game.get('detached'):
                 continue
             
-            # Determine answer based on accuracy
-            word = game['word']
-            correct_answer = WORDS[word]
-            translations = game['translations']
-            
-            if random.random() < bot_config['accuracy']:
-                answer = correct_answer
-            else:
-                wrong = [t for t in translations if t != correct_answer]
-                answer = random.choice(wrong) if wrong else correct_answer
-            
-            # Submit answer - mark as answered and process
-            game['answered'].add(bot_sid)
-            
-            # Process the answer (similar to on_answer logic)
-            if answer == correct_answer:
-                game['scores'][bot_sid] += 1
-                print(f"DEBUG: Bot {bot_config['name']} answering CORRECTLY in {room_id}. Score: {game['scores']}")
-                
-                # Send results IMMEDIATELY so frontend updates score BEFORE game over
-                opponent = game['players'][0] if game['players'][1] == bot_sid else game['players'][1]
-                
-                socketio.emit('answer_result', {
-                    'correct': True,
-                    'your_score': game['scores'][bot_sid],
-                    'opponent_score': game['scores'][opponent],
-                    'correct_answer': correct_answer,
-                    'you_answered': True
-                }, room=bot_sid, namespace='/')
-                
-                socketio.emit('answer_result', {
-                    'correct': True,
-                    'your_score': game['scores'][opponent],
-                    'opponent_score': game['scores'][bot_sid],
-                    'correct_answer': correct_answer,
-                    'you_answered': False
-                }, room=opponent, namespace='/')
-                
-                # Check Win Condition
-                winning_score = game.get('winning_score', WINNING_SCORE)
-                if game['scores'][bot_sid] >= winning_score:
-                    print(f"DEBUG: Bot WON. Triggering Game Over.")
-                    # Give frontend a moment to process the score update
-                    socketio.sleep(0.5)
-                    
-                    # Bot won - trigger game over
-                    winner_sid = bot_sid
-                    loser_sid = game['players'][0] if game['players'][1] == bot_sid else game['players'][1]
-                    
-                    # ELO update
-                    with app.app_context():
-                        db = get_db()
-                        winner_email = game['emails'].get(winner_sid)
-                        loser_email = game['emails'].get(loser_sid)
-                        
-                        winner_row = db.execute('SELECT elo FROM users WHERE email = ?', (winner_email,)).fetchone()
-                        loser_row = db.execute('SELECT elo FROM users WHERE email = ?', (loser_email,)).fetchone()
-                        
-                        winner_elo = winner_row['elo'] if winner_row else 1200
-                        loser_elo = loser_row['elo'] if loser_row else 1200
-                        
-                        new_winner_elo, new_loser_elo = calculate_elo(winner_elo, loser_elo)
-                        
-                        db.execute('UPDATE users SET elo = ? WHERE email = ?', (new_winner_elo, winner_email))
-                        db.execute('UPDATE users SET elo = ? WHERE email = ?', (new_loser_elo, loser_email))
-                        
-                        # Log Game
-                        db.execute('''
-                            INSERT INTO games (player1_email, player2_email, player1_score, player2_score, winner_email)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (winner_email, loser_email, game['scores'][winner_sid], game['scores'][loser_sid], winner_email))
-                        
-                        db.commit()
-                        
-                        # Fetch names for messages
-                        winner_name = db.execute('SELECT name FROM users WHERE email = ?', (winner_email,)).fetchone()['name'] or winner_email
-                        loser_name = db.execute('SELECT name FROM users WHERE email = ?', (loser_email,)).fetchone()['name'] or loser_email
-
-                        socketio.emit('game_over', {
-                            'winner': True,
-                            'message': f'Поздравляем! Вы победили: {loser_name} 🏆',
-                            'final_scores': game['scores'],
-                            'elo_update': {'old': winner_elo, 'new': new_winner_elo}
-                        }, room=winner_sid, namespace='/')
-                        
-                        socketio.emit('game_over', {
-                            'winner': False,
-                            'message': f'Игра окончена. Победил {winner_name} 😔',
-                            'final_scores': game['scores'],
-                            'elo_update': {'old': loser_elo, 'new': new_loser_elo}
-                        }, room=loser_sid, namespace='/')
-                        
-                        del active_games[room_id]
-                        return
-                
-                game['round_over'] = True
-                
-                # New round after delay
-                socketio.sleep(2)
-                if room_id not in active_games:
-                    break
-                    
-                word, translation = random.choice(list(WORDS.items()))
-                translations = generate_translations(word, num_options=6)
-                
-                game['word'] = word
-                game['translations'] = translations
-                game['answered'] = set()
-                game['round_over'] = False
-                
-                print(f"DEBUG: Bot {bot_config['name']} starting new round after correct answer in {room_id}")
-                # Emit to room AND explicitly to opponent to be safe
-                socketio.emit('new_round', {
-                    'word': word,
-                    'translations': translations
-                }, room=room_id, namespace='/')
-                
-                socketio.emit('new_round', {
-                    'word': word,
-                    'translations': translations
-                }, room=opponent, namespace='/')
-                
-                print(f"DEBUG: Bot {bot_config['name']} submitted correct answer. Emitting new_round explicitly.")
-                
-            else:
-                print(f"DEBUG: Bot {bot_config['name']} answering INCORRECTLY in {room_id}")
-                print(f"DEBUG: Bot {bot_config['name']} answered INCORRECTLY. Score UNCHANGED: {game['scores']}")
-                # Wrong answer - match on_answer structure
-                opponent = game['players'][0] if game['players'][1] == bot_sid else game['players'][1]
-                
-                socketio.emit('answer_result', {
-                    'correct': False,
-                    'your_score': game['scores'][bot_sid],
-                    'opponent_score': game['scores'][opponent],
-                    'correct_answer': correct_answer,
-                    'you_answered': True
-                }, room=bot_sid, namespace='/')
-                
-                socketio.emit('answer_result', {
-                    'correct': False,
-                    'your_score': game['scores'][opponent],
-                    'opponent_score': game['scores'][bot_sid],
-                    'correct_answer': correct_answer,
-                    'you_answered': False
-                }, room=opponent, namespace='/')
-
-                # If both answered wrong
-                if len(game['answered']) >= 2 and not game.get('round_over'):
-                    game['round_over'] = True
-                    socketio.sleep(2)
-                    if room_id not in active_games:
-                        return
-                        
-                    word, translation = random.choice(list(WORDS.items()))
-                    translations = generate_translations(word, num_options=6)
-                    
-                    game['word'] = word
-                    game['translations'] = translations
-                    game['answered'] = set()
-                    game['round_over'] = False
-                    
-                    print(f"DEBUG: Bot processing BOTH WRONG in {room_id}")
-                    socketio.emit('new_round', {
-                        'word': word,
-                        'translations': translations
-                    }, room=room_id, namespace='/')
-                    
-                    socketio.emit('new_round', {
-                        'word': word,
-                        'translations': translations
-                    }, room=opponent, namespace='/')
-                    print(f"DEBUG: Bot {bot_config['name']} finished emitting new_round signals.")
+            outcome = apply_answer(game, bot_sid, answer, game_words(game))
+            if outcome is None:
+                continue
+
+            answers_total.inc(str(outcome['correct']).lower(), 'bot')
+            answer_log.debug("Bot %s answered %s in %s. Score: %s", bot_config['name'],
+                             'CORRECTLY' if outcome['correct'] else 'INCORRECTLY', room_id, game['scores'])
+            # Send results IMMEDIATELY so frontend updates score BEFORE game over
+            emit_answer_results(game, bot_sid, outcome)
+
+            if outcome['winner']:
+                game_log.info("Bot %s won in %s", bot_config['name'], room_id)
+                finish_game(room_id, bot_sid)
+                return
+
+            if outcome['round_over']:
+                next_round(room_id)
+                bot_log.debug("Round decided, new round in %s", room_id)
 
     except Exception as e:
-        print(f"CRITICAL ERROR in bot_play_game for {room_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        bot_log.exception("CRITICAL ERROR in bot_play_game for %s: %s", room_id, e)
     finally:
         active_bot_threads.discard(thread_id)
-        print(f"DEBUG: Bot thread finished for {thread_id}. Remaining threads: {len(active_bot_threads)}")
+        bot_pool.release(bot_sid)
+        bot_log.debug("Bot thread finished for %s. Remaining threads: %d", thread_id, len(active_bot_threads))
 
 
 
 
 @socketio.on('answer')
+@timed(socket_latency, 'answer')
 def on_answer(data):
-    print(f"DEBUG: on_answer received from {request.sid}: {data}")
+    received = time.perf_counter()
+    answer_log.debug("on_answer received from %s: %s", request.sid, data)
     room_id = None
     for r_id, game in active_games.items():
         if request.sid in game['players']:
@@ -1602,200 +2029,64 @@ def on_answer(data):
         return
 
     game = active_games[room_id]
+    if game.get('detached'):
+        return  # paused until the opponent reconnects
     
     # Initialize round/answer state if missing
     if 'answered' not in game: game['answered'] = set()
     if 'round_over' not in game: game['round_over'] = False
 
-    if game.get('round_over'):
-        return
-        
     word = game['word']
-    correct_translation = WORDS[word]
-
-    if request.sid in game['answered']:
+    outcome = apply_answer(game, request.sid, data['answer'], game_words(game))
+    if outcome is None:
         return
 
-    if data['answer'] == correct_translation:
-        game['scores'][request.sid] += 1
-        print(f"DEBUG: Player {request.sid} answered CORRECTLY. Score: {game['scores']}")
-        
-        # Emit answer_result IMMEDIATELY
-        opponent = game['players'][0] if game['players'][1] == request.sid else game['players'][1]
-        
-        socketio.emit('answer_result', {
-            'correct': True,
-            'your_score': game['scores'][request.sid],
-            'opponent_score': game['scores'][opponent],
-            'correct_answer': correct_translation,
-            'you_answered': True
-        }, room=request.sid, namespace='/')
-
-        socketio.emit('answer_result', {
-            'correct': True,
-            'your_score': game['scores'][opponent],
-            'opponent_score': game['scores'][request.sid],
-            'correct_answer': correct_translation,
-            'you_answered': False
-        }, room=opponent, namespace='/')
-        
-        # Log Word Stats (Correct)
-        with app.app_context():
-            db = get_db()
-            answering_email = game['emails'].get(request.sid)
-            if answering_email:
-                 db.execute('''
-                    INSERT INTO user_words (user_email, word, correct_count, wrong_count, status, last_seen)
-                    VALUES (?, ?, 1, 0, 'learned', CURRENT_TIMESTAMP)
-                    ON CONFLICT(user_email, word) DO UPDATE SET
-                    correct_count = correct_count + 1,
-                    status = CASE WHEN (correct_count + 1) > (wrong_count * 2) THEN 'learned' ELSE status END, -- Auto-promote if doing well
-                    last_seen = CURRENT_TIMESTAMP
-                ''', (answering_email, word))
-                 db.commit()
-        
-        # Check Win Condition
-        # Check Win Condition - use game-specific winning score
-        winning_score = game.get('winning_score', WINNING_SCORE)
-        print(f"DEBUG: Win Check (Player) - Score: {game['scores'][request.sid]}, Target: {winning_score}")
-        
-        if game['scores'][request.sid] >= winning_score:
-            print(f"DEBUG: Player WON. Triggering Game Over.")
-            # Give frontend a moment
-            socketio.sleep(0.5)
-            
-            winner_sid = request.sid
-            loser_sid = game['players'][0] if game['players'][1] == request.sid else game['players'][1]
-            
-            # --- ELO UPDATE ---
-            with app.app_context():
-                db = get_db()
-                
-                winner_email = game['emails'].get(winner_sid)
-                loser_email = game['emails'].get(loser_sid)
-                
-                winner_row = db.execute('SELECT elo FROM users WHERE email = ?', (winner_email,)).fetchone()
-                loser_row = db.execute('SELECT elo FROM users WHERE email = ?', (loser_email,)).fetchone()
-                
-                winner_elo = winner_row['elo'] if winner_row else 1200
-                loser_elo = loser_row['elo'] if loser_row else 1200
-                
-                new_winner_elo, new_loser_elo = calculate_elo(winner_elo, loser_elo)
-                
-                # Update DB
-                db.execute('UPDATE users SET elo = ? WHERE email = ?', (new_winner_elo, winner_email))
-                db.execute('UPDATE users SET elo = ? WHERE email = ?', (new_loser_elo, loser_email))
-                db.commit()
-                
-                
-                # Fetch names for messages
-                winner_name = db.execute('SELECT name FROM users WHERE email = ?', (winner_email,)).fetchone()['name'] or winner_email
-                loser_name = db.execute('SELECT name FROM users WHERE email = ?', (loser_email,)).fetchone()['name'] or loser_email
-
-                # Log Game
-                db.execute('''
-                    INSERT INTO games (player1_email, player2_email, player1_score, player2_score, winner_email)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (winner_email, loser_email, game['scores'][winner_sid], game['scores'][loser_sid], winner_email))
-                db.commit()
-
-                socketio.emit('game_over', {
-                    'winner': True,
-                    'message': f'Поздравляем! Вы победили: {loser_name} 🏆',
-                    'final_scores': game['scores'],
-                    'elo_update': {'old': winner_elo, 'new': new_winner_elo}
-                }, room=winner_sid, namespace='/')
-                
-                socketio.emit('game_over', {
-                    'winner': False,
-                    'message': f'Игра окончена. Победил {winner_name} 😔',
-                    'final_scores': game['scores'],
-                    'elo_update': {'old': loser_elo, 'new': new_loser_elo}
-                }, room=loser_sid, namespace='/')
-                
-                del active_games[room_id]
-                return
-            
-        game['round_over'] = True
-        
-        # New Round
-        socketio.sleep(2)
-        if room_id not in active_games:
-            return
-            
-        word, translation = random.choice(list(WORDS.items()))
-        translations = generate_translations(word, num_options=6)
-
-        game['word'] = word
-        game['translations'] = translations
-        game['answered'] = set()
-        game['round_over'] = False
+    answers_total.inc(str(outcome['correct']).lower(), 'human')
+    answer_log.debug("Player %s answered %s. Score: %s", request.sid,
+                     'CORRECTLY' if outcome['correct'] else 'INCORRECTLY', game['scores'])
+    # Emit answer_result IMMEDIATELY
+    emit_answer_results(game, request.sid, outcome)
+    outbox.after_flush(lambda: answer_latency.observe(time.perf_counter() - received))
 
-        print(f"DEBUG: Player {request.sid} correct - emitting new round in {room_id}")
-        socketio.emit('new_round', {
-            'word': word,
-            'translations': translations
-        }, room=room_id, namespace='/')
-        
-    else:
-        # Wrong Answer
-        game['answered'].add(request.sid)
-        opponent = game['players'][0] if game['players'][1] == request.sid else game['players'][1]
-        
-        socketio.emit('answer_result', {
-            'correct': False,
-            'your_score': game['scores'][request.sid],
-            'opponent_score': game['scores'][opponent],
-            'correct_answer': correct_translation,
-            'you_answered': True
-        }, room=request.sid, namespace='/')
-        
-        socketio.emit('answer_result', {
-            'correct': False,
-            'your_score': game['scores'][opponent],
-            'opponent_score': game['scores'][request.sid],
-            'correct_answer': correct_translation,
-            'you_answered': False
-        }, room=opponent, namespace='/')
-
-        # Log Word Stats (Wrong)
-        with app.app_context():
-            db = get_db()
-            answering_email = game['emails'].get(request.sid)
-            if answering_email:
-                 db.execute('''
-                    INSERT INTO user_words (user_email, word, correct_count, wrong_count, status, last_seen)
-                    VALUES (?, ?, 0, 1, 'learning', CURRENT_TIMESTAMP)
-                    ON CONFLICT(user_email, word) DO UPDATE SET
-                    wrong_count = wrong_count + 1,
-                    status = 'learning',
-                    last_seen = CURRENT_TIMESTAMP
-                ''', (answering_email, word))
-                 db.commit()
+    queue = game.get('word_queues', {}).get(request.sid)
+    if queue is not None:
+        queue.record(word, outcome['correct'])
 
-        # If both answered wrong
-        if len(game['answered']) >= 2 and not game.get('round_over'):
-            game['round_over'] = True
-            socketio.sleep(2)
-            if room_id not in active_games:
-                return
-                
-            word, translation = random.choice(list(WORDS.items()))
-            translations = generate_translations(word, num_options=6)
-
-            game['word'] = word
-            game['translations'] = translations
-            game['answered'] = set()
-            game['round_over'] = False
-
-            print(f"DEBUG: Player {request.sid} processing BOTH WRONG - new round in {room_id}")
-            socketio.emit('new_round', {
-                'word': word,
-                'translations': translations
-            }, room=room_id, namespace='/')
+    # Log Word Stats
+    with app.app_context():
+        db = get_db()
+        answering_email = game['emails'].get(request.sid)
+        if answering_email and outcome['correct']:
+             db.execute('''
+                INSERT INTO user_words (user_email, word, correct_count, wrong_count, status, last_seen)
+                VALUES (?, ?, 1, 0, 'learned', CURRENT_TIMESTAMP)
+                ON CONFLICT(user_email, word) DO UPDATE SET
+                correct_count = correct_count + 1,
+                status = CASE WHEN (correct_count + 1) > (wrong_count * 2) THEN 'learned' ELSE status END, -- Auto-promote if doing well
+                last_seen = CURRENT_TIMESTAMP
+            ''', (answering_email, word))
+             db.commit()
+        elif answering_email:
+             db.execute('''
+                INSERT INTO user_words (user_email, word, correct_count, wrong_count, status, last_seen)
+                VALUES (?, ?, 0, 1, 'learning', CURRENT_TIMESTAMP)
+                ON CONFLICT(user_email, word) DO UPDATE SET
+                wrong_count = wrong_count + 1,
+                status = 'learning',
+                last_seen = CURRENT_TIMESTAMP
+            ''', (answering_email, word))
+             db.commit()
+
+    if outcome['winner']:
+        game_log.info("Player %s won in %s", request.sid, room_id)
+        finish_game(room_id, request.sid)
+    elif outcome['round_over']:
+        game_log.debug("Round decided by %s - new round in %s", request.sid, room_id)
+        next_round(room_id)
 
 
 @socketio.on('surrender')
+@timed(socket_latency, 'surrender')
 def handle_surrender():
     # Find game
     room_id = None
@@ -1811,20 +2102,194 @@ def handle_surrender():
     loser = request.sid
     winner = game['players'][0] if game['players'][1] == loser else game['players'][1]
 
-    socketio.emit('game_over', {
+    outbox.emit('game_over', {
         'winner': True,
         'message': 'Соперник сдался! Вы победили!',
         'final_scores': game['scores'],
         'elo_update': None # Simpler to skip complex ELO logic on surrender for MVP or apply penalty later
-    }, room=winner, namespace='/')
+    }, room=winner)
 
-    socketio.emit('game_over', {
+    outbox.emit('game_over', {
         'winner': False,
         'message': 'Вы сдались.',
         'final_scores': game['scores']
-    }, room=loser, namespace='/')
+    }, room=loser)
 
     del active_games[room_id]
+    leave_game_presence(game)
+    games_finished.inc('surrender')
+    if game['emails'].get(winner) in bot_emails:
+        bot_wins.inc()
+
+
+# --- Admin namespace ---
+def admin_counters():
+    return {
+        'active_games': len(active_games),
+        'paused_games': sum(1 for game in active_games.values() if game.get('detached')),
+        'users_online': len(presence.connections),
+        'lobby': len(waiting_players),
+        'quick_match_queue': len(match_queue),
+        'bot_games': bot_pool.active(),
+    }
+
+
+@socketio.on('connect', namespace=adminfeed.ADMIN_NAMESPACE)
+def handle_admin_connect(auth=None):
+    user = get_current_user()
+    if not user or not is_admin(user['email']):
+        auth_log.warning('Non-admin tried to open the admin feed: %s', user and user['email'])
+        return False
+    admin_feed.connect(request.sid, get_db(), admin_counters())
+
+
+@socketio.on('disconnect', namespace=adminfeed.ADMIN_NAMESPACE)
+def handle_admin_disconnect():
+    admin_feed.disconnect(request.sid)
+
+
+def push_admin_counters():
+    if admin_feed.admins:
+        admin_feed.update_counters(admin_counters())
+
+
+socketio.start_background_task(run_periodically, adminfeed.ADMIN_TICK, push_admin_counters)
+
+
+# --- Snapshots and reconnects ---
+# active_games is written to disk every SNAPSHOT_INTERVAL (see snapshot.py) and read back at startup;
+# a player who drops out keeps the seat for RECONNECT_GRACE seconds
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'games.snapshot.json')
+snapshot_stats = {'writes': 0, 'bytes': 0, 'last_write': None, 'last_write_ms': None,
+                  'restored_games': 0, 'reattached': 0, 'expired': 0}
+snapshot_last = {'games': None}
+
+
+def save_snapshot(blocking=False):
+    """Write the games if they changed since the last write. Returns True when written.
+
+    The document is built on the hub in one go (no other greenlet runs meanwhile), then
+    written and fsynced from a native thread, so the game loop never waits for the disk.
+    """
+    doc = snapshot.dump_games(active_games, bot_emails)
+    if doc['games'] == snapshot_last['games']:
+        return False
+    data = snapshot.encode(doc)
+    started = time.perf_counter()
+    if blocking:
+        snapshot.write_atomic(SNAPSHOT_PATH, data)
+    else:
+        tpool.execute(snapshot.write_atomic, SNAPSHOT_PATH, data)
+    elapsed = time.perf_counter() - started
+    snapshot_write_seconds.observe(elapsed)
+    snapshot_last['games'] = doc['games']
+    snapshot_stats.update(writes=snapshot_stats['writes'] + 1, bytes=len(data), last_write=doc['saved_at'],
+                          last_write_ms=round(elapsed * 1000, 1))
+    return True
+
+
+def restore_snapshot():
+    """Bring back the games of the previous process; their players have the grace window to reconnect."""
+    doc = snapshot.read(SNAPSHOT_PATH, max_age=snapshot.RECONNECT_GRACE)
+    if not doc:
+        return 0
+    restored = 0
+    with app.app_context():
+        db = get_db()
+        for room_id, game in snapshot.load_games(doc).items():
+            bot_sids = []
+            for sid in list(game['players']):
+                if sid.startswith(snapshot.BOT_PREFIX):
+                    bot_sid = bot_pool.acquire(game['emails'][sid])
+                    if not bot_sid:
+                        break
+                    snapshot.rename_sid(game, sid, bot_sid)
+                    bot_sids.append(bot_sid)
+            else:
+                try:
+                    pin_pack(game, game.get('pack') or wordbank.DEFAULT_PACK)
+                except (KeyError, OSError, ValueError):
+                    pin_pack(game, wordbank.DEFAULT_PACK)  # pack gone: its word is re-dealt below
+                load_word_queues(db, game)
+                # The pending next_round died with the old process; a word gone from the bank is re-dealt
+                if game['round_over'] or game['word'] not in game_words(game):
+                    deal_round(game)
+                active_games[room_id] = game
+                for bot_sid in bot_sids:
+                    socketio.start_background_task(bot_play_game, room_id, bot_sid)
+                restored += 1
+                continue
+            for bot_sid in bot_sids:
+                bot_pool.release(bot_sid)
+            game_log.warning("Snapshot game %s not restored: bot pool is full", room_id)
+    snapshot_stats['restored_games'] = restored
+    game_log.info("Restored %d games from %s", restored, SNAPSHOT_PATH)
+    return restored
+
+
+def reattach_game(sid, email):
+    """Give a reconnected player their seat back and resend the current round. Returns True if there was one."""
+    ghost = snapshot.placeholder(email)
+    room_id = next((r_id for r_id, game in active_games.items() if ghost in game['players']), None)
+    if room_id is None:
+        return False
+    game = active_games[room_id]
+    snapshot.reattach(game, email, sid)
+    socketio.server.enter_room(sid, room_id, namespace='/')
+    set_presence(sid, IN_GAME, email)
+
+    opponent = opponent_of(game, sid)
+    opponent_email = game['emails'][opponent]
+    row = get_db().execute('SELECT name FROM users WHERE email = ?', (opponent_email,)).fetchone()
+    outbox.emit('game_start', {
+        'word': game['word'],
+        'translations': game['translations'],
+        'opponent_connected': not snapshot.is_placeholder(opponent),
+        'winning_score': game['winning_score'],
+        'opponent_name': (row['name'] if row else None) or opponent_email,
+        'opponent_email': opponent_email,
+        'resumed': True,
+        'your_score': game['scores'][sid],
+        'opponent_score': game['scores'][opponent],
+        'answered': sid in game['answered'] or game['round_over'],
+        'pack': game.get('pack', wordbank.DEFAULT_PACK)
+    }, room=sid)
+    outbox.emit('opponent_reconnected', room=opponent)
+    reconnects.inc('reattached')
+    snapshot_stats['reattached'] += 1
+    game_log.info("Player %s rejoined %s as %s", email, room_id, sid)
+    return True
+
+
+def expire_detached_games(now=None):
+    """End paused games whose player did not come back within RECONNECT_GRACE."""
+    now = time.time() if now is None else now
+    for room_id, game in list(active_games.items()):
+        detached = game.get('detached')
+        if not detached or now - min(detached.values()) < snapshot.RECONNECT_GRACE:
+            continue
+        for sid in game['players']:
+            if not snapshot.is_placeholder(sid):
+                outbox.emit('opponent_disconnected', room=sid)
+        del active_games[room_id]
+        leave_game_presence(game)
+        games_finished.inc('disconnect')
+        reconnects.inc('expired')
+        snapshot_stats['expired'] += 1
+
+
+startup.trace.mark('handlers')
+restore_snapshot()
+startup.trace.mark('restore_snapshot')
+if snapshot.SNAPSHOT_INTERVAL > 0:
+    socketio.start_background_task(run_periodically, snapshot.SNAPSHOT_INTERVAL, save_snapshot)
+    atexit.register(save_snapshot, blocking=True)
+socketio.start_background_task(run_periodically, snapshot.RECONNECT_TICK, expire_detached_games)
+
+startup.trace.finish()
+api_log.info("Startup took %s", startup.trace.summary())
+if startup.STARTUP_TRACE:
+    print(startup.trace.table(), flush=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+"""Content-hashed manifest of the sound files.
+
+Built once at startup and kept in memory. ``get()`` re-stats the directory at
+most every ``check_interval`` seconds and re-hashes only files whose mtime or
+size changed, so ``/api/sounds`` neither lists the directory nor reads files
+per request.
+
+Every entry carries a versioned URL (``/sounds/<name>?v=<hash>``) that nginx
+serves as immutable; the manifest itself has an ETag derived from all hashes.
+"""
+import hashlib
+import logging
+import os
+import time
+
+log = logging.getLogger('ingals.api')
+
+SOUNDS_DIR = os.getenv('SOUNDS_DIR', '/app/sounds_scan')
+SOUNDS_CHECK_INTERVAL = float(os.getenv('SOUNDS_CHECK_INTERVAL', 5))
+HASH_LENGTH = 12
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class AssetManifest:
+    def __init__(self, directory, url_prefix, extensions=('.mp3',), check_interval=SOUNDS_CHECK_INTERVAL):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.extensions = extensions
+        self.check_interval = check_interval
+        self.files = {}  # name -> (mtime_ns, size, hash)
+        self.entries = []
+        self.etag = None
+        self.checked_at = None
+        self.stats = {'builds': 0, 'files_hashed': 0}
+
+    def _scan(self):
+        if not os.path.isdir(self.directory):
+            return {}
+        found = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    st = entry.stat()
+                    found[entry.name] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def refresh(self):
+        """Re-stat the directory; rebuild the manifest if anything changed. Returns True on rebuild."""
+        self.checked_at = time.monotonic()
+        found = self._scan()
+        if self.etag is not None and found == {name: meta[:2] for name, meta in self.files.items()}:
+            return False
+
+        files = {}
+        for name, (mtime_ns, size) in found.items():
+            old = self.files.get(name)
+            if old and old[:2] == (mtime_ns, size):
+                files[name] = old
+                continue
+            try:
+                files[name] = (mtime_ns, size, file_hash(os.path.join(self.directory, name)))
+            except OSError as e:  # removed between scan and read
+                log.warning("Skipping asset %s: %s", name, e)
+                continue
+            self.stats['files_hashed'] += 1
+
+        self.files = files
+        self.entries = [
+            {'name': name, 'hash': digest, 'size': size, 'url': f'{self.url_prefix}{name}?v={digest}'}
+            for name, (_, size, digest) in sorted(files.items())
+        ]
+        self.etag = hashlib.sha256(
+            ''.join(f"{e['name']}:{e['hash']};" for e in self.entries).encode()).hexdigest()[:HASH_LENGTH]
+        self.stats['builds'] += 1
+        log.info("Asset manifest %s: %d files, etag %s", self.directory, len(self.entries), self.etag)
+        return True
+
+    def get(self):
+        if self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh()
+        return self.entries, self.etag
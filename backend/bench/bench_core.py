@@ -0,0 +1,318 @@
+"""Micro-benchmarks for the hot pure functions in app.py with a regression gate.
+
+    python bench/bench_core.py                      # run and compare with baselines.json
+    python bench/bench_core.py --update-baseline    # record new baselines
+    python bench/bench_core.py --max-regression 15  # fail if anything is >15% slower (micro cases: --max-regression-micro)
+    python bench/bench_core.py --only lobby         # run a subset (substring match)
+
+Timings are divided by a fixed pure-Python calibration loop measured just
+before each case, so baselines recorded on one machine stay comparable on another.
+Cases that take a few microseconds are timed as a batch of ``BATCH`` calls over
+varied, seeded inputs (a single call is mostly timer and cache noise) and
+reported per call. Each case is compared by its median over the rounds; on a
+shared VM single rounds still swing by +-30%, so baselines are recorded with at
+least ``BASELINE_ROUNDS`` rounds and cases under ``MICRO_SECONDS`` per call get
+the wider --max-regression-micro tolerance. The garbage collector is off while
+timing, and a case over its tolerance is measured once more before it counts.
+Exit code is 1 when a case still regresses by more than its tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+
+# app.py creates its database on import - point it at a scratch directory
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='ingals-bench-'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import app  # noqa: E402
+from lobby import LobbyIndex  # noqa: E402
+from matchmaking import MatchQueue  # noqa: E402
+import wordbank  # noqa: E402
+
+
+def measure(func, min_time=0.3, repeat=7):
+    """Best per-call time in seconds (auto-calibrated loop count).
+
+    Like timeit, the garbage collector is off while timing so a collection landing in one
+    loop does not decide the result.
+    """
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / repeat or number >= 1 << 20:
+                break
+            number *= 2
+        best = elapsed / number
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+BATCH = 1000  # calls per timing for microsecond-scale cases
+BASELINE_ROUNDS = 9
+MICRO_SECONDS = 10e-6
+
+
+def batched(func, inputs):
+    """One timing = ``func(*args)`` for each of ``inputs``; ``calls`` turns it back into per call."""
+    def run():
+        for args in inputs:
+            func(*args)
+    run.calls = len(inputs)
+    return run
+
+
+def calibration():
+    total = 0
+    for i in range(100_000):
+        total += i * i % 7
+    return total
+
+
+# --- Fixtures ---
+
+def synthetic_words(size):
+    words = dict(list(app.word_packs.default.current.items())[:size])
+    i = 0
+    while len(words) < size:
+        words[f'word{i}'] = f'перевод{i}'
+        i += 1
+    return words
+
+
+def seed_users(db, count):
+    db.executemany('INSERT OR IGNORE INTO users (email, name, elo) VALUES (?, ?, ?)',
+                   [(f'bench{i}@example.com', f'Bench {i}', 800 + i % 1200) for i in range(count)])
+    db.commit()
+
+
+def seed_games(db, email, own_games, other_games):
+    if db.execute('SELECT 1 FROM games WHERE player1_email = ? LIMIT 1', (email,)).fetchone():
+        return
+    rng = random.Random(42)
+    rows = []
+    for i in range(own_games):
+        opponent = f'bench{rng.randrange(1000)}@example.com'
+        rows.append((email, opponent, 10, rng.randrange(10), email))
+    for i in range(other_games):
+        p1, p2 = f'bench{rng.randrange(1000)}@example.com', f'bench{rng.randrange(1000)}@example.com'
+        rows.append((p1, p2, 10, rng.randrange(10), p1))
+    db.executemany('''
+        INSERT INTO games (player1_email, player2_email, player1_score, player2_score, winner_email)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.executemany('''
+        INSERT OR IGNORE INTO user_words (user_email, word, correct_count, wrong_count, status)
+        VALUES (?, ?, 1, 0, 'learned')
+    ''', [(email, w) for w in list(app.word_packs.default.current)[:2000]])
+    db.commit()
+
+
+# --- Cases ---
+
+def case_generate_translations():
+    original = app.word_packs.default.current
+    try:
+        for size in (3_000, 10_000, 30_000, 100_000):
+            app.word_packs.default.current = bank = wordbank.WordBank(synthetic_words(size), f'bench-{size}')
+            words = random.Random(size).choices(list(bank), k=BATCH)
+            yield f'generate_translations[{size}]', batched(app.generate_translations, [(w, 6) for w in words])
+    finally:
+        app.word_packs.default.current = original
+
+
+def case_calculate_elo():
+    rng = random.Random(1)
+    yield 'calculate_elo', batched(app.calculate_elo,
+                                   [(rng.randrange(800, 2000), rng.randrange(800, 2000)) for _ in range(BATCH)])
+
+
+def case_get_bot_params_by_elo():
+    rng = random.Random(2)
+    yield 'get_bot_params_by_elo', batched(app.get_bot_params_by_elo, [(rng.randrange(700, 1900),) for _ in range(BATCH)])
+
+
+def case_broadcast_lobby_state():
+    """One player re-enters a lobby of N, every 10th player watching with the default window."""
+    original = dict(app.waiting_players), app.lobby_index
+    try:
+        for count in (10, 1_000, 10_000):
+            app.waiting_players.clear()
+            index = app.lobby_index = LobbyIndex()
+            for i in range(count):
+                app.waiting_players[f'sid{i}'] = {'email': f'bench{i}@example.com'}
+                index.add(f'sid{i}', f'bench{i}@example.com', f'Bench {i}', 800 + i % 1200)
+            for i in range(0, count, 10):
+                index.subscribe(f'sid{i}', f'bench{i}@example.com', 800 + i % 1200)
+            index.take_dirty()
+            mover = dict(index.entries[f'sid{count // 2}'])
+
+            def run():
+                index.remove(mover['sid'])
+                index.add(mover['sid'], mover['email'], mover['name'], mover['elo'])
+                app.flush_lobby_views()
+                app.outbox.flush()
+            yield f'broadcast_lobby_state[{count}]', run
+    finally:
+        app.waiting_players.clear()
+        app.waiting_players.update(original[0])
+        app.lobby_index = original[1]
+
+
+def case_quick_match_enqueue():
+    """Peak-hour burst: players with random ELO keep arriving; most pair on arrival."""
+    queue = MatchQueue()
+    rng = random.Random(7)
+    counter = iter(range(1 << 30))
+
+    def run():
+        for _ in range(BATCH):
+            i = next(counter)
+            queue.enqueue(f'sid{i}', f'bench{i}@example.com', rng.randrange(800, 2000), 10, now=i * 0.002)
+    run.calls = BATCH
+    yield 'quick_match_enqueue', run
+
+
+def case_profile_history():
+    email = 'bench_profile@example.com'
+    with app.app.app_context():
+        db = app.get_db()
+        seed_users(db, 1_000)
+        db.execute('INSERT OR IGNORE INTO users (email, name, elo) VALUES (?, ?, ?)', (email, 'Bench', 1200))
+        seed_games(db, email, own_games=2_000, other_games=50_000)
+
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'email': email, 'token': 'bench'}
+    yield 'profile_history[/api/profile/me]', lambda: client.get('/api/profile/me')
+    yield 'profile_history[/api/me/stats]', lambda: client.get('/api/me/stats')
+
+
+CASES = [
+    case_generate_translations,
+    case_calculate_elo,
+    case_get_bot_params_by_elo,
+    case_broadcast_lobby_state,
+    case_quick_match_enqueue,
+    case_profile_history,
+]
+
+
+def run(only=None, rounds=5, names=None):
+    """Median of ``rounds`` passes over the whole suite - one lucky or unlucky pass doesn't decide.
+
+    Each timing is normalized by a calibration run taken right before it, so CPU frequency
+    and neighbours changing during the run cancel out instead of skewing whole passes.
+    """
+    results = {}
+    for _ in range(rounds):
+        for case in CASES:
+            for name, func in case():
+                if (only and only not in name) or (names is not None and name not in names):
+                    continue
+                reference = measure(calibration, min_time=0.1)
+                seconds = measure(func) / getattr(func, 'calls', 1)
+                results.setdefault(name, []).append((seconds / reference, seconds))
+    summary = {}
+    for name, timings in results.items():
+        summary[name] = {'normalized': statistics.median(n for n, _ in timings),
+                         'seconds': statistics.median(s for _, s in timings)}
+        print(f'{name:<45}{summary[name]["seconds"] * 1e6:>14.2f} us')
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--max-regression', type=float, default=float(os.getenv('BENCH_MAX_REGRESSION', 25)),
+                        help='allowed slowdown in percent (default 25, env BENCH_MAX_REGRESSION)')
+    parser.add_argument('--max-regression-micro', type=float,
+                        default=float(os.getenv('BENCH_MAX_REGRESSION_MICRO', 40)),
+                        help=f'allowed slowdown for cases under {MICRO_SECONDS * 1e6:.0f} us per call '
+                             '(default 40, env BENCH_MAX_REGRESSION_MICRO)')
+    parser.add_argument('--only', help='run only cases whose name contains this string')
+    parser.add_argument('--rounds', type=int, default=5, help='passes over the suite, the median counts')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    results = run(args.only, max(args.rounds, BASELINE_ROUNDS) if args.update_baseline else args.rounds)
+
+    if args.update_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baselines = json.load(f)
+        for name, r in results.items():
+            baselines[name] = round(r['normalized'], 6)
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write('\n')
+        print(f'Baselines written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baselines recorded yet, run with --update-baseline')
+        return 0
+    with open(args.baseline) as f:
+        baselines = json.load(f)
+
+    def change(name):
+        return (results[name]['normalized'] / baselines[name] - 1) * 100
+
+    def allowed(name):
+        return args.max_regression_micro if results[name]['seconds'] < MICRO_SECONDS else args.max_regression
+
+    # A real regression shows up again; a hiccup of the machine doesn't - re-measure before failing.
+    suspects = [name for name in results if baselines.get(name) and change(name) > allowed(name)]
+    if suspects:
+        print(f'\nRe-measuring {", ".join(suspects)}')
+        for name, r in run(rounds=args.rounds, names=set(suspects)).items():
+            if r['normalized'] < results[name]['normalized']:
+                results[name] = r
+
+    failed = []
+    print(f"\n{'case':<45}{'change':>10}")
+    for name in results:
+        if not baselines.get(name):
+            print(f'{name:<45}{"new":>10}')
+            continue
+        flag = ''
+        if change(name) > allowed(name):
+            failed.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<45}{change(name):>+9.1f}%{flag}')
+
+    if failed:
+        print(f'\n{len(failed)} case(s) slower than allowed ({args.max_regression}%, '
+              f'{args.max_regression_micro}% under {MICRO_SECONDS * 1e6:.0f} us): {", ".join(failed)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Offline ELO replay and rating audit.
+
+    python bench/elo_audit.py                              # data/users.db, K=32
+    python bench/elo_audit.py --db /backup/users.db --k 16 24 32 40
+    python bench/elo_audit.py --csv drift.csv --threshold 25
+    python bench/elo_audit.py --synthetic 20000000         # throughput on random games, no DB
+
+Replays the whole ``games`` table in insertion order (``finish_game`` writes
+a row per decided game: winner, loser) with the same formula and rounding as
+``engine.calculate_elo``, starting every player at 1200 (bots at their
+configured ELO), and compares the result with ``users.elo``. Admin edits,
+lost updates and corrupted rows show up as drift.
+
+The replay is sequential by nature, so it is cut into waves instead: a game
+goes into the wave after the last wave of either of its players. A wave
+holds every player at most once, and applying waves in order gives exactly
+the sequential result, each wave being one NumPy update for all its games
+and all K-factors at once. The per-K log-loss of the pre-game expected score
+tells which K predicts the results best.
+
+Reads the database only (a copy is fine); the live server is not involved.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from engine import BOTS, calculate_elo  # noqa: E402
+
+DEFAULT_DB = os.path.join(os.getenv('DATA_DIR', os.path.join(BACKEND_DIR, 'data')), 'users.db')
+START_ELO = 1200
+
+
+def load_games(db):
+    """(winner, loser) user ids in insertion order, plus the number of rows skipped for a missing id."""
+    rows = db.execute('''
+        SELECT winner_id, CASE WHEN winner_id = player1_id THEN player2_id ELSE player1_id END
+        FROM games WHERE winner_id IS NOT NULL AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+        ORDER BY id
+    ''')
+    pairs = np.fromiter((x for row in rows for x in row), dtype=np.int64).reshape(-1, 2)
+    total = db.execute('SELECT count(*) FROM games').fetchone()[0]
+    return pairs[:, 0], pairs[:, 1], total - len(pairs)
+
+
+def load_users(db):
+    """{id: (email, name, elo)} for every user."""
+    return {row[0]: (row[1], row[2], row[3])
+            for row in db.execute('SELECT id, email, name, elo FROM users')}
+
+
+def assign_waves(winners, losers, n_players):
+    """Wave number per game: one after the last wave of either player."""
+    last = [0] * n_players
+    waves = []
+    append = waves.append
+    for a, b in zip(winners.tolist(), losers.tolist()):
+        wave = (last[a] if last[a] > last[b] else last[b]) + 1
+        last[a] = last[b] = wave
+        append(wave)
+    return np.array(waves, dtype=np.int64)
+
+
+def replay(winners, losers, start, k_factors):
+    """Ratings after all games for every K: array [len(start), len(k_factors)], plus stats."""
+    k = np.asarray(k_factors, dtype=np.float64)
+    ratings = np.repeat(np.asarray(start, dtype=np.float64)[:, None], len(k), axis=1)
+    games = len(winners)
+    if not games:
+        return ratings, {'waves': 0, 'log_loss': np.zeros(len(k))}
+
+    waves = assign_waves(winners, losers, len(start))
+    order = np.argsort(waves, kind='stable')
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(waves[order])) + 1, [games]))
+
+    # One gather/scatter per wave: its winners then its losers, side by side in ``players``,
+    # with the actual score (1 or 0) of each in ``scores``
+    sizes = np.diff(bounds)
+    first = np.repeat(bounds[:-1], sizes)  # index of the first game of each game's wave
+    winner_at = first + np.arange(games)
+    players = np.empty(2 * games, dtype=np.int64)
+    players[winner_at] = winners[order]
+    players[winner_at + np.repeat(sizes, sizes)] = losers[order]
+    scores = np.zeros((2 * games, 1))
+    scores[winner_at] = 1
+    expected = np.empty((games, len(k)), dtype=np.float32)  # winner's expected score, for the log-loss
+
+    for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        n = end - begin
+        sel = players[2 * begin:2 * end]
+        r = ratings[sel]
+        # Same expressions as engine.calculate_elo ((ra - rb) / 400 is exactly -diff);
+        # np.rint rounds half to even like round()
+        diff = (r[n:] - r[:n]) / 400
+        e = 1 / (1 + 10 ** np.concatenate((diff, -diff)))
+        ratings[sel] = np.rint(r + k * (scores[2 * begin:2 * end] - e))
+        expected[begin:end] = e[:n]
+    log_loss = -np.log(expected, dtype=np.float64).sum(axis=0)
+    return ratings, {'waves': len(sizes), 'log_loss': log_loss}
+
+
+def replay_slow(winners, losers, start, k_factor):
+    """Reference: one game at a time through engine.calculate_elo."""
+    ratings = [int(r) for r in start]
+    for a, b in zip(winners.tolist(), losers.tolist()):
+        ratings[a], ratings[b] = calculate_elo(ratings[a], ratings[b], k_factor)
+    return ratings
+
+
+def synthetic_games(n_games, n_players, bot_share=0.3, seed=0):
+    """Random games: ``bot_share`` of them against one of the bots (ids 0..len(BOTS)-1)."""
+    rng = np.random.default_rng(seed)
+    n_bots = len(BOTS)
+    humans = rng.integers(n_bots, n_players, size=n_games)
+    others = rng.integers(n_bots, n_players - 1, size=n_games)
+    others += others >= humans  # any human but the player
+    opponents = np.where(rng.random(n_games) < bot_share, rng.integers(0, n_bots, size=n_games), others)
+    human_wins = rng.random(n_games) < 0.5
+    winners = np.where(human_wins, humans, opponents)
+    losers = np.where(human_wins, opponents, humans)
+    start = np.full(n_players, START_ELO, dtype=np.int64)
+    start[:n_bots] = [bot['elo'] for bot in BOTS]
+    return winners, losers, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'database to audit (default {DEFAULT_DB})')
+    parser.add_argument('--k', type=float, nargs='+', default=[32], help='K-factors to replay (the first one is audited)')
+    parser.add_argument('--threshold', type=int, default=50, help='drift in ELO points that counts as suspicious')
+    parser.add_argument('--top', type=int, default=20, help='how many of the largest drifts to list')
+    parser.add_argument('--csv', help='write every player\'s current/replayed ELO (first K) to this file')
+    parser.add_argument('--verify', type=int, default=0, metavar='N',
+                        help='also replay the first N games one by one with engine.calculate_elo and compare')
+    parser.add_argument('--synthetic', type=int, default=0, metavar='GAMES', help='replay random games instead of a DB')
+    parser.add_argument('--players', type=int, default=100_000, help='players in --synthetic mode')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    users = {}
+    if args.synthetic:
+        winners, losers, start = synthetic_games(args.synthetic, args.players)
+        skipped = 0
+    else:
+        db = sqlite3.connect(f'file:{args.db}?mode=ro', uri=True)
+        users = load_users(db)
+        winners, losers, skipped = load_games(db)
+        db.close()
+        n_players = max([0, *users] + [int(winners.max()) if len(winners) else 0, int(losers.max()) if len(losers) else 0]) + 1
+        start = np.full(n_players, START_ELO, dtype=np.int64)
+        bot_start = {bot['email']: bot['elo'] for bot in BOTS}
+        for uid, (email, _, _) in users.items():
+            start[uid] = bot_start.get(email, START_ELO)
+    loaded = time.perf_counter()
+
+    ratings, stats = replay(winners, losers, start, args.k)
+    elapsed = time.perf_counter() - loaded
+    games = len(winners)
+    print(f'Loaded {games:,} games ({skipped:,} skipped: missing player id) in {loaded - started:.2f} s')
+    print(f'Replayed {len(args.k)} K in {elapsed:.2f} s ({games / max(elapsed, 1e-9):,.0f} games/s, '
+          f'{stats["waves"]:,} waves)')
+
+    if args.verify:
+        n = min(args.verify, games)
+        prefix, _ = replay(winners[:n], losers[:n], start, args.k[:1])
+        mismatches = int(np.count_nonzero(prefix[:, 0] != np.array(replay_slow(winners[:n], losers[:n], start, args.k[0]))))
+        print(f'Verified {n:,} games against engine.calculate_elo: {mismatches} players differ')
+
+    played = np.bincount(np.concatenate([winners, losers]), minlength=len(start))
+    audited = np.array(sorted(uid for uid in users if users[uid][2] is not None), dtype=np.int64)
+    current = np.array([users[uid][2] for uid in audited], dtype=np.float64)
+
+    print(f'\n{"K":>6}{"log-loss/game":>16}{"mean |drift|":>15}{"max |drift|":>14}{f"> {args.threshold}":>10}')
+    for i, k in enumerate(args.k):
+        per_game = stats['log_loss'][i] / games if games else 0
+        if len(audited):
+            drift = np.abs(ratings[audited, i] - current)
+            print(f'{k:>6g}{per_game:>16.4f}{drift.mean():>15.1f}{drift.max():>14.0f}'
+                  f'{np.count_nonzero(drift > args.threshold):>10}')
+        else:
+            print(f'{k:>6g}{per_game:>16.4f}')
+
+    if len(audited):
+        drift = ratings[audited, 0] - current
+        print(f'\nLargest drift at K={args.k[0]:g} (replayed - current):')
+        print(f'{"email":<36}{"name":<22}{"games":>8}{"current":>9}{"replayed":>10}{"drift":>8}')
+        for j in np.argsort(-np.abs(drift), kind='stable')[:args.top]:
+            uid = int(audited[j])
+            email, name, elo = users[uid]
+            print(f'{email[:35]:<36}{(name or "")[:21]:<22}{played[uid]:>8}{elo:>9}'
+                  f'{ratings[uid, 0]:>10.0f}{drift[j]:>+8.0f}')
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['user_id', 'email', 'games', 'current_elo', 'replayed_elo', 'drift'])
+            for j, uid in enumerate(audited.tolist()):
+                writer.writerow([uid, users[uid][0], int(played[uid]), int(current[j]),
+                                 int(ratings[uid, 0]), int(ratings[uid, 0] - current[j])])
+        print(f'\nWrote {len(audited):,} rows to {args.csv}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
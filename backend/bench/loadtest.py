@@ -0,0 +1,356 @@
+"""Socket.IO load test: N headless players against a running server.
+
+Every client logs in through /login/guest, enters the lobby, challenges a bot
+or another client, answers rounds until game_over and repeats. The harness
+reports throughput and latency percentiles and writes them to a JSON file
+that can be compared between runs.
+
+    pip install "python-socketio[asyncio_client]"
+    python bench/loadtest.py --start-server --clients 200 --games 2
+    python bench/loadtest.py --url http://localhost:5002 --clients 1000 --bot-ratio 0.3
+    python bench/loadtest.py --compare before.json after.json
+
+Measured latencies:
+    challenge_to_game_start  challenge_player sent -> game_start received
+    answer_to_result         answer sent -> own answer_result received
+    new_round                round decided -> new_round received (includes the
+                             server's intentional 2s pause between rounds)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import aiohttp
+import socketio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 0.50) * 1000, 2),
+        'p95': round(percentile(values, 0.95) * 1000, 2),
+        'p99': round(percentile(values, 0.99) * 1000, 2),
+        'mean': round(sum(values) / len(values) * 1000, 2),
+        'max': round(values[-1] * 1000, 2),
+    }
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.samples = defaultdict(list)
+        self.counters = Counter()
+        self.words = {}
+        self.human_queue = asyncio.Queue()
+
+    async def fetch_words(self, http):
+        async with http.get(f'{self.args.url}/api/words') as resp:
+            self.words = await resp.json()
+
+
+class Player:
+    def __init__(self, harness, index, vs_bot):
+        self.h = harness
+        self.args = harness.args
+        self.index = index
+        self.vs_bot = vs_bot
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.players = []
+        self.lobby_event = asyncio.Event()
+        self.game_started = asyncio.Event()
+        self.game_over = asyncio.Event()
+        self.challenge_failed = asyncio.Event()
+        self.round = 0
+        self.answer_sent_at = None
+        self.round_decided_at = None
+        self.challenge_sent_at = None
+
+        for event in ('lobby_update', 'challenge_received', 'game_start', 'new_round',
+                      'answer_result', 'game_over', 'opponent_disconnected', 'error'):
+            self.sio.on(event, self._handler(event))
+        self.sio.on('batch', self.on_batch)
+
+    def _handler(self, event):
+        async def handle(data=None):
+            await self.dispatch(event, data)
+        return handle
+
+    async def on_batch(self, events):
+        for event, data in events:
+            await self.dispatch(event, data)
+
+    async def dispatch(self, event, data):
+        now = time.perf_counter()
+        if event == 'lobby_update':
+            self.players = data.get('players', []) if isinstance(data, dict) else data
+            self.lobby_event.set()
+        elif event == 'challenge_received':
+            if data.get('target_sid') == self.sio.get_sid():
+                await self.sio.emit('accept_challenge', {
+                    'challenger_sid': data['challenger_sid'],
+                    'rounds': data.get('rounds'),
+                })
+        elif event == 'game_start':
+            if self.challenge_sent_at is not None:
+                self.h.samples['challenge_to_game_start'].append(now - self.challenge_sent_at)
+                self.challenge_sent_at = None
+            self.game_started.set()
+            self.start_round(data)
+        elif event == 'new_round':
+            if self.round_decided_at is not None:
+                self.h.samples['new_round'].append(now - self.round_decided_at)
+                self.round_decided_at = None
+            self.start_round(data)
+        elif event == 'answer_result':
+            if data.get('you_answered') and self.answer_sent_at is not None:
+                self.h.samples['answer_to_result'].append(now - self.answer_sent_at)
+                self.answer_sent_at = None
+            if data.get('correct') and self.round_decided_at is None:
+                self.round_decided_at = now
+        elif event == 'game_over':
+            self.h.counters['games_finished'] += 1
+            self.game_over.set()
+        elif event == 'opponent_disconnected':
+            self.h.counters['opponent_disconnected'] += 1
+            self.game_over.set()
+        elif event == 'error':
+            self.h.counters[f"error: {data.get('message')}"] += 1
+            self.challenge_failed.set()
+
+    def start_round(self, data):
+        self.round += 1
+        asyncio.ensure_future(self.answer(self.round, data['word'], data['translations']))
+
+    async def answer(self, round_no, word, translations):
+        await asyncio.sleep(random.uniform(self.args.think_min, self.args.think_max))
+        if round_no != self.round or self.game_over.is_set():
+            return
+        correct = self.h.words.get(word)
+        if correct in translations and random.random() < self.args.accuracy:
+            choice = correct
+        else:
+            choice = random.choice(translations)
+        self.answer_sent_at = time.perf_counter()
+        self.h.counters['answers_sent'] += 1
+        await self.sio.emit('answer', {'answer': choice})
+
+    async def login(self, http):
+        async with http.get(f'{self.args.url}/login/guest', allow_redirects=False) as resp:
+            cookie = resp.cookies.get('session')
+            if cookie is None:
+                raise RuntimeError(f'guest login failed: HTTP {resp.status}')
+            return cookie.value
+
+    async def run(self, http):
+        cookie = await self.login(http)
+        await self.sio.connect(self.args.url, headers={'Cookie': f'session={cookie}'},
+                               transports=['websocket'])
+        try:
+            for _ in range(self.args.games):
+                await self.play_one()
+        finally:
+            await self.sio.disconnect()
+
+    async def enter_lobby(self):
+        self.lobby_event.clear()
+        await self.sio.emit('enter_lobby')
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            await asyncio.wait_for(self.lobby_event.wait(), self.args.timeout)
+            if any(p.get('sid') == self.sio.get_sid() for p in self.players):
+                return
+            self.lobby_event.clear()
+        raise asyncio.TimeoutError
+
+    async def play_one(self):
+        self.game_started.clear()
+        self.game_over.clear()
+        for attempt in range(self.args.retries + 1):
+            self.challenge_failed.clear()
+            await self.enter_lobby()
+            if self.vs_bot:
+                bots = [p for p in self.players if p.get('is_bot')]
+                if not bots:
+                    self.h.counters['no_bot_available'] += 1
+                    await asyncio.sleep(0.5 * (attempt + 1))
+                    continue
+                await self.challenge(random.choice(bots)['sid'])
+            else:
+                partner = self.h.human_queue.get_nowait() if not self.h.human_queue.empty() else None
+                if partner is None:
+                    # Wait for someone to challenge us
+                    await self.h.human_queue.put(self.sio.get_sid())
+                else:
+                    await self.challenge(partner)
+
+            started = asyncio.ensure_future(self.game_started.wait())
+            failed = asyncio.ensure_future(self.challenge_failed.wait())
+            done, pending = await asyncio.wait({started, failed}, timeout=self.args.timeout,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if self.game_started.is_set():
+                break
+            self.h.counters['challenge_retries'] += 1
+        else:
+            self.h.counters['games_not_started'] += 1
+            return
+
+        try:
+            await asyncio.wait_for(self.game_over.wait(), self.args.game_timeout)
+        except asyncio.TimeoutError:
+            self.h.counters['games_timed_out'] += 1
+            await self.sio.emit('surrender')
+
+    async def challenge(self, target_sid):
+        self.challenge_sent_at = time.perf_counter()
+        self.h.counters['challenges_sent'] += 1
+        await self.sio.emit('challenge_player', {'target_sid': target_sid, 'rounds': self.args.rounds})
+
+
+async def run_load(args):
+    harness = Harness(args)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        await harness.fetch_words(http)
+
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.clients):
+            player = Player(harness, i, vs_bot=random.random() < args.bot_ratio)
+            tasks.append(asyncio.ensure_future(player.run(http)))
+            if args.spawn_rate:
+                await asyncio.sleep(1 / args.spawn_rate)
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        wall_time = time.perf_counter() - started
+
+    for result in results:
+        if isinstance(result, Exception):
+            harness.counters[f'client_failed: {type(result).__name__}'] += 1
+
+    games = harness.counters['games_finished']
+    answers = harness.counters['answers_sent']
+    return {
+        'config': {k: v for k, v in vars(args).items() if k not in ('compare', 'output')},
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'wall_time_s': round(wall_time, 2),
+        'throughput': {
+            'games_per_s': round(games / wall_time, 3),
+            'answers_per_s': round(answers / wall_time, 3),
+        },
+        'latency_ms': {name: summarize(values) for name, values in sorted(harness.samples.items())},
+        'counters': dict(sorted(harness.counters.items())),
+    }
+
+
+def start_server(port):
+    data_dir = tempfile.mkdtemp(prefix='ingals-loadtest-')
+    env = dict(os.environ, DATA_DIR=data_dir, LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'))
+    proc = subprocess.Popen(
+        ['gunicorn', '--worker-class', 'eventlet', '-w', '1', 'app:app', '--bind', f'127.0.0.1:{port}'],
+        cwd=BACKEND_DIR, env=env)
+
+    async def wait_ready():
+        async with aiohttp.ClientSession() as http:
+            for _ in range(100):
+                if proc.poll() is not None:
+                    raise RuntimeError(f'server exited with code {proc.returncode}')
+                try:
+                    async with http.get(f'http://127.0.0.1:{port}/api/leaderboard') as resp:
+                        if resp.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError('server did not start')
+
+    asyncio.run(wait_ready())
+    return proc
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def delta(a, b):
+        if not a or b is None:
+            return ''
+        return f'{(b - a) / a * 100:+.1f}%'
+
+    print(f"{'metric':<32}{'old':>12}{'new':>12}{'change':>10}")
+    for key in ('games_per_s', 'answers_per_s'):
+        a, b = old['throughput'].get(key), new['throughput'].get(key)
+        print(f'{key:<32}{a:>12}{b:>12}{delta(a, b):>10}')
+    for name in sorted(set(old['latency_ms']) | set(new['latency_ms'])):
+        for q in ('p50', 'p95', 'p99'):
+            a = old['latency_ms'].get(name, {}).get(q)
+            b = new['latency_ms'].get(name, {}).get(q)
+            print(f"{name + ' ' + q:<32}{str(a):>12}{str(b):>12}{delta(a, b):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--games', type=int, default=1, help='games per client')
+    parser.add_argument('--rounds', type=int, default=5, help='winning score per game (5-30)')
+    parser.add_argument('--bot-ratio', type=float, default=0.5, help='share of clients that challenge bots')
+    parser.add_argument('--spawn-rate', type=float, default=50, help='clients started per second (0 = all at once)')
+    parser.add_argument('--accuracy', type=float, default=0.7)
+    parser.add_argument('--think-min', type=float, default=0.3)
+    parser.add_argument('--think-max', type=float, default=1.5)
+    parser.add_argument('--timeout', type=float, default=15, help='seconds to wait for lobby/game_start')
+    parser.add_argument('--game-timeout', type=float, default=300)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--start-server', action='store_true', help='run gunicorn locally on a scratch DB')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', default='loadtest_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    server = None
+    if args.start_server:
+        args.url = f'http://127.0.0.1:{args.port}'
+        server = start_server(args.port)
+    try:
+        report = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print(f'\nSaved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
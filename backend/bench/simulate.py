@@ -0,0 +1,107 @@
+"""Deterministic offline game simulator on an accelerated (virtual) clock.
+
+    python bench/simulate.py --games 10000 --seed 1
+    python bench/simulate.py --games 2000 --humans 4 --k-factor 24 --rounds 15
+
+Plays games through the same rules as the server (engine.py: word dealing,
+answer judging, ELO) without Socket.IO, the database or real sleeping.
+Bots use their ELO-derived response time/accuracy (re-derived after every
+rating change, like bot_play_game does); scripted "humans" answer with fixed
+accuracy and speed. The same --seed always produces the same table.
+
+Useful for tuning bot parameters, K-factor and ELO drift before touching
+production, and as a cheap throughput check of the game rules.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import engine  # noqa: E402
+
+
+def load_words(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def scripted_humans(count, rng):
+    """Synthetic humans spread from weak/slow to strong/fast."""
+    humans = []
+    for i in range(count):
+        skill = (i + 1) / (count + 1)
+        accuracy = 0.3 + 0.6 * skill
+        speed = 7.0 - 5.0 * skill
+        script = [(speed + rng.uniform(-0.5, 0.5), rng.random() < accuracy) for _ in range(50)]
+        humans.append({'name': f'human{i + 1}', 'email': f'human{i + 1}@sim', 'elo': 1200,
+                       'policy': engine.scripted_policy(script), 'bot': False})
+    return humans
+
+
+def make_players(humans, rng):
+    players = [{'name': b['name'], 'email': b['email'], 'elo': b['elo'], 'bot': True} for b in engine.BOTS]
+    players += scripted_humans(humans, rng)
+    for p in players:
+        p.update(games=0, wins=0, rounds=0)
+    return players
+
+
+def run(games, seed, humans, k_factor, winning_score, words):
+    rng = random.Random(seed)
+    players = make_players(humans, rng)
+    clock = engine.VirtualClock()
+
+    started = time.perf_counter()
+    for _ in range(games):
+        a, b = rng.sample(players, 2)
+        for p in (a, b):
+            if p['bot']:
+                p['policy'] = engine.bot_policy_for_elo(p['elo'])
+        record = engine.simulate_game(a, b, words, rng, winning_score, clock, k_factor)
+        for p in (a, b):
+            p['games'] += 1
+            p['rounds'] += record['rounds']
+            p['elo'] = record['elo'][p['email']][1]
+        (a if record['winner_email'] == a['email'] else b)['wins'] += 1
+    wall = time.perf_counter() - started
+
+    return players, wall, clock.time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--humans', type=int, default=0, help='scripted human players added to the bot pool')
+    parser.add_argument('--k-factor', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=engine.WINNING_SCORE_DEFAULT, help='winning score')
+    parser.add_argument('--words', default=os.path.join(BACKEND_DIR, 'words.json'))
+    parser.add_argument('--json', help='also write the final table to this file')
+    args = parser.parse_args()
+
+    words = load_words(args.words)
+    players, wall, virtual = run(args.games, args.seed, args.humans, args.k_factor, args.rounds, words)
+
+    print(f'{args.games} games in {wall:.2f}s ({args.games / wall:,.0f} games/s), '
+          f'{virtual / 3600:,.1f}h of virtual play ({virtual / wall:,.0f}x real time)\n')
+    print(f"{'player':<36}{'elo':>6}{'games':>8}{'win %':>8}")
+    players.sort(key=lambda p: p['elo'], reverse=True)
+    for p in players:
+        win_rate = 100 * p['wins'] / p['games'] if p['games'] else 0
+        print(f"{p['name']:<36}{p['elo']:>6}{p['games']:>8}{win_rate:>7.1f}%")
+
+    if args.json:
+        table = [{k: p[k] for k in ('name', 'email', 'elo', 'games', 'wins')} for p in players]
+        with open(args.json, 'w') as f:
+            json.dump({'seed': args.seed, 'games': args.games, 'players': table}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Cold-start profile of app.py with a time budget.
+
+    python bench/startup.py                        # 5 restarts on a scratch DB, budget from STARTUP_BUDGET_MS
+    python bench/startup.py --runs 10 --budget-ms 1000
+    python bench/startup.py --db /backup/users.db  # restart on a copy of a real database
+
+Every run imports app.py in a fresh interpreter with ``-X importtime``. The
+first run creates the database (reported separately as "fresh DB"); the rest
+are restarts on that file, which is what deploys and crash restarts pay.
+Prints the median time per init phase (see startup.py), the slowest
+top-level imports and the whole process wall time.
+
+Exit code is 1 when the median restart (import of app.py, interpreter boot
+excluded) takes longer than the budget.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from startup import StartupTrace  # noqa: E402
+
+REPORT_PREFIX = 'STARTUP_REPORT '
+CHILD = f'''
+import json, sys
+import app, startup
+sys.stdout.write({REPORT_PREFIX!r} + json.dumps(startup.trace.report()) + "\\n")
+'''
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run_once(data_dir):
+    """One cold start. Returns (startup report, wall seconds, {module imported by app.py: cumulative us})."""
+    env = dict(os.environ, DATA_DIR=data_dir, LOG_LEVEL='WARNING', STARTUP_TRACE='0')
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    report = next((json.loads(line[len(REPORT_PREFIX):]) for line in proc.stdout.splitlines()
+                   if line.startswith(REPORT_PREFIX)), None)
+    if proc.returncode or report is None:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f'app.py failed to start (exit code {proc.returncode})')
+    imports = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 3:  # nested one level: imported directly by app.py
+            imports[match.group(4)] = int(match.group(2))
+    return report, wall, imports
+
+
+def median_phases(reports):
+    names = [p['name'] for p in reports[0]['phases']]
+    return [(name, statistics.median(next((p['ms'] for p in r['phases'] if p['name'] == name), 0) for r in reports))
+            for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='restarts after the first (fresh DB) run')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1500)),
+                        help='max median restart time in ms (default 1500, env STARTUP_BUDGET_MS)')
+    parser.add_argument('--db', help='copy of a database to restart on instead of a fresh one')
+    parser.add_argument('--top', type=int, default=10, help='how many of the slowest imports to list')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='ingals-startup-')
+    try:
+        if args.db:
+            shutil.copy(args.db, os.path.join(data_dir, 'users.db'))
+        fresh, fresh_wall, _ = run_once(data_dir)
+        runs = [run_once(data_dir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    reports = [r for r, _, _ in runs]
+    total = statistics.median(r['total_ms'] for r in reports)
+    median = StartupTrace()
+    median.phases, median.total_ms = median_phases(reports), total
+    print(median.table())
+
+    imports = {}
+    for _, _, run_imports in runs:
+        for module, us in run_imports.items():
+            imports.setdefault(module, []).append(us)
+    print(f'\n{"slowest imports":<32}{"ms":>10}')
+    slowest = sorted(((statistics.median(us), module) for module, us in imports.items()), reverse=True)
+    for us, module in slowest[:args.top]:
+        print(f'{module:<32}{us / 1000:>10.1f}')
+
+    wall = statistics.median(w for _, w, _ in runs) * 1000
+    print(f'\n{"fresh DB (first run)":<32}{fresh["total_ms"]:>10.1f}  ({fresh_wall * 1000:.0f} ms process)')
+    print(f'{"restart (median)":<32}{total:>10.1f}  ({wall:.0f} ms process)')
+    if total > args.budget_ms:
+        print(f'\nStartup {total:.0f} ms is over the budget of {args.budget_ms:.0f} ms')
+        return 1
+    print(f'Within the budget of {args.budget_ms:.0f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
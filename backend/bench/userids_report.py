@@ -0,0 +1,236 @@
+"""Database size and read speed before and after the move to integer user ids.
+
+    python bench/userids_report.py                       # synthetic DB, default size
+    python bench/userids_report.py --users 100000 --games 2000000
+    python bench/userids_report.py --db /backup/users.db # a copy of a real (pre-migration) DB
+
+Builds (or copies) a database with the old email-keyed schema and its real
+indexes, measures every index and table (dbstat) and the file, and times the
+hot reads. Then migrates it the way init_db does (userids.migrate, the zombie
+run index) and measures the same things again. Both sides are vacuumed first,
+so the file sizes compare live data, not free pages.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from bench_core import app, measure  # noqa: E402  (sets up DATA_DIR / sys.path)
+
+import userids  # noqa: E402
+import zombie  # noqa: E402
+
+LEGACY_DDL = [
+    'CREATE TABLE users (email TEXT PRIMARY KEY, name TEXT, elo INTEGER DEFAULT 1200, is_admin INTEGER DEFAULT 0)',
+    '''CREATE TABLE friendships (user_email TEXT, friend_email TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                 PRIMARY KEY (user_email, friend_email))''',
+    '''CREATE TABLE games (id INTEGER PRIMARY KEY AUTOINCREMENT, player1_email TEXT, player2_email TEXT,
+                           player1_score INTEGER, player2_score INTEGER, winner_email TEXT,
+                           created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE user_words (user_email TEXT, word TEXT, correct_count INTEGER DEFAULT 0, wrong_count INTEGER DEFAULT 0,
+                                status TEXT DEFAULT 'learning', last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                PRIMARY KEY (user_email, word))''',
+    'CREATE TABLE visit_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, timestamp TIMESTAMP, ip_hash TEXT)',
+    'CREATE TABLE user_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, start_time REAL, last_seen REAL, ip TEXT)',
+    '''CREATE TABLE zombie_games (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, kills INTEGER NOT NULL DEFAULT 0,
+                                  wave INTEGER NOT NULL DEFAULT 1, accuracy REAL DEFAULT 0.0, duration INTEGER DEFAULT 0,
+                                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    # Indexes the email-keyed schema had (migrations 006 and 007 at the time)
+    'CREATE INDEX idx_zombie_kills ON zombie_games(kills DESC)',
+    'CREATE INDEX idx_zombie_user ON zombie_games(user_id)',
+    'CREATE INDEX idx_zombie_created ON zombie_games(created_at DESC)',
+    'CREATE INDEX idx_user_words_seen ON user_words(user_email, last_seen)',
+]
+
+
+def email(i):
+    # Real addresses are ~20-30 characters; the key length is what email indexes pay for
+    return f'player.number{i}@example-mail.com'
+
+
+def build_legacy(path, users, games, words_per_user, friends_per_user, runs_per_user, seed):
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    for ddl in LEGACY_DDL:
+        db.execute(ddl)
+    db.executemany('INSERT INTO users (email, name, elo) VALUES (?, ?, ?)',
+                   ((email(i), f'Player {i}', rng.randrange(800, 2000)) for i in range(users)))
+    vocabulary = list(app.word_packs.default.current)
+
+    def game_rows():
+        for g in range(games):
+            a, b = rng.randrange(users), rng.randrange(users)
+            day = f'2025-{1 + g * 12 // games:02d}-{1 + g % 28:02d} 12:00:00'
+            yield email(a), email(b), 10, rng.randrange(10), email(a), day
+    db.executemany('''INSERT INTO games (player1_email, player2_email, player1_score, player2_score, winner_email, created_at)
+                      VALUES (?, ?, ?, ?, ?, ?)''', game_rows())
+
+    def word_rows():
+        for i in range(users):
+            for word in rng.sample(vocabulary, words_per_user):
+                yield email(i), word, rng.randrange(5), rng.randrange(3), rng.choice(('learned', 'learning'))
+    db.executemany('INSERT INTO user_words (user_email, word, correct_count, wrong_count, status) VALUES (?, ?, ?, ?, ?)',
+                   word_rows())
+    db.executemany('INSERT OR IGNORE INTO friendships (user_email, friend_email) VALUES (?, ?)',
+                   ((email(i), email(rng.randrange(users))) for i in range(users) for _ in range(friends_per_user)))
+    db.executemany('INSERT INTO zombie_games (user_id, kills, wave, accuracy, duration) VALUES (?, ?, ?, ?, ?)',
+                   ((email(i), rng.randrange(200), rng.randrange(1, 20), rng.random() * 100, rng.randrange(600))
+                    for i in range(users) for _ in range(runs_per_user)))
+    db.commit()
+    db.close()
+
+
+def migrate(db):
+    """What init_db does to an old database."""
+    userids.migrate(db)
+    db.execute('ALTER TABLE zombie_games ADD COLUMN run_id TEXT')
+    for ddl in zombie.RUN_DDL:
+        db.execute(ddl)
+    db.commit()
+
+
+def sizes(db):
+    """Vacuum, then ({index: bytes}, {table: bytes}, file bytes)."""
+    db.execute('VACUUM')
+    kinds = dict(db.execute("SELECT name, type FROM sqlite_master WHERE type IN ('index', 'table')").fetchall())
+    indexes, tables = {}, {}
+    for name, size in db.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name').fetchall():
+        (indexes if kinds.get(name) == 'index' else tables)[name] = size
+    page_size = db.execute('PRAGMA page_size').fetchone()[0]
+    return indexes, tables, db.execute('PRAGMA page_count').fetchone()[0] * page_size
+
+
+def kb(size):
+    return f'{size / 1024:>12.0f}KB' if size is not None else f'{"-":>14}'
+
+
+def change(old, new):
+    return f'{(new / old - 1) * 100:>+8.0f}%' if old and new else ''
+
+
+# --- Reads as they were (email keys) ---
+
+def legacy_history(db, target_email):
+    rows = db.execute('''
+        SELECT id, player1_email, player2_email, player1_score, player2_score, winner_email, created_at
+        FROM games WHERE player1_email = ? OR player2_email = ? ORDER BY created_at DESC LIMIT 20
+    ''', (target_email, target_email)).fetchall()
+    for row in rows:
+        opponent = row['player2_email'] if row['player1_email'] == target_email else row['player1_email']
+        db.execute('SELECT name FROM users WHERE email = ?', (opponent,)).fetchone()
+    return rows
+
+
+def legacy_stats(db, target_email):
+    return db.execute('''
+        SELECT count(*), sum(case when winner_email = ? then 1 else 0 end) FROM games
+        WHERE player1_email = ? OR player2_email = ?
+    ''', (target_email, target_email, target_email)).fetchone()
+
+
+def legacy_words(db, target_email):
+    return db.execute('''
+        SELECT word, correct_count, wrong_count, status, last_seen FROM user_words
+        WHERE user_email = ? ORDER BY last_seen DESC LIMIT 200
+    ''', (target_email,)).fetchall()
+
+
+def legacy_friends(db, target_email):
+    return db.execute('''
+        SELECT u.email, u.name, u.elo FROM friendships f JOIN users u ON f.friend_email = u.email
+        WHERE f.user_email = ?
+    ''', (target_email,)).fetchall()
+
+
+# --- Same reads on integer ids ---
+
+def id_stats(db, uid):
+    return db.execute('''
+        SELECT count(*), sum(case when winner_id = ? then 1 else 0 end) FROM games
+        WHERE player1_id = ? OR player2_id = ?
+    ''', (uid, uid, uid)).fetchone()
+
+
+def id_words(db, uid):
+    return db.execute('''
+        SELECT word, correct_count, wrong_count, status, last_seen FROM user_words
+        WHERE user_id = ? ORDER BY last_seen DESC LIMIT 200
+    ''', (uid,)).fetchall()
+
+
+def id_friends(db, uid):
+    return db.execute('''
+        SELECT u.email, u.name, u.elo FROM friendships f JOIN users u ON u.id = f.friend_id
+        WHERE f.user_id = ?
+    ''', (uid,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='copy of a pre-migration users.db (default: build a synthetic one)')
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--games', type=int, default=500_000)
+    parser.add_argument('--words-per-user', type=int, default=50)
+    parser.add_argument('--friends-per-user', type=int, default=5)
+    parser.add_argument('--runs-per-user', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ingals-userids-')
+    path = os.path.join(workdir, 'users.db')
+    if args.db:
+        shutil.copy(args.db, path)
+    else:
+        print(f'Building legacy DB: {args.users} users, {args.games} games ...')
+        build_legacy(path, args.users, args.games, args.words_per_user, args.friends_per_user,
+                     args.runs_per_user, args.seed)
+
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    sample = [r[0] for r in db.execute('SELECT email FROM users ORDER BY random() LIMIT 50').fetchall()]
+
+    before_indexes, before_tables, before_file = sizes(db)
+    before = {
+        'profile stats': measure(lambda: [legacy_stats(db, e) for e in sample]) / len(sample),
+        'history (20 + names)': measure(lambda: [legacy_history(db, e) for e in sample]) / len(sample),
+        'word stats page': measure(lambda: [legacy_words(db, e) for e in sample]) / len(sample),
+        'friends join': measure(lambda: [legacy_friends(db, e) for e in sample]) / len(sample),
+    }
+
+    migrate(db)
+    uids = [userids.user_id_for(db, e) for e in sample]
+    after_indexes, after_tables, after_file = sizes(db)
+    after = {
+        'profile stats': measure(lambda: [id_stats(db, u) for u in uids]) / len(uids),
+        'history (20 + names)': measure(lambda: [app.game_history(db, u) for u in uids]) / len(uids),
+        'word stats page': measure(lambda: [id_words(db, u) for u in uids]) / len(uids),
+        'friends join': measure(lambda: [id_friends(db, u) for u in uids]) / len(uids),
+    }
+
+    print(f"\n{'index':<36}{'before':>14}{'after':>14}{'change':>9}")
+    for name in sorted(set(before_indexes) | set(after_indexes)):
+        old, new = before_indexes.get(name), after_indexes.get(name)
+        print(f'{name:<36}{kb(old)}{kb(new)}{change(old, new)}')
+    rows = [
+        ('all indexes', sum(before_indexes.values()), sum(after_indexes.values())),
+        ('all tables', sum(before_tables.values()), sum(after_tables.values())),
+        ('file (vacuumed)', before_file, after_file),
+    ]
+    print()
+    for name, old, new in rows:
+        print(f'{name:<36}{kb(old)}{kb(new)}{change(old, new)}')
+
+    print(f"\n{'read':<36}{'before':>14}{'after':>14}{'change':>9}")
+    for name in before:
+        print(f'{name:<36}{before[name] * 1e6:>12.1f}us{after[name] * 1e6:>12.1f}us{(after[name] / before[name] - 1) * 100:>+8.0f}%')
+
+    db.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Bots as shared, multi-game opponents.
+
+The lobby keeps exactly one entry per bot profile (``bot_<email>``) and it is
+never removed when a game starts. Every game gets its own virtual sid
+``bot_<email>#<n>``, so rooms, scores and bot tasks of concurrent games never
+collide. ``BOT_MAX_GAMES`` caps how many games one bot plays at once.
+"""
+import itertools
+import os
+
+BOT_MAX_GAMES = int(os.getenv('BOT_MAX_GAMES', 50))
+SID_PREFIX = 'bot_'
+
+
+def lobby_sid(email):
+    return f'{SID_PREFIX}{email}'
+
+
+class BotPool:
+    def __init__(self, profiles, capacity=BOT_MAX_GAMES):
+        self.profiles = {p['email']: p for p in profiles}
+        self.capacity = capacity
+        self.games = {email: set() for email in self.profiles}  # email -> virtual sids in play
+        self._seq = itertools.count(1)
+
+    def email_for(self, sid):
+        """Bot email for a lobby or virtual sid, None for humans."""
+        if not sid or not sid.startswith(SID_PREFIX):
+            return None
+        email = sid[len(SID_PREFIX):].split('#', 1)[0]
+        return email if email in self.profiles else None
+
+    def has_capacity(self, email):
+        return len(self.games.get(email, ())) < self.capacity
+
+    def acquire(self, email):
+        """Reserve a game slot. Returns a fresh virtual sid, or None if the bot is at capacity."""
+        if email not in self.profiles or not self.has_capacity(email):
+            return None
+        sid = f'{lobby_sid(email)}#{next(self._seq)}'
+        self.games[email].add(sid)
+        return sid
+
+    def release(self, sid):
+        email = self.email_for(sid)
+        if email:
+            self.games[email].discard(sid)
+
+    def active(self):
+        return sum(len(sids) for sids in self.games.values())
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'active_games': self.active(),
+            'per_bot': {email: len(sids) for email, sids in self.games.items() if sids},
+        }
@@ -0,0 +1,182 @@
+"""Per-statement SQLite profiling and slow-query log.
+
+``get_db`` opens connections with ``factory=ProfiledConnection``. Every
+statement is reduced to a fingerprint (whitespace collapsed, literals replaced
+with ``?``) and aggregated: calls, total/max time and rows returned. The time spent in
+``fetch*`` and in iterating the cursor is added to the statement's execute
+time, because for sorted or aggregated queries SQLite does most of its work on
+the first step. A query is recorded once, when its rows run out, the cursor
+is re-executed or closed, or it is garbage collected; DML right away.
+
+Statements slower than ``SLOW_QUERY_MS`` in total are logged to ``ingals.db``
+and kept in a bounded top-K list for the admin page.
+"""
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import time
+from functools import lru_cache
+
+log = logging.getLogger('ingals.db')
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 50))
+TOP_K = int(os.getenv('SLOW_QUERY_TOP_K', 20))
+MAX_FINGERPRINTS = 500
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE_RE = re.compile(r'\s+')
+_COMMENT_RE = re.compile(r'--[^\n]*')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryProfiler:
+    def __init__(self, slow_ms=SLOW_QUERY_MS, top_k=TOP_K):
+        self.slow_ms = slow_ms
+        self.top_k = top_k
+        self.reset()
+
+    def reset(self):
+        self.statements = {}  # fingerprint -> aggregate
+        self.slowest = []     # min-heap of (duration_ms, seq, sample)
+        self._seq = 0
+
+    def _entry(self, fp):
+        entry = self.statements.get(fp)
+        if entry is None:
+            if len(self.statements) >= MAX_FINGERPRINTS:
+                return None
+            entry = self.statements[fp] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+        return entry
+
+    def record(self, sql, elapsed, rows=0):
+        fp = fingerprint(sql)
+        ms = elapsed * 1000
+        entry = self._entry(fp)
+        if entry is not None:
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['rows'] += rows
+
+        if ms >= self.slow_ms:
+            log.warning('Slow query (%.1f ms, %d rows): %s', ms, rows, fp)
+            self._seq += 1
+            sample = {'statement': fp, 'duration_ms': round(ms, 2), 'rows': rows, 'at': time.time()}
+            if len(self.slowest) < self.top_k:
+                heapq.heappush(self.slowest, (ms, self._seq, sample))
+            elif ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (ms, self._seq, sample))
+
+    def report(self, limit=50):
+        statements = []
+        for fp, e in self.statements.items():
+            statements.append({
+                'statement': fp,
+                'calls': e['calls'],
+                'total_ms': round(e['total_ms'], 2),
+                'avg_ms': round(e['total_ms'] / e['calls'], 3) if e['calls'] else 0,
+                'max_ms': round(e['max_ms'], 2),
+                'rows': e['rows'],
+            })
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        return {
+            'slow_threshold_ms': self.slow_ms,
+            'statements': statements[:limit],
+            'slowest': [s for _, _, s in sorted(self.slowest, reverse=True)],
+        }
+
+
+profiler = QueryProfiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    _pending = None  # [sql, elapsed, rows] of the query whose rows are still being read
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            profiler.record(*pending)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.description is None:  # DML/DDL: nothing to fetch
+                profiler.record(sql, elapsed, max(self.rowcount, 0))
+            else:
+                self._pending = [sql, elapsed, 0]
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            profiler.record(sql, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def _fetched(self, start, rows, done):
+        if self._pending is not None:
+            self._pending[1] += time.perf_counter() - start
+            self._pending[2] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()  # a fetchone() that never read to the end
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
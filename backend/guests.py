@@ -0,0 +1,107 @@
+"""Guest accounts: collision-free creation and the stale-guest reaper.
+
+Guest emails come from ``users.id`` (AUTOINCREMENT, never reused) formatted
+with at least five digits, so they can't collide with each other nor with the
+legacy random ``Guest_1000``..``Guest_9999`` accounts.
+
+The reaper deletes guests inactive for longer than ``GUEST_TTL_HOURS``
+together with their rows in the other tables, a small batch per transaction
+with a pause in between so play is never blocked for long. Games against a
+player who is still around are kept: they are part of that player's history.
+"""
+import logging
+import os
+import secrets
+import time
+
+log = logging.getLogger('ingals.db')
+
+GUEST_TTL_HOURS = float(os.getenv('GUEST_TTL_HOURS', 72))
+GUEST_REAP_INTERVAL = float(os.getenv('GUEST_REAP_INTERVAL', 600))  # seconds, 0 disables the loop
+GUEST_REAP_BATCH = int(os.getenv('GUEST_REAP_BATCH', 200))
+
+# Range over the email UNIQUE index: every 'Guest_...' email sorts between these two
+GUEST_FIRST, GUEST_END = 'Guest_', 'Guest`'
+
+
+def create_guest(db):
+    """Insert a new guest and return its email. Caller commits."""
+    cursor = db.execute('INSERT INTO users (email, name, elo, last_active) VALUES (?, NULL, 1200, ?)',
+                        (f'Guest_pending_{secrets.token_hex(8)}', time.time()))
+    user_id = cursor.lastrowid
+    email = f'Guest_{user_id:05d}'
+    db.execute('UPDATE users SET email = ?, name = ? WHERE id = ?', (email, f'Guest {user_id}', user_id))
+    return email
+
+
+class GuestReaper:
+    def __init__(self, ttl_hours=GUEST_TTL_HOURS, batch_size=GUEST_REAP_BATCH, protected_emails=()):
+        self.ttl = ttl_hours * 3600
+        self.batch_size = batch_size
+        self.protected_emails = set(protected_emails)  # bots: never the opponent whose games we keep
+        self.stats = {'runs': 0, 'guests_deleted': 0, 'rows_deleted': {}, 'last_run': None, 'last_duration_ms': None}
+
+    def _stale_batch(self, db, after, cutoff):
+        return db.execute('''
+            SELECT id, email FROM users
+            WHERE email > ? AND email < ? AND coalesce(last_active, 0) < ?
+            ORDER BY email LIMIT ?
+        ''', (after, GUEST_END, cutoff, self.batch_size)).fetchall()
+
+    def _delete(self, db, ids):
+        marks = ','.join('?' * len(ids))
+        protected = ','.join('?' * len(self.protected_emails)) or "''"
+        deleted = {}
+
+        # Games whose other player is still around (and not a bot) stay in that player's history;
+        # they go once that player is reaped too
+        deleted['games'] = db.execute(f'''
+            DELETE FROM games WHERE id IN (
+                SELECT g.id FROM games g
+                WHERE (g.player1_id IN ({marks}) OR g.player2_id IN ({marks}))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM users u
+                      WHERE u.id IN (g.player1_id, g.player2_id) AND u.id NOT IN ({marks})
+                        AND u.email NOT IN ({protected})
+                  )
+            )
+        ''', (*ids, *ids, *ids, *self.protected_emails)).rowcount
+        deleted['user_words'] = db.execute(f'DELETE FROM user_words WHERE user_id IN ({marks})', ids).rowcount
+        deleted['user_sessions'] = db.execute(f'DELETE FROM user_sessions WHERE user_id IN ({marks})', ids).rowcount
+        deleted['visit_logs'] = db.execute(f'DELETE FROM visit_logs WHERE user_id IN ({marks})', ids).rowcount
+        deleted['daily_activity'] = db.execute(f'DELETE FROM daily_activity WHERE user_id IN ({marks})', ids).rowcount
+        deleted['zombie_games'] = db.execute(f'DELETE FROM zombie_games WHERE player_id IN ({marks})', ids).rowcount
+        deleted['friendships'] = db.execute(
+            f'DELETE FROM friendships WHERE user_id IN ({marks}) OR friend_id IN ({marks})', ids + ids).rowcount
+        deleted['users'] = db.execute(f'DELETE FROM users WHERE id IN ({marks})', ids).rowcount
+        return deleted
+
+    def run(self, db, is_online=lambda email: False, pause=None):
+        """Purge stale guests in batches. ``pause(seconds)`` is called between batches to yield."""
+        started = time.perf_counter()
+        cutoff = time.time() - self.ttl
+        report = {}
+        after = GUEST_FIRST
+        while True:
+            rows = self._stale_batch(db, after, cutoff)
+            if not rows:
+                break
+            after = rows[-1]['email']
+            ids = [row['id'] for row in rows if not is_online(row['email'])]
+            if ids:
+                for table, count in self._delete(db, ids).items():
+                    report[table] = report.get(table, 0) + count
+                db.commit()
+            if pause:
+                pause(0)
+
+        self.stats['runs'] += 1
+        self.stats['guests_deleted'] += report.get('users', 0)
+        for table, count in report.items():
+            self.stats['rows_deleted'][table] = self.stats['rows_deleted'].get(table, 0) + count
+        self.stats['last_run'] = time.time()
+        self.stats['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        if report.get('users'):
+            log.info('Guest reaper: deleted %d guests, rows %s in %.0f ms',
+                     report['users'], report, self.stats['last_duration_ms'])
+        return report
@@ -0,0 +1,233 @@
+"""ELO-ordered lobby index with per-client windows.
+
+The lobby used to be pushed whole to every client on every change. Now each
+lobby client subscribes to a window:
+
+* players within ``elo ± range`` of the client's ELO (or, with ``search``,
+  players whose name/email contains the query), humans first, closest ELO
+  first, cut into pages of ``page_size``;
+* plus, always, the client itself, its friends in the lobby and pinned sids
+  (whoever is challenging it).
+
+A change to one player marks only the windows that can see it (``watchers_of``:
+it is on their page, or would land on it) as dirty; the caller recomputes
+those views and sends the ones that actually changed, so ``lobby_update`` is
+bounded by the page size and goes only to the clients it concerns. ``total``
+and ``has_more`` are as of the window's last update.
+"""
+import bisect
+import os
+
+DEFAULT_RANGE = int(os.getenv('LOBBY_ELO_RANGE', 300))
+DEFAULT_PAGE_SIZE = int(os.getenv('LOBBY_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 200
+MAX_RANGE = 5000
+
+
+class Window:
+    __slots__ = ('email', 'elo', 'range', 'page', 'page_size', 'search', 'friends', 'pins',
+                 'shown', 'horizon', 'last_sent')
+
+    def __init__(self, email, elo, friends=()):
+        self.email = email
+        self.elo = elo
+        self.range = DEFAULT_RANGE
+        self.page = 0
+        self.page_size = DEFAULT_PAGE_SIZE
+        self.search = ''
+        self.friends = set(friends)
+        self.pins = set()
+        self.shown = set()    # sids on the last computed view
+        self.horizon = None   # ELO distance of the farthest player on a full page, None if not full
+        self.last_sent = None
+
+    def configure(self, options):
+        """Apply client options; out-of-range values are clamped, unknown keys ignored."""
+        def int_option(key, default, low, high):
+            try:
+                return max(low, min(high, int(options.get(key, default))))
+            except (TypeError, ValueError):
+                return default
+        self.range = int_option('range', self.range, 0, MAX_RANGE)
+        self.page_size = int_option('page_size', self.page_size, 1, MAX_PAGE_SIZE)
+        self.page = int_option('page', self.page, 0, 10_000)
+        if 'search' in options:
+            self.search = str(options.get('search') or '').strip().lower()[:50]
+        self.last_sent = None  # the client asked: always answer
+
+    def matches(self, entry):
+        if self.search:
+            return self.search in entry['name'].lower() or self.search in entry['email'].lower()
+        return abs(entry['elo'] - self.elo) <= self.range
+
+    def describe(self):
+        return {'elo': self.elo, 'range': self.range, 'page': self.page,
+                'page_size': self.page_size, 'search': self.search}
+
+
+class LobbyIndex:
+    def __init__(self):
+        self.entries = {}   # sid -> {'sid', 'email', 'name', 'elo', 'is_bot'}
+        self.order = []     # sorted [(elo, sid)]
+        self.by_email = {}  # email -> {sid, ...}
+        self.windows = {}   # subscriber sid -> Window
+        self.dirty = set()  # subscriber sids whose view must be re-sent
+
+    def __len__(self):
+        return len(self.entries)
+
+    # --- Players ---
+
+    def add(self, sid, email, name, elo, is_bot=False):
+        if sid in self.entries:
+            self.remove(sid)
+        entry = {'sid': sid, 'email': email, 'name': name or email, 'elo': elo, 'is_bot': is_bot}
+        self.entries[sid] = entry
+        bisect.insort(self.order, (elo, sid))
+        self.by_email.setdefault(email, set()).add(sid)
+        self._changed(entry)
+        return entry
+
+    def remove(self, sid):
+        entry = self.entries.pop(sid, None)
+        if entry is None:
+            return None
+        self._drop_order(entry)
+        sids = self.by_email.get(entry['email'])
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.by_email[entry['email']]
+        self._changed(entry)
+        return entry
+
+    def update_user(self, email, elo=None, name=None):
+        """ELO/name changed (e.g. a bot finished a game while staying in the lobby)."""
+        for sid in list(self.by_email.get(email, ())):
+            entry = self.entries[sid]
+            self._changed(entry)  # windows that saw the old ELO
+            if elo is not None and elo != entry['elo']:
+                self._drop_order(entry)
+                entry['elo'] = elo
+                bisect.insort(self.order, (elo, sid))
+            if name:
+                entry['name'] = name
+            self._changed(entry)
+
+    def _drop_order(self, entry):
+        i = bisect.bisect_left(self.order, (entry['elo'], entry['sid']))
+        if i < len(self.order) and self.order[i] == (entry['elo'], entry['sid']):
+            del self.order[i]
+
+    # --- Windows ---
+
+    def subscribe(self, sid, email, elo, friends=(), options=None):
+        window = self.windows.get(sid)
+        if window is None or window.email != email:
+            window = self.windows[sid] = Window(email, elo, friends)
+        else:
+            window.elo = elo
+            window.friends = set(friends)
+        if options:
+            window.configure(options)
+        self.dirty.add(sid)
+        return window
+
+    def unsubscribe(self, sid):
+        self.windows.pop(sid, None)
+        self.dirty.discard(sid)
+
+    def pin(self, sid, other_sid):
+        window = self.windows.get(sid)
+        if window is not None:
+            window.pins.add(other_sid)
+            self.dirty.add(sid)
+
+    def unpin(self, sid, other_sid):
+        window = self.windows.get(sid)
+        if window is not None and other_sid in window.pins:
+            window.pins.discard(other_sid)
+            self.dirty.add(sid)
+
+    def set_friend(self, email, friend_email, is_friend):
+        for sid, window in self.windows.items():
+            if window.email == email:
+                (window.friends.add if is_friend else window.friends.discard)(friend_email)
+                self.dirty.add(sid)
+
+    def watchers_of(self, entry):
+        """Subscriber sids whose view can contain ``entry``."""
+        return {sid for sid, window in self.windows.items()
+                if sid == entry['sid'] or entry['sid'] in window.shown or entry['sid'] in window.pins
+                or entry['email'] in window.friends
+                or (window.matches(entry)
+                    and (window.horizon is None or abs(entry['elo'] - window.elo) <= window.horizon))}
+
+    def _changed(self, entry):
+        self.dirty |= self.watchers_of(entry)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return [sid for sid in dirty if sid in self.windows]
+
+    def _nearest(self, window, skip, want):
+        """Players in the window's ELO range, closest first, until ``want`` humans are found
+        (bots after humans). Walks outwards from the window's ELO instead of sorting the range."""
+        order, center = self.order, window.elo
+        low, high = center - window.range, center + window.range
+        left = bisect.bisect_left(order, (center, '')) - 1
+        right = left + 1
+        humans, bots = [], []
+        while len(humans) < want:
+            left_ok = left >= 0 and order[left][0] >= low
+            right_ok = right < len(order) and order[right][0] <= high
+            if not (left_ok or right_ok):
+                break
+            if left_ok and (not right_ok or center - order[left][0] <= order[right][0] - center):
+                sid = order[left][1]
+                left -= 1
+            else:
+                sid = order[right][1]
+                right += 1
+            if sid not in skip:
+                entry = self.entries[sid]
+                (bots if entry['is_bot'] else humans).append(entry)
+        total = (bisect.bisect_right(order, (high, '\uffff')) - bisect.bisect_left(order, (low, ''))
+                 - sum(1 for s in skip if s in self.entries and window.matches(self.entries[s])))
+        return humans + bots, total
+
+    def view(self, sid):
+        """The slice subscriber ``sid`` should see: {'players', 'total', 'has_more', 'window'}."""
+        window = self.windows[sid]
+        always = {sid} | window.pins | {s for email in window.friends for s in self.by_email.get(email, ())}
+        always = [self.entries[s] for s in always if s in self.entries]
+        pinned = {e['sid'] for e in always}
+        start = window.page * window.page_size
+
+        if window.search:
+            candidates = [e for e in self.entries.values() if window.matches(e) and e['sid'] not in pinned]
+            candidates.sort(key=lambda e: (e['is_bot'], abs(e['elo'] - window.elo), -e['elo']))
+            total = len(candidates)
+        else:
+            candidates, total = self._nearest(window, pinned, start + window.page_size)
+        page = candidates[start:start + window.page_size]
+
+        window.shown = pinned | {e['sid'] for e in page}
+        full = len(page) == window.page_size and not page[-1]['is_bot']
+        window.horizon = abs(page[-1]['elo'] - window.elo) if full and not window.search else None
+        return {
+            'players': always + page,
+            'total': total,
+            'has_more': start + window.page_size < total,
+            'window': window.describe(),
+        }
+
+    def changed_view(self, sid):
+        """``view(sid)`` if it differs from what this subscriber got last time, else None."""
+        view = self.view(sid)
+        window = self.windows[sid]
+        key = (tuple((p['sid'], p['elo'], p['name']) for p in view['players']), view['total'])
+        if key == window.last_sent:
+            return None
+        window.last_sent = key
+        return view
@@ -0,0 +1,103 @@
+"""Leveled, non-blocking logging.
+
+Handlers in app.py run on the eventlet hub, so a synchronous write to stdout
+stalls every other player. Records are pushed into an in-memory queue and a
+real OS thread (not a green one) formats and writes them.
+
+Per-subsystem loggers live under the ``ingals`` namespace:
+lobby, game, bot, db, auth, api. The level comes from ``LOG_LEVEL`` (default INFO).
+Per-answer events go through ``game.answers`` which is rate-limited by
+``LOG_ANSWER_SAMPLE_PER_SEC`` records per second.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import sys
+import time
+
+try:
+    # monkey_patch() turns threading/queue into green versions - the writer
+    # must be a real thread so that stdout I/O never blocks the hub
+    from eventlet import patcher
+    _threading = patcher.original('threading')
+    _queue = patcher.original('queue')
+except ImportError:
+    import threading as _threading
+    import queue as _queue
+
+ROOT = 'ingals'
+SUBSYSTEMS = ('lobby', 'game', 'bot', 'db', 'auth', 'api')
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``per_second`` records per logger, count the rest."""
+
+    def __init__(self, per_second):
+        super().__init__()
+        self.per_second = per_second
+        self.window_start = 0.0
+        self.passed = 0
+        self.suppressed = 0
+
+    def filter(self, record):
+        now = time.monotonic()
+        if now - self.window_start >= 1.0:
+            if self.suppressed:
+                record.msg = f'{record.msg} (+{self.suppressed} sampled out)'
+            self.window_start = now
+            self.passed = 0
+            self.suppressed = 0
+        if self.passed >= self.per_second:
+            self.suppressed += 1
+            return False
+        self.passed += 1
+        return True
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def start(self):
+        self._thread = t = _threading.Thread(target=self._monitor, name='log-writer', daemon=True)
+        t.start()
+
+
+_listener = None
+
+
+def setup_logging(level=None, stream=None):
+    """Configure ``ingals.*`` loggers once; safe to call repeatedly."""
+    global _listener
+    root = logging.getLogger(ROOT)
+    if _listener is not None:
+        return root
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    root.setLevel(level)
+    root.propagate = False
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = _queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = _QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    sample_rate = int(os.getenv('LOG_ANSWER_SAMPLE_PER_SEC', 20))
+    logging.getLogger(f'{ROOT}.game.answers').addFilter(RateLimitFilter(sample_rate))
+    return root
+
+
+def get_logger(subsystem):
+    return logging.getLogger(f'{ROOT}.{subsystem}')
+
+
+def stop_logging():
+    """Flush queued records (used on shutdown and by scripts)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,141 @@
+"""Quick-match queue bucketed by ELO.
+
+Waiting tickets live in buckets of ``BUCKET_SIZE`` ELO points; the sorted list
+of non-empty bucket keys finds the neighbours of a new ticket with a bisect,
+and only the buckets within ``QUICK_MATCH_MAX_RANGE`` are looked at. Tickets
+that can be paired are paired at once, so buckets stay nearly empty and an
+enqueue costs O(log n) even in a burst. A pair is allowed when the ELO gap fits
+either ticket's window.
+
+The search window starts at ``QUICK_MATCH_RANGE`` and widens by
+``QUICK_MATCH_WIDEN`` points per second of waiting, up to
+``QUICK_MATCH_MAX_RANGE``. A periodic ``sweep`` re-tries the waiting tickets
+with their wider windows and hands those waiting longer than
+``QUICK_MATCH_BOT_AFTER`` seconds to the bot fallback.
+"""
+import bisect
+import os
+import time
+
+BUCKET_SIZE = 50
+QUICK_MATCH_RANGE = int(os.getenv('QUICK_MATCH_RANGE', 100))
+QUICK_MATCH_WIDEN = float(os.getenv('QUICK_MATCH_WIDEN', 50))  # ELO points per second
+QUICK_MATCH_MAX_RANGE = int(os.getenv('QUICK_MATCH_MAX_RANGE', 800))
+QUICK_MATCH_BOT_AFTER = float(os.getenv('QUICK_MATCH_BOT_AFTER', 15))  # seconds, 0 disables the bot fallback
+QUICK_MATCH_TICK = 1.0  # seconds between sweeps
+
+
+class MatchQueue:
+    def __init__(self, base_range=QUICK_MATCH_RANGE, widen=QUICK_MATCH_WIDEN,
+                 max_range=QUICK_MATCH_MAX_RANGE, bot_after=QUICK_MATCH_BOT_AFTER):
+        self.base_range = base_range
+        self.widen = widen
+        self.max_range = max_range
+        self.bot_after = bot_after
+        self.tickets = {}  # sid -> ticket
+        self.buckets = {}  # bucket key -> {sid: ticket}, oldest first
+        self.keys = []     # sorted non-empty bucket keys
+        self.stats = {'enqueued': 0, 'matched': 0, 'bot_fallbacks': 0, 'cancelled': 0}
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, sid):
+        return sid in self.tickets
+
+    def window(self, ticket, now):
+        return min(self.max_range, self.base_range + self.widen * (now - ticket['since']))
+
+    # --- Buckets ---
+
+    def _put(self, ticket):
+        key = ticket['elo'] // BUCKET_SIZE
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {}
+            bisect.insort(self.keys, key)
+        bucket[ticket['sid']] = ticket
+        self.tickets[ticket['sid']] = ticket
+
+    def _take(self, sid):
+        ticket = self.tickets.pop(sid, None)
+        if ticket is None:
+            return None
+        key = ticket['elo'] // BUCKET_SIZE
+        bucket = self.buckets[key]
+        del bucket[sid]
+        if not bucket:
+            del self.buckets[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+        return ticket
+
+    def _best(self, ticket, width, now):
+        """Closest waiting ticket (another user) within ``width`` or within its own, wider, window.
+
+        Only the buckets up to ``max_range`` away are scanned, a constant number.
+        """
+        elo = ticket['elo']
+        start = bisect.bisect_left(self.keys, (elo - self.max_range) // BUCKET_SIZE)
+        stop = bisect.bisect_right(self.keys, (elo + self.max_range) // BUCKET_SIZE)
+        best, best_key = None, None
+        for key in self.keys[start:stop]:
+            for other in self.buckets[key].values():
+                if other['sid'] == ticket['sid'] or other['email'] == ticket['email']:
+                    continue
+                distance = abs(other['elo'] - elo)
+                if distance > width and distance > self.window(other, now):
+                    continue
+                rank = (distance, other['since'])
+                if best_key is None or rank < best_key:
+                    best, best_key = other, rank
+        return best
+
+    # --- Queue ---
+
+    def enqueue(self, sid, email, elo, rounds, now=None):
+        """Queue a player. Returns (first, second) tickets when paired at once, else None."""
+        now = time.time() if now is None else now
+        self._take(sid)
+        ticket = {'sid': sid, 'email': email, 'elo': elo, 'rounds': rounds, 'since': now}
+        self.stats['enqueued'] += 1
+        opponent = self._best(ticket, self.base_range, now)
+        if opponent is None:
+            self._put(ticket)
+            return None
+        self._take(opponent['sid'])
+        self.stats['matched'] += 1
+        return opponent, ticket
+
+    def requeue(self, ticket):
+        """Put back a ticket the bot fallback could not serve, keeping its place and widened window."""
+        self.stats['bot_fallbacks'] -= 1
+        self._put(ticket)
+
+    def cancel(self, sid):
+        ticket = self._take(sid)
+        if ticket:
+            self.stats['cancelled'] += 1
+        return ticket
+
+    def sweep(self, now=None):
+        """Retry waiting tickets with their widened windows, oldest first.
+
+        Returns (pairs, fallbacks): pairs of tickets to start games for and
+        tickets that waited past ``bot_after`` (removed from the queue).
+        """
+        now = time.time() if now is None else now
+        pairs, fallbacks = [], []
+        for ticket in sorted(self.tickets.values(), key=lambda t: t['since']):
+            if ticket['sid'] not in self.tickets:
+                continue  # paired earlier in this sweep
+            opponent = self._best(ticket, self.window(ticket, now), now)
+            if opponent is not None:
+                self._take(ticket['sid'])
+                self._take(opponent['sid'])
+                self.stats['matched'] += 1
+                pairs.append((ticket, opponent))
+            elif self.bot_after and now - ticket['since'] >= self.bot_after:
+                self._take(ticket['sid'])
+                self.stats['bot_fallbacks'] += 1
+                fallbacks.append(ticket)
+        return pairs, fallbacks
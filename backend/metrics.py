@@ -0,0 +1,163 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Only what the game server needs: counters, callback gauges and counters (read
+live state at scrape time, nothing to keep in sync) and fixed-bucket
+histograms.
+Single worker + eventlet means no cross-process aggregation and no locks.
+"""
+import time
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        for labelvalues, value in sorted(self.values.items()):
+            yield self.name + _labels(self.labelnames, labelvalues), value
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, doc, func, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.func = func  # with labelnames: returns {labelvalues tuple: value}
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        if not self.labelnames:
+            yield self.name, self.func()
+            return
+        for labelvalues, value in sorted(self.func().items()):
+            yield self.name + _labels(self.labelnames, labelvalues), value
+
+
+class CallbackCounter(Gauge):
+    """A monotonic count kept elsewhere (e.g. a stats dict), read at scrape time."""
+    kind = 'counter'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labelvalues):
+        series = self.series.get(labelvalues)
+        if series is None:
+            series = self.series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def time(self, *labelvalues):
+        return _Timer(self, labelvalues)
+
+    def samples(self):
+        names = self.labelnames + ('le',)
+        for labelvalues, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield self.name + '_bucket' + _labels(names, labelvalues + (bound,)), cumulative
+            yield self.name + '_count' + _labels(self.labelnames, labelvalues), cumulative
+            yield self.name + '_sum' + _labels(self.labelnames, labelvalues), round(series[-1], 6)
+
+    def quantile(self, q, *labelvalues):
+        """Upper bucket bound containing the q-th quantile (for the admin page)."""
+        series = self.series.get(labelvalues)
+        if not series:
+            return None
+        total = sum(series[:-1])
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+
+class _Timer:
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Registry:
+    def __init__(self, prefix='ingals_'):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        metric.name = self.prefix + metric.name
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labelnames=()):
+        return self._add(Counter(name, doc, labelnames))
+
+    def gauge(self, name, doc, func, labelnames=()):
+        return self._add(Gauge(name, doc, func, labelnames))
+
+    def callback_counter(self, name, doc, func, labelnames=()):
+        return self._add(CallbackCounter(name, doc, func, labelnames))
+
+    def histogram(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, doc, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.doc}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample, value in metric.samples():
+                lines.append(f'{sample} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram, *labelvalues):
+    """Decorator: observe wall time of every call in ``histogram``."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with histogram.time(*labelvalues):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -14,5 +14,5 @@ CREATE TABLE IF NOT EXISTS zombie_games (
 );
 
 CREATE INDEX IF NOT EXISTS idx_zombie_kills ON zombie_games(kills DESC);
-CREATE INDEX IF NOT EXISTS idx_zombie_user ON zombie_games(user_id);
+-- idx_zombie_user (email) was replaced by idx_zombie_player_run, see userids.DROPPED_INDEXES
 CREATE INDEX IF NOT EXISTS idx_zombie_created ON zombie_games(created_at DESC);
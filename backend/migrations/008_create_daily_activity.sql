@@ -0,0 +1,18 @@
+-- Migration: Daily per-user activity rollup
+-- Date: 2026-10-19
+-- Description: visit_logs / user_sessions rows older than RETENTION_DAYS are folded into
+--              daily_activity and deleted (see retention.py); time indexes for the range scans
+
+CREATE TABLE IF NOT EXISTS daily_activity (
+    day TEXT NOT NULL,                 -- 'YYYY-MM-DD' (UTC)
+    user_email TEXT NOT NULL DEFAULT '', -- '' for anonymous visits
+    user_id INTEGER,
+    visits INTEGER NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    session_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_email)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_activity_uid ON daily_activity(user_id, day);
+CREATE INDEX IF NOT EXISTS idx_visit_logs_ts ON visit_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_start ON user_sessions(start_time);
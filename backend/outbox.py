@@ -0,0 +1,132 @@
+"""Outbound Socket.IO message layer.
+
+Game handlers used to call ``socketio.emit`` directly, so a single answer
+produced several frames per socket (and the bot path even sent ``new_round``
+twice to the same human). The outbox queues events for the current tick and
+flushes them once the hub switches greenlets:
+
+* events addressed to the same socket are packed into one ``batch`` frame;
+* exact duplicates for the same socket are dropped;
+* ``lobby_update`` / ``lobby_count`` are full snapshots, so only the latest one survives.
+
+Every socket still gets its events in the order they were queued: the queue
+is sent as runs of consecutive broadcast or targeted events, one after the
+other, so a targeted ``game_start`` queued before a broadcast ``lobby_update``
+arrives first. Interleaving costs a frame per run; a broadcast snapshot
+superseded by a later broadcast of the same event is dropped across runs.
+"""
+import json
+
+# Events whose payload fully replaces the previous one - keep the last only
+SNAPSHOT_EVENTS = {'lobby_update', 'lobby_count'}
+
+BATCH_EVENT = 'batch'
+
+
+class Outbox:
+    def __init__(self, socketio, namespace='/'):
+        self.socketio = socketio
+        self.namespace = namespace
+        self._queue = []       # [(room, event, data)] in emit order; room None = broadcast
+        self._flush_scheduled = False
+        self._after_flush = []
+        self.stats = {
+            'events_queued': 0,
+            'frames_sent': 0,
+            'duplicates_dropped': 0,
+            'snapshots_coalesced': 0,
+        }
+
+    def emit(self, event, data=None, room=None):
+        """Queue an event; ``room=None`` means broadcast to the namespace."""
+        self.stats['events_queued'] += 1
+        self._queue.append((room, event, data))
+        self._schedule_flush()
+
+    def after_flush(self, callback):
+        """Call ``callback()`` once the events queued so far have been sent."""
+        self._after_flush.append(callback)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        # Runs as soon as the current greenlet yields (end of the tick)
+        self.socketio.start_background_task(self.flush)
+
+    def flush(self):
+        queue, self._queue = self._queue, []
+        callbacks, self._after_flush = self._after_flush, []
+        self._flush_scheduled = False
+
+        # A later broadcast snapshot replaces an earlier one everywhere, whatever lies between
+        last_snapshot = {event: i for i, (room, event, _) in enumerate(queue)
+                         if room is None and event in SNAPSHOT_EVENTS}
+        runs = []  # [(broadcast?, [(room, event, data)])], consecutive events of one kind
+        for i, (room, event, data) in enumerate(queue):
+            if room is None and event in last_snapshot and last_snapshot[event] != i:
+                self.stats['snapshots_coalesced'] += 1
+                continue
+            if not runs or runs[-1][0] != (room is None):
+                runs.append((room is None, []))
+            runs[-1][1].append((room, event, data))
+
+        for broadcast, events in runs:
+            if broadcast:
+                self._send(self._compact([(event, data) for _, event, data in events]), to=None)
+                continue
+            # Expand rooms to real sockets so duplicates sent via different rooms
+            # (e.g. room_id and the opponent's own sid) collapse into one
+            per_socket = {}
+            for room, event, data in events:
+                for sid in self._participants(room):
+                    per_socket.setdefault(sid, []).append((event, data))
+            for sid, sid_events in per_socket.items():
+                self._send(self._compact(sid_events), to=sid)
+
+        for callback in callbacks:
+            callback()
+
+    def _participants(self, room):
+        try:
+            return [sid for sid, _ in self.socketio.server.manager.get_participants(self.namespace, room)]
+        except (KeyError, TypeError):
+            return []
+
+    def _compact(self, events):
+        last_snapshot = {}
+        for i, (event, _) in enumerate(events):
+            if event in SNAPSHOT_EVENTS:
+                last_snapshot[event] = i
+
+        result = []
+        seen = set()
+        for i, (event, data) in enumerate(events):
+            if event in last_snapshot and last_snapshot[event] != i:
+                self.stats['snapshots_coalesced'] += 1
+                continue
+            key = (event, json.dumps(data, sort_keys=True, default=str))
+            if key in seen:
+                self.stats['duplicates_dropped'] += 1
+                continue
+            seen.add(key)
+            result.append((event, data))
+        return result
+
+    def _send(self, events, to):
+        if not events:
+            return
+        if len(events) == 1:
+            event, data = events[0]
+            self.socketio.emit(event, data, to=to, namespace=self.namespace)
+        else:
+            self.socketio.emit(BATCH_EVENT, [[event, data] for event, data in events],
+                               to=to, namespace=self.namespace)
+        self.stats['frames_sent'] += 1
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        queued = stats['events_queued']
+        stats['events_per_frame'] = round(queued / stats['frames_sent'], 2) if stats['frames_sent'] else 0
+        return stats
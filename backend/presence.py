@@ -0,0 +1,92 @@
+"""In-memory presence index and reverse-friendship cache.
+
+Presence is tracked per connection (a user may have several tabs) and folded
+into one status per email: ``in_game`` > ``lobby`` > ``online`` > ``offline``.
+Only changes of that folded status are reported, so the caller can push them
+to the people who have this user as a friend (``followers_of``) instead of
+rebroadcasting the whole lobby.
+"""
+OFFLINE, ONLINE, LOBBY, IN_GAME = 'offline', 'online', 'lobby', 'in_game'
+_RANK = {OFFLINE: 0, ONLINE: 1, LOBBY: 2, IN_GAME: 3}
+
+
+class PresenceIndex:
+    def __init__(self):
+        self.connections = {}  # email -> {sid: status}
+        self.emails = {}       # sid -> email
+        self.followers = None  # friend_email -> {user_email, ...}; loaded lazily from friendships
+
+    # --- Presence ---
+
+    def status_of(self, email):
+        conns = self.connections.get(email)
+        if not conns:
+            return OFFLINE
+        return max(conns.values(), key=_RANK.__getitem__)
+
+    def sids_of(self, email):
+        return self.connections.get(email, {}).keys()
+
+    def set(self, sid, status, email=None):
+        """Update one connection. Returns (email, new_status) when the user's status changed, else None."""
+        email = email or self.emails.get(sid)
+        if not email:
+            return None
+        before = self.status_of(email)
+        self.emails[sid] = email
+        self.connections.setdefault(email, {})[sid] = status
+        after = self.status_of(email)
+        return (email, after) if after != before else None
+
+    def remove(self, sid):
+        email = self.emails.pop(sid, None)
+        if not email:
+            return None
+        before = self.status_of(email)
+        conns = self.connections.get(email, {})
+        conns.pop(sid, None)
+        if not conns:
+            self.connections.pop(email, None)
+        after = self.status_of(email)
+        return (email, after) if after != before else None
+
+    def counts(self):
+        counts = {ONLINE: 0, LOBBY: 0, IN_GAME: 0}
+        for email in self.connections:
+            counts[self.status_of(email)] += 1
+        return counts
+
+    # --- Reverse friendships ---
+
+    def load_followers(self, db):
+        followers = {}
+        for row in db.execute('SELECT user_email, friend_email FROM friendships').fetchall():
+            followers.setdefault(row['friend_email'], set()).add(row['user_email'])
+        self.followers = followers
+
+    def followers_of(self, email):
+        return self.followers.get(email, ()) if self.followers else ()
+
+    def follow(self, user_email, friend_email):
+        if self.followers is not None:
+            self.followers.setdefault(friend_email, set()).add(user_email)
+
+    def unfollow(self, user_email, friend_email):
+        if self.followers is not None:
+            self.followers.get(friend_email, set()).discard(user_email)
+
+    def merge(self, old_email, new_email, followees):
+        """Move ``old_email``'s entries to ``new_email``, as userids.merge_user does in friendships.
+
+        ``followees`` are the friends ``old_email`` had before the merge.
+        """
+        if self.followers is None:
+            return
+        followers = self.followers.pop(old_email, set())
+        followers.discard(new_email)
+        if followers:
+            self.followers.setdefault(new_email, set()).update(followers)
+        for friend in followees:
+            self.followers.get(friend, set()).discard(old_email)
+            if friend != new_email:
+                self.followers.setdefault(friend, set()).add(new_email)
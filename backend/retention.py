@@ -0,0 +1,119 @@
+"""Retention for the append-only activity logs.
+
+``visit_logs`` and ``user_sessions`` rows older than ``RETENTION_DAYS`` are
+folded into ``daily_activity`` (one row per UTC day and user: visits,
+sessions, seconds online) and deleted, a batch per transaction with a pause in
+between. Afterwards the freed pages are handed back to the OS with
+``PRAGMA incremental_vacuum`` in small steps, so the file stays bounded
+without a blocking full VACUUM.
+
+Raw rows newer than the cutoff are left alone, so "today" and the session list
+in the admin panel still see every row.
+"""
+import logging
+import os
+import time
+
+log = logging.getLogger('ingals.db')
+
+RETENTION_DAYS = float(os.getenv('RETENTION_DAYS', 30))
+RETENTION_INTERVAL = float(os.getenv('RETENTION_INTERVAL', 3600))  # seconds, 0 disables the loop
+RETENTION_BATCH = int(os.getenv('RETENTION_BATCH', 1000))
+VACUUM_STEP_PAGES = 256
+
+INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
+
+def enable_incremental_vacuum(db):
+    """Switch the file to auto_vacuum=INCREMENTAL. Takes one full VACUUM, only the first time."""
+    if db.execute('PRAGMA auto_vacuum').fetchone()[0] == INCREMENTAL:
+        return False
+    db.commit()
+    db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    db.execute('VACUUM')
+    log.info('Enabled incremental vacuum')
+    return True
+
+
+class RetentionJob:
+    def __init__(self, days=RETENTION_DAYS, batch_size=RETENTION_BATCH):
+        self.days = days
+        self.batch_size = batch_size
+        self.stats = {'runs': 0, 'rows_rolled_up': {}, 'pages_vacuumed': 0, 'last_run': None, 'last_duration_ms': None}
+
+    def _roll_visits(self, db, cutoff):
+        ids = [row[0] for row in db.execute(
+            'SELECT id FROM visit_logs WHERE timestamp < ? ORDER BY timestamp LIMIT ?',
+            (time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(cutoff)), self.batch_size)).fetchall()]
+        if not ids:
+            return 0
+        marks = ','.join('?' * len(ids))
+        db.execute(f'''
+            INSERT INTO daily_activity (day, user_email, user_id, visits)
+            SELECT date(timestamp), coalesce(user_email, ''), max(user_id), count(*)
+            FROM visit_logs WHERE id IN ({marks}) GROUP BY 1, 2
+            ON CONFLICT(day, user_email) DO UPDATE SET visits = visits + excluded.visits
+        ''', ids)
+        return db.execute(f'DELETE FROM visit_logs WHERE id IN ({marks})', ids).rowcount
+
+    def _roll_sessions(self, db, cutoff):
+        # Driven by the start_time index; a session still being extended is not old yet
+        ids = [row[0] for row in db.execute(
+            'SELECT id FROM user_sessions WHERE start_time < ? AND last_seen < ? ORDER BY start_time LIMIT ?',
+            (cutoff, cutoff, self.batch_size)).fetchall()]
+        if not ids:
+            return 0
+        marks = ','.join('?' * len(ids))
+        db.execute(f'''
+            INSERT INTO daily_activity (day, user_email, user_id, sessions, session_seconds)
+            SELECT date(start_time, 'unixepoch'), coalesce(user_email, ''), max(user_id),
+                   count(*), sum(max(0, last_seen - start_time))
+            FROM user_sessions WHERE id IN ({marks}) GROUP BY 1, 2
+            ON CONFLICT(day, user_email) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                session_seconds = session_seconds + excluded.session_seconds
+        ''', ids)
+        return db.execute(f'DELETE FROM user_sessions WHERE id IN ({marks})', ids).rowcount
+
+    def vacuum(self, db, pause=None):
+        """Release free pages a step at a time. Returns the number of pages released."""
+        if db.execute('PRAGMA auto_vacuum').fetchone()[0] != INCREMENTAL:
+            return 0
+        released = 0
+        while True:
+            free = db.execute('PRAGMA freelist_count').fetchone()[0]
+            if not free:
+                break
+            db.execute(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})').fetchall()
+            released += free - db.execute('PRAGMA freelist_count').fetchone()[0]
+            if pause:
+                pause(0)
+        return released
+
+    def run(self, db, pause=None, now=None):
+        """Roll up and delete old rows, then vacuum. ``pause(seconds)`` is called between batches to yield."""
+        started = time.perf_counter()
+        cutoff = (time.time() if now is None else now) - self.days * 86400
+        report = {'visit_logs': 0, 'user_sessions': 0}
+        for table, roll in (('visit_logs', self._roll_visits), ('user_sessions', self._roll_sessions)):
+            while True:
+                count = roll(db, cutoff)
+                db.commit()
+                report[table] += count
+                if count < self.batch_size:
+                    break
+                if pause:
+                    pause(0)
+        report['pages_vacuumed'] = self.vacuum(db, pause)
+
+        self.stats['runs'] += 1
+        for table in ('visit_logs', 'user_sessions'):
+            self.stats['rows_rolled_up'][table] = self.stats['rows_rolled_up'].get(table, 0) + report[table]
+        self.stats['pages_vacuumed'] += report['pages_vacuumed']
+        self.stats['last_run'] = time.time()
+        self.stats['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        if report['visit_logs'] or report['user_sessions']:
+            log.info('Retention: rolled up %d visits, %d sessions; vacuumed %d pages in %.0f ms',
+                     report['visit_logs'], report['user_sessions'], report['pages_vacuumed'],
+                     self.stats['last_duration_ms'])
+        return report
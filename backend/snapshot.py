@@ -0,0 +1,144 @@
+"""Snapshots of live games and reattaching players by email.
+
+Socket ids die with the connection (and with the process), so a game that
+should survive a disconnect or a restart refers to a missing human by a
+placeholder sid (``detached:<email>``) until someone with that email
+reconnects and ``rename_sid`` puts the new sid in its place. While a game has
+detached players it is paused; after the grace window it ends as a disconnect.
+
+``dump_games`` / ``load_games`` convert ``active_games`` to a compact JSON
+document and back (per-game keys by player index, not sid). The document is
+written with ``write_atomic``: temp file in the same directory, fsync,
+``os.replace``, so a crash mid-write leaves the previous snapshot intact.
+Lobby membership is not saved: clients re-enter the lobby on reconnect.
+"""
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger('ingals.game')
+
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 2))  # seconds, 0 disables snapshots
+RECONNECT_GRACE = float(os.getenv('RECONNECT_GRACE', 60))     # seconds a game waits for a player, 0 ends it at once
+RECONNECT_TICK = 1.0  # seconds between checks for expired grace windows
+FORMAT_VERSION = 1
+
+DETACHED_PREFIX = 'detached:'
+BOT_PREFIX = 'bot:'  # restored bots, until the caller takes a pool sid
+
+
+def placeholder(email):
+    return DETACHED_PREFIX + email
+
+
+def is_placeholder(sid):
+    return sid.startswith(DETACHED_PREFIX)
+
+
+def rename_sid(game, old, new):
+    """Replace a player's sid everywhere in ``game``."""
+    game['players'] = [new if sid == old else sid for sid in game['players']]
+    for key in ('emails', 'scores', 'word_queues'):
+        if old in game.get(key, {}):
+            game[key][new] = game[key].pop(old)
+    if old in game['answered']:
+        game['answered'].discard(old)
+        game['answered'].add(new)
+
+
+def detach(game, sid, now=None):
+    """Player ``sid`` went away: keep its place under a placeholder. Returns the placeholder."""
+    email = game['emails'][sid]
+    ghost = placeholder(email)
+    rename_sid(game, sid, ghost)
+    game.setdefault('detached', {})[email] = time.time() if now is None else now
+    return ghost
+
+
+def reattach(game, email, sid):
+    """Put a reconnected ``sid`` in place of the placeholder of ``email``."""
+    rename_sid(game, placeholder(email), sid)
+    game['detached'].pop(email, None)
+    if not game['detached']:
+        del game['detached']
+
+
+# --- Snapshot document ---
+
+def dump_games(games, bot_emails):
+    out = []
+    for room_id, game in games.items():
+        players = game['players']
+        out.append({
+            'room': room_id,
+            'emails': [game['emails'][sid] for sid in players],
+            'bots': [game['emails'][sid] in bot_emails for sid in players],
+            'scores': [game['scores'][sid] for sid in players],
+            'answered': [sid in game['answered'] for sid in players],
+            'word': game['word'],
+            'translations': list(game['translations']),
+            'round_over': game.get('round_over', False),
+            'winning_score': game.get('winning_score'),
+            'detached': dict(game.get('detached', {})),
+            'pack': game.get('pack'),
+        })
+    return {'version': FORMAT_VERSION, 'saved_at': time.time(), 'games': out}
+
+
+def load_games(doc, now=None):
+    """Games from a snapshot with every human detached (since ``now``). Bots get ``bot:<email>``
+    placeholder sids; the caller swaps them for pool sids. Returns {room_id: game}."""
+    now = time.time() if now is None else now
+    games = {}
+    for item in doc.get('games', []):
+        sids = [(BOT_PREFIX if is_bot else DETACHED_PREFIX) + email for email, is_bot in zip(item['emails'], item['bots'])]
+        detached = dict(item.get('detached') or {})
+        for email, is_bot in zip(item['emails'], item['bots']):
+            if not is_bot:
+                detached.setdefault(email, now)
+        games[item['room']] = {
+            'players': sids,
+            'emails': dict(zip(sids, item['emails'])),
+            'scores': dict(zip(sids, item['scores'])),
+            'answered': {sid for sid, answered in zip(sids, item['answered']) if answered},
+            'word': item['word'],
+            'translations': item['translations'],
+            'round_over': item['round_over'],
+            'winning_score': item['winning_score'],
+            'detached': detached,
+            'pack': item.get('pack'),
+        }
+    return games
+
+
+def encode(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def write_atomic(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read(path, max_age):
+    """The snapshot document, or None if missing, unreadable or older than ``max_age`` seconds."""
+    try:
+        with open(path, 'rb') as f:
+            doc = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable snapshot %s: %s", path, e)
+        return None
+    if doc.get('version') != FORMAT_VERSION:
+        return None
+    age = time.time() - doc.get('saved_at', 0)
+    if age > max_age:
+        log.info("Snapshot %s is %.0f s old, not restoring", path, age)
+        return None
+    return doc
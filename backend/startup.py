@@ -0,0 +1,67 @@
+"""Cold-start timing for app.py.
+
+app.py is imported before the server accepts a connection, so everything it
+does at module level is restart downtime. ``trace.mark(name)`` closes a
+checkpoint (time since the previous one) and ``trace.phase(name)`` times a
+nested step; ``finish()`` freezes the report, which is logged and shown in
+``/api/admin/stats`` (``startup``).
+
+``bench/startup.py`` runs cold starts in fresh interpreters with
+``-X importtime``, prints the phases and the slowest imports and fails when
+the total exceeds ``STARTUP_BUDGET_MS``.
+
+Imported first thing in app.py (before eventlet's monkey patching), so it
+must not pull in threading, logging or anything else heavy.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+STARTUP_TRACE = os.getenv('STARTUP_TRACE', '') not in ('', '0')  # print the phase table on startup
+
+
+class StartupTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last_mark = self.started
+        self.phases = []  # [(name, ms)] in completion order; nested steps are dotted
+        self.total_ms = None
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, round((now - self.last_mark) * 1000, 1)))
+        self.last_mark = now
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, round((time.perf_counter() - start) * 1000, 1)))
+
+    def finish(self):
+        if self.total_ms is None:
+            self.total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.report()
+
+    def report(self):
+        return {'total_ms': self.total_ms, 'phases': [{'name': name, 'ms': ms} for name, ms in self.phases]}
+
+    def summary(self):
+        top = ', '.join(f'{name} {ms:.0f}' for name, ms in self.phases if '.' not in name)
+        return f'{self.total_ms:.0f} ms ({top})'
+
+    def table(self):
+        lines = [f'{"phase":<32}{"ms":>10}']
+        for name, ms in self.phases:
+            if '.' in name:
+                continue
+            lines.append(f'{name:<32}{ms:>10.1f}')
+            lines += [f'{"  " + child[len(name) + 1:]:<32}{child_ms:>10.1f}'
+                      for child, child_ms in self.phases if child.startswith(name + '.')]
+        lines.append(f'{"total":<32}{self.total_ms:>10.1f}')
+        return '\n'.join(lines)
+
+
+trace = StartupTrace()
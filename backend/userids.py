@@ -0,0 +1,203 @@
+"""Integer surrogate user ids.
+
+``users.email`` stays the natural key (SSO subject, session, API), but every
+user now has ``users.id INTEGER PRIMARY KEY AUTOINCREMENT`` (never reused,
+so stale references can't attach to a new user), and every table that points
+at a user has an integer column next to the email one:
+
+    friendships.user_id / friend_id        games.player1_id / player2_id / winner_id
+    user_words.user_id                     user_sessions.user_id
+    visit_logs.user_id                     zombie_games.player_id (its user_id holds the email)
+
+Compatibility layer: ``AFTER INSERT`` / ``AFTER UPDATE OF <email column>``
+triggers fill the id from the email, so code that still writes emails keeps
+the ids right. A row written before its user exists gets its id when the user
+row is inserted (``trg_users_fill_ids``). Reads on hot paths join and filter on the integer columns.
+
+Email indexes that have an integer replacement are dropped (``DROPPED_INDEXES``).
+What still keys on email are constraints the writes rely on: ``users.email``
+(login), and the primary keys of friendships ``(user_email, friend_email)``,
+user_words ``(user_email, word)`` and daily_activity ``(day, user_email)``, which
+the upserts and the guest merge dedupe on. Those go when the writes move to ids
+and the three tables are rebuilt keyed on them; until then they are the cost of
+the compatibility layer (bench/userids_report.py shows it).
+
+``migrate`` is idempotent and runs on every start (after the SQL migrations).
+"""
+import logging
+
+log = logging.getLogger('ingals.db')
+
+# (table, email column, id column)
+REFS = [
+    ('friendships', 'user_email', 'user_id'),
+    ('friendships', 'friend_email', 'friend_id'),
+    ('games', 'player1_email', 'player1_id'),
+    ('games', 'player2_email', 'player2_id'),
+    ('games', 'winner_email', 'winner_id'),
+    ('user_words', 'user_email', 'user_id'),
+    ('user_sessions', 'user_email', 'user_id'),
+    ('visit_logs', 'user_email', 'user_id'),
+    ('zombie_games', 'user_id', 'player_id'),
+]
+
+INDEXES = [
+    ('idx_friendships_uid', 'friendships', 'user_id, friend_id'),
+    ('idx_friendships_friend_id', 'friendships', 'friend_id'),
+    ('idx_games_p1_id', 'games', 'player1_id, created_at'),
+    ('idx_games_p2_id', 'games', 'player2_id, created_at'),
+    ('idx_user_words_uid', 'user_words', 'user_id, last_seen'),
+    ('idx_user_sessions_uid', 'user_sessions', 'user_id, last_seen'),
+    ('idx_visit_logs_uid', 'visit_logs', 'user_id'),
+]
+
+# Replaced by the integer indexes (zombie_games.player_id: by zombie.RUN_DDL's (player_id, run_id))
+DROPPED_INDEXES = ['idx_user_words_seen', 'idx_zombie_user', 'idx_zombie_player_id']
+
+USERS_DDL = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL UNIQUE,
+        name TEXT,
+        elo INTEGER DEFAULT 1200,
+        is_admin INTEGER DEFAULT 0
+    )
+'''
+
+
+def _columns(db, table):
+    return {row[1] for row in db.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def _rebuild_users(db):
+    """Old schema had ``email TEXT PRIMARY KEY``: copy into the id-keyed table, keeping insertion order."""
+    log.info('Migrating users to integer ids')
+    db.execute(USERS_DDL.replace('IF NOT EXISTS users', 'users_new'))
+    db.execute('''
+        INSERT INTO users_new (email, name, elo, is_admin)
+        SELECT email, name, elo, is_admin FROM users ORDER BY rowid
+    ''')
+    db.execute('DROP TABLE users')
+    db.execute('ALTER TABLE users_new RENAME TO users')
+
+
+def _fill_orphans_trigger(db):
+    """Give the rows written before their user existed (NULL id) the id of the new user.
+
+    Each UPDATE is answered by the id index (``id IS NULL``), not a table scan.
+    """
+    updates = []
+    for table, email_col, id_col in REFS:
+        where = f'{id_col} IS NULL AND {email_col} = NEW.email'
+        if id_col == 'winner_id':
+            # winner_id has no index; the winner is one of the players, whose ids do (filled just above)
+            where += ' AND (player1_id = NEW.id OR player2_id = NEW.id)'
+        updates.append(f'UPDATE {table} SET {id_col} = NEW.id WHERE {where};')
+    updates = '\n            '.join(updates)
+    db.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_users_fill_ids AFTER INSERT ON users BEGIN
+            {updates}
+        END
+    ''')
+
+
+def migrate(db):
+    if 'id' not in _columns(db, 'users'):
+        _rebuild_users(db)
+
+    for table, email_col, id_col in REFS:
+        if id_col not in _columns(db, table):
+            db.execute(f'ALTER TABLE {table} ADD COLUMN {id_col} INTEGER')
+            db.execute(f'''
+                UPDATE {table} SET {id_col} = (SELECT id FROM users WHERE email = {table}.{email_col})
+                WHERE {email_col} IS NOT NULL
+            ''')
+            log.info('Backfilled %s.%s', table, id_col)
+
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{id_col}_ins AFTER INSERT ON {table}
+            WHEN NEW.{id_col} IS NULL BEGIN
+                UPDATE {table} SET {id_col} = (SELECT id FROM users WHERE email = NEW.{email_col})
+                WHERE rowid = NEW.rowid;
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{id_col}_upd AFTER UPDATE OF {email_col} ON {table}
+            BEGIN
+                UPDATE {table} SET {id_col} = (SELECT id FROM users WHERE email = NEW.{email_col})
+                WHERE rowid = NEW.rowid;
+            END
+        ''')
+
+    for name, table, columns in INDEXES:
+        db.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})')
+
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_users_fill_ids'").fetchone():
+        # Once: rows orphaned before the trigger existed (e.g. a session logged before its user row)
+        for table, email_col, id_col in REFS:
+            cursor = db.execute(f'''
+                UPDATE {table} SET {id_col} = (SELECT id FROM users WHERE email = {table}.{email_col})
+                WHERE {id_col} IS NULL AND {email_col} IN (SELECT email FROM users)
+            ''')
+            if cursor.rowcount:
+                log.info('Filled %d orphaned %s.%s', cursor.rowcount, table, id_col)
+        _fill_orphans_trigger(db)
+    for name in DROPPED_INDEXES:
+        db.execute(f'DROP INDEX IF EXISTS {name}')
+    db.commit()
+
+
+# --- Compatibility helpers ---
+
+def user_id_for(db, email):
+    row = db.execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone()
+    return row[0] if row else None
+
+
+def merge_user(db, old_email, new_email):
+    """Move everything that belongs to ``old_email`` (a guest) to ``new_email``.
+
+    Word stats and daily activity are summed, friendships and zombie runs
+    deduplicated (and a guest who befriended the account does not become its
+    own friend); the rest is re-pointed. Ids follow through the update triggers. Caller commits.
+    """
+    db.execute('''
+        INSERT INTO user_words (user_email, word, correct_count, wrong_count, status, last_seen)
+        SELECT ?, word, correct_count, wrong_count, status, last_seen FROM user_words WHERE user_email = ? AND true
+        ON CONFLICT(user_email, word) DO UPDATE SET
+            correct_count = correct_count + excluded.correct_count,
+            wrong_count = wrong_count + excluded.wrong_count,
+            status = CASE WHEN (correct_count + excluded.correct_count) > (wrong_count + excluded.wrong_count) * 2
+                          THEN 'learned' ELSE 'learning' END,
+            last_seen = max(last_seen, excluded.last_seen)
+    ''', (new_email, old_email))
+    db.execute('DELETE FROM user_words WHERE user_email = ?', (old_email,))
+
+    for column in ('user_email', 'friend_email'):
+        db.execute(f'UPDATE OR IGNORE friendships SET {column} = ? WHERE {column} = ?', (new_email, old_email))
+        db.execute(f'DELETE FROM friendships WHERE {column} = ?', (old_email,))
+    db.execute('DELETE FROM friendships WHERE user_email = friend_email')
+
+    # Rolled-up activity (not in REFS: it carries its own user_id, written by retention.py)
+    db.execute('''
+        INSERT INTO daily_activity (day, user_email, user_id, visits, sessions, session_seconds)
+        SELECT day, ?, (SELECT id FROM users WHERE email = ?), visits, sessions, session_seconds
+        FROM daily_activity WHERE user_email = ? AND true
+        ON CONFLICT(day, user_email) DO UPDATE SET
+            visits = visits + excluded.visits,
+            sessions = sessions + excluded.sessions,
+            session_seconds = session_seconds + excluded.session_seconds
+    ''', (new_email, new_email, old_email))
+    db.execute('DELETE FROM daily_activity WHERE user_email = ?', (old_email,))
+
+    # A zombie run the client resent after the login is already stored under the account
+    # (unique player_id, run_id); the id is set here, not by the trigger, so OR IGNORE skips the whole row
+    old_id, new_id = user_id_for(db, old_email), user_id_for(db, new_email)
+    db.execute('UPDATE OR IGNORE zombie_games SET player_id = ?, user_id = ? WHERE player_id = ?',
+               (new_id, new_email, old_id))
+    db.execute('DELETE FROM zombie_games WHERE player_id = ?', (old_id,))
+
+    for table, email_col, _ in REFS:
+        if table in ('user_words', 'friendships', 'zombie_games'):
+            continue
+        db.execute(f'UPDATE {table} SET {email_col} = ? WHERE {email_col} = ?', (new_email, old_email))
@@ -0,0 +1,222 @@
+"""Versioned word bank, reloaded from disk without a restart.
+
+A ``WordBank`` is the usual word -> translation dict plus what the game needs
+from it, built once: the version (content hash of the file), the key and
+translation lists ``engine`` samples from, and the JSON body of /api/words.
+Treat it as read-only: the indexes are not rebuilt on mutation.
+
+``WordBankRegistry.current`` is the bank new games get. ``reload()`` stats
+the file (every ``WORDS_RELOAD_INTERVAL`` from a background job, or on demand
+from /api/admin/words/reload), and when it changed parses and indexes the new
+version in a native thread, then swaps ``current`` in one assignment. A
+running game keeps the bank it started with (``game['bank']``), so its words
+and answers never change mid-game; an old version is freed when its last game
+ends. A file that fails to parse or validate is logged and the current
+version stays (write the new file elsewhere and ``mv`` it into place).
+
+/api/words sends the version as ETag and ``X-Words-Version``: clients
+revalidate and keep their cached copy until the version changes.
+
+Packs: besides words.json (pack ``en-ru``, always in memory) every
+``WORD_PACKS_DIR/<pack id>.json`` is a pack for level- or topic-based games.
+``PackRegistry`` loads a pack on first use and keeps loaded packs in LRU
+order; when their estimated size goes over ``WORD_PACKS_BUDGET_MB`` the least
+recently used ones are dropped (a game still pinned to one keeps it alive
+until it ends). Each loaded pack is a ``WordBankRegistry``, so packs
+hot-reload the same way.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import weakref
+from collections import OrderedDict
+
+from engine import NUM_OPTIONS
+
+log = logging.getLogger('ingals.game')
+
+WORDS_PATH = os.getenv('WORDS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'words.json'))
+WORDS_RELOAD_INTERVAL = float(os.getenv('WORDS_RELOAD_INTERVAL', 5))  # seconds between file checks, 0 disables
+WORD_PACKS_DIR = os.getenv('WORD_PACKS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'packs'))
+WORD_PACKS_BUDGET_MB = float(os.getenv('WORD_PACKS_BUDGET_MB', 64))  # loaded packs besides the default
+VERSION_LENGTH = 12
+
+DEFAULT_PACK = 'en-ru'  # words.json
+PACK_ID_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,39}$')
+
+
+class WordBank(dict):
+    def __init__(self, words, version):
+        super().__init__(words)
+        self.version = version
+        self.index = (list(self), list(dict.fromkeys(self.values())))  # see engine._word_index
+        self.payload = json.dumps(words, ensure_ascii=False).encode()
+        self.loaded_at = time.time()
+        self.nbytes = estimate_size(self)
+
+
+def estimate_size(bank):
+    """Rough memory of a bank: dict, its strings, the index lists and the encoded body."""
+    keys, translations = bank.index
+    return (sys.getsizeof(bank) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in bank.items())
+            + sys.getsizeof(keys) + sys.getsizeof(translations) + len(bank.payload))
+
+
+def load(path):
+    """Read, validate and index a words file. Raises OSError / ValueError."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    words = json.loads(data)
+    if not isinstance(words, dict) or not words:
+        raise ValueError('expected a non-empty {word: translation} object')
+    if not all(isinstance(k, str) and isinstance(v, str) and k and v for k, v in words.items()):
+        raise ValueError('words and translations must be non-empty strings')
+    if len(set(words.values())) < NUM_OPTIONS:
+        raise ValueError(f'need at least {NUM_OPTIONS} distinct translations')
+    return WordBank(words, hashlib.sha256(data).hexdigest()[:VERSION_LENGTH])
+
+
+def _call(fn, *args):
+    return fn(*args)
+
+
+class WordBankRegistry:
+    def __init__(self, path=WORDS_PATH):
+        self.path = path
+        self.current = None
+        self.file_stat = None
+        self.versions = weakref.WeakValueDictionary()  # version -> bank, while current or pinned by a game
+        self.stats = {'loads': 0, 'errors': 0, 'last_error': None, 'last_load_ms': None}
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self, force=False, run=_call):
+        """Load the file if it changed (always when ``force``) and make it current.
+
+        ``run(load, path)`` does the parsing (app.py passes tpool.execute). Returns the new
+        bank, or None when nothing changed or the file is bad. With no current bank yet,
+        a bad file raises.
+        """
+        started = time.perf_counter()
+        try:
+            file_stat = self._stat()
+        except OSError:
+            file_stat = None  # missing: reported once by load() below
+        if not force and file_stat == self.file_stat:
+            return None
+        self.file_stat = file_stat  # a bad file is retried when it changes again, not every check
+        try:
+            bank = run(load, self.path)
+        except (OSError, ValueError) as e:
+            self.stats['errors'] += 1
+            self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            if self.current is None:
+                raise
+            log.error("Word bank %s not reloaded, keeping %s: %s", self.path, self.current.version, e)
+            return None
+        if self.current is not None and bank.version == self.current.version:
+            return None  # touched, same content
+        previous, self.current = self.current, bank
+        self.versions[bank.version] = bank
+        self.stats['loads'] += 1
+        self.stats['last_load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        log.info("Word bank %s: %d words (was %s)", bank.version, len(bank), previous and previous.version)
+        return bank
+
+    def get_stats(self):
+        return dict(self.stats, version=self.current and self.current.version,
+                    words=len(self.current or ()), live_versions=sorted(self.versions.keys()))
+
+
+class PackRegistry:
+    def __init__(self, default_path=WORDS_PATH, packs_dir=WORD_PACKS_DIR, budget_mb=WORD_PACKS_BUDGET_MB):
+        self.default_path = default_path
+        self.packs_dir = packs_dir
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.default = WordBankRegistry(default_path)
+        self.loaded = OrderedDict()  # pack id -> WordBankRegistry, least recently used first
+        self.stats = {'loads': 0, 'evictions': 0, 'load_ms': {}}
+
+    def available(self):
+        """{pack id: path} of every pack on disk."""
+        packs = {DEFAULT_PACK: self.default_path}
+        if os.path.isdir(self.packs_dir):
+            for name in sorted(os.listdir(self.packs_dir)):
+                pack_id, ext = os.path.splitext(name)
+                if ext == '.json' and PACK_ID_RE.match(pack_id) and pack_id != DEFAULT_PACK:
+                    packs[pack_id] = os.path.join(self.packs_dir, name)
+        return packs
+
+    def exists(self, pack_id):
+        if not isinstance(pack_id, str):
+            return False
+        return pack_id == DEFAULT_PACK or pack_id in self.loaded or (
+            PACK_ID_RE.match(pack_id) is not None and os.path.isfile(os.path.join(self.packs_dir, pack_id + '.json')))
+
+    def get(self, pack_id, run=_call):
+        """The current bank of ``pack_id``, loading it if needed. KeyError for an unknown pack."""
+        if pack_id == DEFAULT_PACK:
+            return self.default.current
+        registry = self.loaded.get(pack_id)
+        if registry is not None:
+            self.loaded.move_to_end(pack_id)
+            return registry.current
+        return self.load(pack_id, run)[0]
+
+    def load(self, pack_id, run=_call):
+        """Load ``pack_id`` and make room for it. Returns (bank, ids of the packs evicted)."""
+        if not self.exists(pack_id):
+            raise KeyError(pack_id)
+        started = time.perf_counter()
+        registry = WordBankRegistry(os.path.join(self.packs_dir, pack_id + '.json'))
+        registry.reload(force=True, run=run)
+        self.loaded[pack_id] = registry
+        self.loaded.move_to_end(pack_id)
+        self.stats['loads'] += 1
+        self.stats['load_ms'][pack_id] = round((time.perf_counter() - started) * 1000, 1)
+        log.info("Word pack %s loaded: %d words, ~%d KB", pack_id, len(registry.current), registry.current.nbytes // 1024)
+        return registry.current, self.evict(keep=pack_id)
+
+    def evict(self, keep=None):
+        """Drop least recently used packs while over the budget. Returns their ids."""
+        evicted = []
+        while self.loaded_bytes() > self.budget:
+            pack_id = next((p for p in self.loaded if p != keep), None)
+            if pack_id is None:
+                break  # a single pack larger than the budget stays while it is being used
+            del self.loaded[pack_id]
+            evicted.append(pack_id)
+            self.stats['evictions'] += 1
+            log.info("Word pack %s evicted (budget %d KB)", pack_id, self.budget // 1024)
+        return evicted
+
+    def loaded_bytes(self):
+        return sum(r.current.nbytes for r in self.loaded.values())
+
+    def reload(self, force=False, run=_call):
+        """Hot-reload the default and every loaded pack. Returns the ids that got a new version."""
+        reloaded = [DEFAULT_PACK] if self.default.reload(force=force, run=run) else []
+        for pack_id, registry in list(self.loaded.items()):
+            if registry.reload(force=force, run=run):
+                reloaded.append(pack_id)
+        if reloaded:
+            self.evict()
+        return reloaded
+
+    def sizes(self):
+        """{pack id: estimated bytes} of the packs in memory."""
+        sizes = {DEFAULT_PACK: self.default.current.nbytes}
+        sizes.update((pack_id, r.current.nbytes) for pack_id, r in self.loaded.items())
+        return sizes
+
+    def get_stats(self):
+        return dict(self.stats, budget_bytes=self.budget, loaded_bytes=self.loaded_bytes(), sizes=self.sizes(),
+                    available=list(self.available()),
+                    packs=dict({DEFAULT_PACK: self.default.get_stats()},
+                               **{pack_id: r.get_stats() for pack_id, r in self.loaded.items()}))
@@ -0,0 +1,113 @@
+"""Per-player spaced-repetition queue for round words.
+
+When a game starts, each human player's ``user_words`` rows are read once and
+kept as a min-heap of (due_time, word). Rounds take their word from memory
+(no query per round) and answers reschedule it with the same counter/status
+rules as the ``user_words`` upsert in on_answer.
+
+Intervals: ``learning`` words come back after LEARNING_INTERVAL, ``learned``
+words after REVIEW_INTERVAL doubled for every net correct answer (capped).
+Only a WORD_REVIEW_SHARE of rounds are dealt from the queues, the rest stay
+random so players keep meeting new words.
+"""
+import heapq
+import os
+import random
+import time
+
+REVIEW_SHARE = float(os.getenv('WORD_REVIEW_SHARE', 0.5))
+LEARNING_INTERVAL = 5 * 60
+REVIEW_INTERVAL = 24 * 3600
+MAX_DOUBLINGS = 6
+DEAL_LOCKOUT = 10 * 60  # a dealt word nobody answered is not dealt again right away
+
+
+def next_due(last_seen, correct, wrong, status):
+    if status != 'learned':
+        return last_seen + LEARNING_INTERVAL
+    streak = max(0, min(MAX_DOUBLINGS, correct - 2 * wrong))
+    return last_seen + REVIEW_INTERVAL * (1 << streak)
+
+
+class WordQueue:
+    __slots__ = ('heap', 'due', 'stats')
+
+    def __init__(self):
+        self.heap = []   # (due, word); entries whose due no longer matches are skipped lazily
+        self.due = {}    # word -> current due time
+        self.stats = {}  # word -> (correct_count, wrong_count, status)
+
+    def __len__(self):
+        return len(self.due)
+
+    def schedule(self, word, due):
+        self.due[word] = due
+        heapq.heappush(self.heap, (due, word))
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.heap = [(d, w) for w, d in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def peek_due(self, now):
+        """Most overdue word, or None when nothing is due yet."""
+        heap = self.heap
+        while heap:
+            due, word = heap[0]
+            if self.due.get(word) != due:
+                heapq.heappop(heap)
+                continue
+            return word if due <= now else None
+        return None
+
+    def take(self, now):
+        word = self.peek_due(now)
+        if word is not None:
+            heapq.heappop(self.heap)
+            self.schedule(word, now + DEAL_LOCKOUT)
+        return word
+
+    def record(self, word, correct, now=None):
+        now = time.time() if now is None else now
+        correct_count, wrong_count, status = self.stats.get(word, (0, 0, 'learning'))
+        if correct:
+            correct_count += 1
+            if correct_count > wrong_count * 2:
+                status = 'learned'
+        else:
+            wrong_count += 1
+            status = 'learning'
+        self.stats[word] = (correct_count, wrong_count, status)
+        self.schedule(word, next_due(now, correct_count, wrong_count, status))
+
+
+def load_word_queue(db, email, words):
+    """Build the queue of ``email`` from user_words (one query, words no longer in the bank are skipped)."""
+    rows = db.execute('''
+        SELECT word, correct_count, wrong_count, status, CAST(strftime('%s', last_seen) AS INTEGER) AS seen
+        FROM user_words WHERE user_email = ?
+    ''', (email,)).fetchall()
+    queue = WordQueue()
+    for row in rows:
+        word = row['word']
+        if word not in words:
+            continue
+        correct_count, wrong_count, status = row['correct_count'] or 0, row['wrong_count'] or 0, row['status']
+        due = next_due(row['seen'] or 0, correct_count, wrong_count, status)
+        queue.stats[word] = (correct_count, wrong_count, status)
+        queue.due[word] = due
+        queue.heap.append((due, word))
+    heapq.heapify(queue.heap)
+    return queue
+
+
+def pick_round_word(queues, words, rng=random, now=None):
+    """A due word from one of the players' queues, or None to deal a random word."""
+    if not queues or rng.random() >= REVIEW_SHARE:
+        return None
+    now = time.time() if now is None else now
+    order = list(queues.values())
+    rng.shuffle(order)
+    for queue in order:
+        word = queue.take(now)
+        if word is not None and word in words:
+            return word
+    return None
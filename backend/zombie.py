@@ -0,0 +1,170 @@
+"""Zombie survival runs: validation and batched saves.
+
+zombie.html keeps finished runs in localStorage, each with a client-made
+``run_id``, and posts the whole buffer to /api/zombie/save-games when it can
+(after a run, on load, when the browser comes back online). A batch is one
+``executemany`` in one transaction, so a session of runs costs one request
+and one commit instead of one each.
+
+A run resent after a lost response is not stored twice: ``(player_id, run_id)``
+has a unique index and the insert is ``INSERT OR IGNORE``. Runs without an id
+(old clients) are always inserted.
+
+Values outside the ranges below are rejected per run, not per batch: a
+rejected run will never become valid, so the client drops it with the rest.
+
+``RunRanks`` answers "better than what share of all runs" for kills and wave
+without touching the database: a fixed histogram per field (exact counts for
+small values, 16 buckets per power of two above), read once at startup with
+one GROUP BY per field and updated on every new run. A rank costs a prefix
+sum over a Fenwick tree of a few hundred buckets. Rows deleted by the guest
+reaper stay counted until the next restart.
+"""
+import math
+import re
+
+ZOMBIE_BATCH_MAX = 100  # runs per request
+
+# field -> (type, min, max); accuracy is a percentage, duration in seconds
+LIMITS = {
+    'kills': (int, 0, 100_000),
+    'wave': (int, 1, 10_000),
+    'accuracy': (float, 0.0, 100.0),
+    'duration': (int, 0, 24 * 3600),
+}
+DEFAULTS = {'kills': 0, 'wave': 1, 'accuracy': 0.0, 'duration': 0}
+RUN_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+RUN_DDL = [
+    'DROP INDEX IF EXISTS idx_zombie_run',  # first version, keyed on the email column
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_zombie_player_run ON zombie_games(player_id, run_id)',
+]
+
+
+def validate_run(data):
+    """(run_id or None, kills, wave, accuracy, duration) from a posted run; ValueError if out of range."""
+    if not isinstance(data, dict):
+        raise ValueError('run must be an object')
+    run_id = data.get('run_id')
+    if run_id is not None and (not isinstance(run_id, str) or not RUN_ID_RE.match(run_id)):
+        raise ValueError('bad run_id')
+    values = []
+    for field, (kind, low, high) in LIMITS.items():
+        value = data.get(field, DEFAULTS[field])
+        # bool is an int subclass; floats like 12.0 are fine for int fields
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'{field} must be a number')
+        if kind is int and value != int(value):
+            raise ValueError(f'{field} must be a whole number')
+        if not low <= value <= high:
+            raise ValueError(f'{field} out of range [{low}, {high}]')
+        values.append(kind(value))
+    return (run_id, *values)
+
+
+def parse_batch(runs):
+    """Split posted runs into (valid rows, rejected [{run_id, error}]). Repeats of a run_id are dropped."""
+    rows, rejected, seen = [], [], set()
+    for data in runs:
+        try:
+            row = validate_run(data)
+        except ValueError as e:
+            rejected.append({'run_id': data.get('run_id') if isinstance(data, dict) else None, 'error': str(e)})
+            continue
+        if row[0] is not None:
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+        rows.append(row)
+    return rows, rejected
+
+
+def insert_runs(db, player_id, email, rows):
+    """Insert validated rows in one transaction. Returns the new ones (the rest were already stored).
+
+    ``player_id`` is written directly: the unique index is on it, and a conflict raised
+    in the id-filling trigger would be ignored along with the row's id.
+    """
+    run_ids = [row[0] for row in rows if row[0] is not None]
+    stored = set()
+    if run_ids:
+        marks = ','.join('?' * len(run_ids))
+        stored = {r[0] for r in db.execute(
+            f'SELECT run_id FROM zombie_games WHERE player_id = ? AND run_id IN ({marks})', (player_id, *run_ids))}
+    new = [row for row in rows if row[0] is None or row[0] not in stored]
+    db.executemany('''
+        INSERT OR IGNORE INTO zombie_games (player_id, user_id, run_id, kills, wave, accuracy, duration)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(player_id, email, *row) for row in new])
+    db.commit()
+    return new
+
+
+# --- Percentile ranks ---
+
+EXACT = 256       # values below this get a bucket each
+SUB_BUCKETS = 16  # buckets per power of two above EXACT
+
+
+class RankSketch:
+    """Count of values per bucket in a Fenwick tree: ``add`` and ``percentile`` in O(log buckets)."""
+
+    def __init__(self, max_value):
+        self.size = self.bucket(max_value) + 1
+        self.tree = [0] * (self.size + 1)
+        self.total = 0
+
+    @staticmethod
+    def bucket(value):
+        if value < EXACT:
+            return value
+        exp = value.bit_length() - 1
+        sub = (value >> (exp - 4)) & (SUB_BUCKETS - 1)
+        return EXACT + (exp - EXACT.bit_length() + 1) * SUB_BUCKETS + sub
+
+    def add(self, value, count=1):
+        i = min(self.bucket(value), self.size - 1) + 1
+        while i <= self.size:
+            self.tree[i] += count
+            i += i & -i
+        self.total += count
+
+    def _below(self, bucket):
+        """Values in buckets < ``bucket``."""
+        n, i = 0, bucket
+        while i > 0:
+            n += self.tree[i]
+            i -= i & -i
+        return n
+
+    def percentile(self, value):
+        """Share of values below ``value`` (ties count half), 0..100."""
+        if not self.total:
+            return None
+        b = min(self.bucket(value), self.size - 1)
+        below = self._below(b)
+        same = self._below(b + 1) - below
+        return round(100 * (below + same / 2) / self.total, 1)
+
+
+class RunRanks:
+    FIELDS = ('kills', 'wave')
+
+    def __init__(self):
+        self.sketches = {field: RankSketch(LIMITS[field][2]) for field in self.FIELDS}
+
+    def load(self, db):
+        for field, sketch in self.sketches.items():
+            for value, count in db.execute(f'SELECT {field}, count(*) FROM zombie_games GROUP BY {field}'):
+                if isinstance(value, int) and value >= 0:
+                    sketch.add(value, count)
+
+    def add(self, kills, wave):
+        self.sketches['kills'].add(kills)
+        self.sketches['wave'].add(wave)
+
+    def percentiles(self, kills, wave):
+        return {'kills': self.sketches['kills'].percentile(kills), 'wave': self.sketches['wave'].percentile(wave)}
+
+    def stats(self):
+        return {'runs': self.sketches['kills'].total, 'buckets': {f: s.size for f, s in self.sketches.items()}}